@@ -5,7 +5,9 @@ Handles sequential startup, monitoring, and control of individual scripts
 import subprocess
 import threading
 import json
+import math
 import os
+import sqlite3
 import time
 import logging
 from datetime import datetime
@@ -14,6 +16,71 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def rebucket(buckets, growth, target_growth):
+    """Histogram buckets of one growth factor re-filed under another by their geometric midpoint"""
+    if growth == target_growth:
+        return buckets
+    result = {}
+    for bucket, n in buckets.items():
+        target = str(math.ceil((int(bucket) - 0.5) * math.log(growth) / math.log(target_growth)))
+        result[target] = result.get(target, 0) + n
+    return result
+
+
+def merge_stage_stats(target, data):
+    """Merge one serialized StreamingStats dict into another (in place).
+    
+    Each dict carries the growth factor of its histogram buckets; the
+    buckets of data are re-filed if the scripts disagree.
+    """
+    if not data.get('count'):
+        return target
+    if not target.get('count'):
+        target.update(count=data['count'], mean=data['mean'], m2=data['m2'], min=data['min'], max=data['max'],
+                      growth=data['growth'], buckets=dict(data.get('buckets', {})))
+        return target
+    
+    total = target['count'] + data['count']
+    delta = data['mean'] - target['mean']
+    target['m2'] += data['m2'] + delta * delta * target['count'] * data['count'] / total
+    target['mean'] += delta * data['count'] / total
+    target['count'] = total
+    target['min'] = min(target['min'], data['min'])
+    target['max'] = max(target['max'], data['max'])
+    buckets = target.setdefault('buckets', {})
+    for bucket, n in rebucket(data.get('buckets', {}), data['growth'], target['growth']).items():
+        buckets[bucket] = buckets.get(bucket, 0) + n
+    return target
+
+
+def summarize_stage_stats(data):
+    """Count, mean, stddev and p50/p90/p99 from a serialized StreamingStats dict"""
+    count = data.get('count', 0)
+    if not count:
+        return {'count': 0}
+    
+    def percentile(q):
+        rank = q / 100 * count
+        seen = 0
+        for bucket in sorted(data['buckets'], key=int):
+            seen += data['buckets'][bucket]
+            if seen >= rank:
+                value = data['growth'] ** (int(bucket) - 0.5)
+                return round(min(max(value, data['min']), data['max']), 3)
+        return data['max']
+    
+    return {
+        'count': count,
+        'mean': round(data['mean'], 3),
+        'stddev': round(math.sqrt(data['m2'] / (count - 1)), 3) if count > 1 else 0.0,
+        'min': data['min'],
+        'max': data['max'],
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99)
+    }
+
+
 class ScriptOrchestrator:
     def __init__(self, scripts_base_dir, instance_id=1):
         self.scripts_base_dir = Path(scripts_base_dir)
@@ -28,6 +95,8 @@ class ScriptOrchestrator:
             assignments = json.load(f)
         
         self.assigned_scripts = assignments[f"instance{instance_id}"]["scripts"]
+        # All scripts of this instance share one progress database (see ProgressStore in the scripts)
+        self.progress_db = self.scripts_base_dir / f"instance{instance_id}_progress.db"
         logger.info(f"Orchestrator initialized for Instance {instance_id} with {len(self.assigned_scripts)} scripts")
     
     def get_script_status(self, script_id):
@@ -36,10 +105,14 @@ class ScriptOrchestrator:
         progress_file = script_dir / f"script{script_id}_progress.json"
         
         try:
-            if progress_file.exists():
+            progress = None
+            if self.progress_db.exists():
+                progress = self._read_progress_db(script_id)
+            if progress is None and progress_file.exists():
                 with open(progress_file, 'r', encoding='utf-8') as f:
                     progress = json.load(f)
-                
+            
+            if progress is not None:
                 # Check if process is running
                 is_running = script_id in self.running_scripts and self.running_scripts[script_id].poll() is None
                 progress['is_running'] = is_running
@@ -60,6 +133,47 @@ class ScriptOrchestrator:
                 "is_running": False
             }
     
+    def _read_progress_db(self, script_id):
+        """Read a script's progress from the instance SQLite store (read-only)"""
+        conn = sqlite3.connect(f"file:{self.progress_db}?mode=ro", uri=True, timeout=5)
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM script_state WHERE script_id = ?", (script_id,)).fetchone()
+            if row is None:
+                return None
+            
+            progress = dict(row)
+            timing = json.loads(progress.pop('timing_json') or '{}')
+            progress['stage_stats'] = timing.get('stage_stats', {})
+            progress['timing_percentiles'] = {
+                stage: summarize_stage_stats(data) for stage, data in progress['stage_stats'].items()
+            }
+            progress['wait_stats'] = timing.get('wait_stats', {})
+            progress['wait_saved_seconds'] = timing.get('wait_saved_seconds', {})
+            progress['script_id'] = script_id
+            progress['pages_completed'] = [r[0] for r in conn.execute(
+                "SELECT page FROM pages_completed WHERE script_id = ? ORDER BY page", (script_id,))]
+            failures = {r[0]: r[1] for r in conn.execute(
+                "SELECT status, COUNT(*) FROM failed_downloads WHERE script_id = ? GROUP BY status", (script_id,))}
+            progress['failed_retries'] = {status: failures.get(status, 0)
+                                          for status in ("pending", "recovered", "abandoned")}
+            progress['failed_downloads'] = progress['failed_retries']['pending'] + progress['failed_retries']['abandoned']
+            progress['yearly_counts'] = {r[0]: r[1] for r in conn.execute(
+                "SELECT year, count FROM yearly_counts WHERE script_id = ?", (script_id,))}
+            dedupe = conn.execute(
+                """SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(uploaded = 0), 0)
+                   FROM content_duplicates WHERE script_id = ?""", (script_id,)).fetchone()
+            progress['dedupe'] = {"duplicates": dedupe[0], "bytes_avoided": dedupe[1], "puts_avoided": dedupe[2]}
+            spooled = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM upload_queue WHERE script_id = ?",
+                (script_id,)).fetchone()
+            progress['upload_queue'] = {"pending": spooled[0], "bytes": spooled[1]}
+            if progress.get('start_page') and progress.get('end_page'):
+                progress['total_pages'] = progress['end_page'] - progress['start_page'] + 1
+            return progress
+        finally:
+            conn.close()
+    
     def get_all_scripts_status(self):
         """Get status of all assigned scripts"""
         statuses = []
@@ -80,6 +194,31 @@ class ScriptOrchestrator:
         total_pages = sum(s.get('total_pages', 0) for s in statuses)
         completed_pages = sum(len(s.get('pages_completed', [])) for s in statuses)
         
+        # Fleet-wide percentiles: merge each script's histograms, never raw samples
+        merged_stats = {}
+        merged_waits = {}
+        wait_saved = {}
+        for s in statuses:
+            for stage, data in s.get('stage_stats', {}).items():
+                merge_stage_stats(merged_stats.setdefault(stage, {}), data)
+            for label, data in s.get('wait_stats', {}).items():
+                merge_stage_stats(merged_waits.setdefault(label, {}), data)
+            for label, saved in s.get('wait_saved_seconds', {}).items():
+                wait_saved[label] = wait_saved.get(label, 0) + saved
+        
+        dedupe = {"duplicates": 0, "bytes_avoided": 0, "puts_avoided": 0}
+        for s in statuses:
+            for key, value in s.get('dedupe', {}).items():
+                dedupe[key] += value
+        upload_queue = {"pending": 0, "bytes": 0}
+        for s in statuses:
+            for key, value in s.get('upload_queue', {}).items():
+                upload_queue[key] += value
+        failed_retries = {"pending": 0, "recovered": 0, "abandoned": 0}
+        for s in statuses:
+            for key, value in s.get('failed_retries', {}).items():
+                failed_retries[key] += value
+        
         return {
             "instance_id": self.instance_id,
             "total_scripts": len(self.assigned_scripts),
@@ -90,6 +229,12 @@ class ScriptOrchestrator:
             "total_pages": total_pages,
             "completed_pages": completed_pages,
             "progress_percentage": (completed_pages / total_pages * 100) if total_pages > 0 else 0,
+            "timing_percentiles": {stage: summarize_stage_stats(data) for stage, data in merged_stats.items()},
+            "wait_percentiles": {label: summarize_stage_stats(data) for label, data in merged_waits.items()},
+            "wait_saved_seconds": {label: round(saved, 1) for label, saved in wait_saved.items()},
+            "dedupe": dedupe,
+            "upload_queue": upload_queue,
+            "failed_retries": failed_retries,
             "scripts": statuses
         }
     
@@ -114,6 +259,7 @@ class ScriptOrchestrator:
             process = subprocess.Popen(
                 ['python', str(script_file)],
                 cwd=str(script_dir),
+                env={**os.environ, 'INSTANCE_ID': str(self.instance_id)},
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the scraping scripts' per-judgment bookkeeping
+
+Simulates a run of N downloaded judgments and prints resident memory (RSS)
+against files processed for two layouts:
+
+  legacy   - dict records, every download result appended to
+             progress['downloaded_files'] and every timing sample to
+             timing_data['individual_file_times'] (the old behaviour)
+  current  - slotted JudgmentRecord rows for the page in flight only, the packed
+             CompletedJudgmentIndex, StreamingStats and the bounded recent
+             samples ring buffer (download rows themselves live in SQLite)
+
+Each layout runs in its own process so the numbers do not contaminate each
+other. The real record/index/stats code is imported from scripts/script1.
+
+Usage:
+    python benchmark_memory.py [files] [step]
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'script1', 'script1.py')
+PAGE_SIZE = 100
+JUDGES = 40
+MODES = ('legacy', 'current')
+
+
+def load_script():
+    """Import script1.py as a module without running its main()"""
+    spec = importlib.util.spec_from_file_location('script1', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def synthetic_row(script, index):
+    """Build one judgment record the way the listing extraction does"""
+    year = 2000 + index % 25
+    cnr = f"HCBM01{index:06d}{year}"
+    return script.build_judgment_record(
+        index % PAGE_SIZE + 1,
+        f"State of Maharashtra vs Party number {index}",
+        f"Judge : HON'BLE JUSTICE {index % JUDGES}",
+        f"CNR : {cnr} | Date of registration : 01-01-{year} | Decision Date : 15-06-{year} | Disposal Nature : DISPOSED",
+        f"javascript:open_pdf('{index}','{year}','court/cnrorders/hcbm/orders/{year}/{cnr}_1.pdf','HCBM01')",
+        f"link_{index % PAGE_SIZE}"
+    )
+
+
+def download_result(script, judgment):
+    return script.build_download_result(judgment, f"judgments/{judgment['filename']}", 250000, True, 3.2,
+                                        {"resolve": 1.1, "transfer": 2.1})
+
+
+def run_legacy(script, files, step):
+    progress = {"downloaded_files": []}
+    timing_data = {"individual_file_times": []}
+    for i in range(files):
+        # The old records were plain dicts
+        judgment = synthetic_row(script, i).to_dict()
+        progress["downloaded_files"].append(download_result(script, judgment))
+        timing_data["individual_file_times"].append({
+            "filename": judgment['filename'],
+            "case_title": judgment['case_title'][:50],
+            "download_time_seconds": 3.2,
+            "success": True,
+            "timestamp": datetime.now().isoformat(),
+            "cnr": judgment['cnr'],
+            "decision_year": judgment['decision_year']
+        })
+        if (i + 1) % step == 0:
+            yield i + 1
+
+
+def run_current(script, files, step):
+    completed = script.CompletedJudgmentIndex()
+    stats = script.StreamingStats()
+    recent = deque(maxlen=script.TIMING_RECENT_SAMPLES)
+    page = []
+    for i in range(files):
+        if i % PAGE_SIZE == 0:
+            page = []
+        judgment = synthetic_row(script, i)
+        page.append(judgment)
+        download_result(script, judgment)  # written to SQLite and dropped
+        completed.add(judgment)
+        stats.add(3.2)
+        recent.append({
+            "filename": judgment['filename'],
+            "case_title": judgment['case_title'][:50],
+            "download_time_seconds": 3.2,
+            "success": True,
+            "timestamp": datetime.now().isoformat()
+        })
+        if (i + 1) % step == 0:
+            yield i + 1
+
+
+def run_mode(mode, files, step):
+    """Child process: run one layout and print a JSON line per checkpoint"""
+    script = load_script()
+    runner = run_legacy if mode == 'legacy' else run_current
+    start = time.time()
+    print(json.dumps({"files": 0, "rss_mb": round(rss_mb(), 1), "seconds": 0}), flush=True)
+    for processed in runner(script, files, step):
+        print(json.dumps({"files": processed, "rss_mb": round(rss_mb(), 1),
+                          "seconds": round(time.time() - start, 2)}), flush=True)
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 250000
+    step = int(sys.argv[2]) if len(sys.argv) > 2 else max(files // 10, 1)
+
+    results = {}
+    for mode in MODES:
+        print(f"Running {mode} layout for {files} files...")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode, str(files), str(step)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results[mode] = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+
+    print(f"\n{'files':>10} | " + " | ".join(f"{mode + ' RSS MB':>16}" for mode in MODES))
+    print("-" * (13 + 19 * len(MODES)))
+    for rows in zip(*(results[mode] for mode in MODES)):
+        print(f"{rows[0]['files']:>10} | " + " | ".join(f"{row['rss_mb']:>16.1f}" for row in rows))
+
+    for mode in MODES:
+        growth = results[mode][-1]['rss_mb'] - results[mode][0]['rss_mb']
+        print(f"{mode}: +{growth:.1f} MB over {files} files "
+              f"({growth * 1024 * 1024 / files:.0f} bytes/file, {results[mode][-1]['seconds']:.1f}s)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        run_mode(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
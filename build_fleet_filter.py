@@ -0,0 +1,233 @@
+"""
+Build the fleet-wide dedupe filter of judgments already stored in S3
+
+Streams the judgments/ listing of judgements-vectors-pdf, plus the shard
+indexes and metadata manifests where they exist, into a Bloom filter of
+judgment keys. A judgment key is the stem of its deterministic S3 key,
+<CNR>-<hash(pdf_path)>, so every PDF of a case is tracked separately.
+The scraping scripts load the filter at startup (FLEET_FILTER_FILE or
+FLEET_FILTER_S3_KEY) and skip listing rows it contains before doing any
+browser work.
+
+Objects under the old judgments/<script>/<title>.pdf layout carry no CNR;
+they are counted but cannot be added.
+
+Filter file layout (little endian):
+    b"JBF1", num_bits (u64), num_hashes (u32), count (u32), bit array
+Bit i of the array is byte i >> 3, mask 1 << (i & 7). A key sets bits
+(h1 + j * h2) mod num_bits for j < num_hashes, where h1 and h2 are the two
+halves of blake2b(key, digest_size=16) and h2 is forced odd.
+
+Usage:
+    python build_fleet_filter.py [output_file] [--upload]
+
+FLEET_FILTER_FP_RATE sets the target false-positive rate (default 1e-6).
+A false positive makes a script skip a judgment that is not stored.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from dotenv import load_dotenv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+BUCKET = 'judgements-vectors-pdf'
+REGION = os.getenv('AWS_REGION', 'us-east-1')
+JUDGMENTS_PREFIX = 'judgments/'
+SHARDS_PREFIX = 'shards/'
+MANIFESTS_PREFIX = 'manifests/'
+FILTER_S3_KEY = os.getenv('FLEET_FILTER_S3_KEY', 'fleet/judgments.filter')
+DEFAULT_OUTPUT = 'fleet_judgments.filter'
+FP_RATE = float(os.getenv('FLEET_FILTER_FP_RATE', '1e-6'))
+# Top-level partitions of judgments/ (see S3_KEY_LAYOUT) listed in parallel
+LIST_WORKERS = int(os.getenv('LIST_WORKERS', '16'))
+
+MAGIC = b"JBF1"
+HEADER = struct.Struct('<4sQII')
+# judgments/<partitions>/<CNR>-<12 hex digits>.pdf
+JUDGMENT_KEY_RE = re.compile(r'^[^/]+-[0-9a-f]{12}$')
+
+
+def judgment_key_hashes(key):
+    """The two 64-bit hashes a judgment key is probed with"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+def key_stem(s3_key):
+    """Judgment key of a stored object or shard pointer, or None for other layouts"""
+    name = s3_key.rsplit('#', 1)[-1].rsplit('/', 1)[-1]
+    if not name.endswith('.pdf'):
+        return None
+    stem = name[:-len('.pdf')]
+    return stem if JUDGMENT_KEY_RE.match(stem) else None
+
+
+class FilterBuilder:
+    """Collects judgment key hashes (16 bytes each) and sizes the Bloom filter once all are known"""
+
+    def __init__(self):
+        self.h1 = array('Q')
+        self.h2 = array('Q')
+        self.seen = 0
+        self.legacy = 0
+
+    def add_key(self, s3_key):
+        self.seen += 1
+        stem = key_stem(s3_key)
+        if stem is None:
+            self.legacy += 1
+            return
+        h1, h2 = judgment_key_hashes(stem)
+        self.h1.append(h1)
+        self.h2.append(h2)
+
+    def merge(self, other):
+        self.h1.extend(other.h1)
+        self.h2.extend(other.h2)
+        self.seen += other.seen
+        self.legacy += other.legacy
+
+    def build(self, fp_rate=FP_RATE):
+        """Return the serialized filter"""
+        # A key seen in both the listing and a manifest is counted twice, which only oversizes slightly
+        count = max(len(self.h1), 1)
+        num_bits = max(int(-count * math.log(fp_rate) / (math.log(2) ** 2)), 64)
+        num_hashes = max(round(num_bits / count * math.log(2)), 1)
+        bits = bytearray((num_bits + 7) // 8)
+        for h1, h2 in zip(self.h1, self.h2):
+            for j in range(num_hashes):
+                bit = (h1 + j * h2) % num_bits
+                bits[bit >> 3] |= 1 << (bit & 7)
+        logger.info(f"Filter: {len(self.h1)} keys, {num_bits} bits ({len(bits) / (1024 * 1024):.1f} MB), "
+                    f"{num_hashes} hashes, target false-positive rate {fp_rate}")
+        return HEADER.pack(MAGIC, num_bits, num_hashes, len(self.h1)) + bytes(bits)
+
+
+def iter_keys(s3, prefix):
+    """Stream every object key under prefix"""
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj['Key']
+
+
+def collect_partition(s3, prefix):
+    """List one partition into its own builder"""
+    builder = FilterBuilder()
+    for key in iter_keys(s3, prefix):
+        builder.add_key(key)
+    return builder
+
+
+def manifest_keys(s3, key):
+    """S3 keys of the uploaded PDFs recorded in one NDJSON or Parquet metadata manifest.
+
+    Records of uploads that were still spooled are left out; the listing picks
+    those up once they land.
+    """
+    body = s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+    if key.endswith('.ndjson'):
+        records = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+    elif key.endswith('.parquet'):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            logger.warning(f"pyarrow is not installed, skipping Parquet manifest {key}")
+            return
+        records = pyarrow.parquet.read_table(io.BytesIO(body), columns=['s3_key', 'uploaded']).to_pylist()
+    else:
+        return
+    for record in records:
+        if record.get('uploaded') and record.get('s3_key'):
+            yield record['s3_key']
+
+
+def shard_keys(s3, key):
+    """Member pointers listed in one shard index"""
+    index = json.loads(s3.get_object(Bucket=BUCKET, Key=key)['Body'].read())
+    for member in index.get('members', {}):
+        yield f"{index['shard']}#{member}"
+
+
+def collect(s3, builder):
+    """Feed the judgments listing, shard indexes and manifests into builder"""
+    start = time.time()
+    partitions = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=JUDGMENTS_PREFIX, Delimiter='/'):
+        partitions.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        # Objects directly under judgments/ (flat layouts)
+        for obj in page.get('Contents', []):
+            builder.add_key(obj['Key'])
+
+    logger.info(f"Listing {len(partitions)} partitions of {JUDGMENTS_PREFIX} with {LIST_WORKERS} workers")
+    with ThreadPoolExecutor(max_workers=LIST_WORKERS) as executor:
+        for done, partial in enumerate(executor.map(lambda prefix: collect_partition(s3, prefix), partitions), 1):
+            builder.merge(partial)
+            if done % 10 == 0 or done == len(partitions):
+                logger.info(f"Listed {done}/{len(partitions)} partitions, {builder.seen} objects "
+                            f"({time.time() - start:.0f}s)")
+
+    for key in iter_keys(s3, SHARDS_PREFIX):
+        if key.endswith('.idx.json'):
+            for pointer in shard_keys(s3, key):
+                builder.add_key(pointer)
+
+    for key in iter_keys(s3, MANIFESTS_PREFIX):
+        try:
+            for s3_key in manifest_keys(s3, key):
+                builder.add_key(s3_key)
+        except Exception as e:
+            logger.warning(f"Could not read manifest {key}: {e}")
+
+    logger.info(f"Collected {len(builder.h1)} judgment keys from {builder.seen} entries "
+                f"({builder.legacy} in the old title-based layout skipped) in {time.time() - start:.0f}s")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    output = args[0] if args else DEFAULT_OUTPUT
+    upload = '--upload' in sys.argv
+
+    s3 = boto3.client(
+        's3',
+        region_name=REGION,
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+    )
+
+    builder = FilterBuilder()
+    collect(s3, builder)
+    data = builder.build()
+
+    with open(output, 'wb') as f:
+        f.write(data)
+    logger.info(f"Wrote {output}")
+
+    if upload:
+        s3.put_object(Bucket=BUCKET, Key=FILTER_S3_KEY, Body=data, ContentType='application/octet-stream')
+        logger.info(f"Uploaded s3://{BUCKET}/{FILTER_S3_KEY}")
+
+
+if __name__ == '__main__':
+    main()
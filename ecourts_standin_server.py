@@ -0,0 +1,163 @@
+"""
+Local stand-in for judgments.ecourts.gov.in/pdfsearch
+
+Serves just enough of the search flow for the scripts' HTTP engine to run
+against it offline: index.php with the search form and captcha image, the
+DataTables listing endpoint, the open_pdf endpoint and pdfsearch/tmp/ PDFs.
+Rows and PDFs are generated deterministically from the row index.
+
+Usage:
+    python ecourts_standin_server.py [port] [total_results]
+
+    ECOURTS_BASE_URL=http://127.0.0.1:8765/pdfsearch/ SCRAPER_ENGINE=http python scripts/script1/script1.py
+
+Any captcha text is accepted unless STANDIN_CAPTCHA is set. STANDIN_SESSION_LIMIT
+expires a search session after that many AJAX requests, to exercise the
+scripts' re-authentication.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STANDIN_CAPTCHA = os.getenv('STANDIN_CAPTCHA')
+STANDIN_SESSION_LIMIT = int(os.getenv('STANDIN_SESSION_LIMIT', '0'))
+
+# 1x1 transparent PNG
+CAPTCHA_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082'
+)
+
+INDEX_HTML = """<html><body>
+<form id="search_form">
+<input type="hidden" name="app_token" value="{token}">
+<input type="text" name="search_txt1" value="">
+<select name="fcourt_type"><option value="2" selected>High Court</option><option value="3">Supreme Court</option></select>
+<img id="captcha_image" src="vendor/securimage/securimage_show.php">
+<input type="text" id="captcha" name="captcha">
+<input type="button" id="main_search" value="Search">
+</form>
+</body></html>"""
+
+
+def row_cnr(index):
+    return f"HCBM01{index:06d}{2000 + index % 25}"
+
+
+def row_html(index):
+    year = 2000 + index % 25
+    path = f"court/cnrorders/hcbm/orders/{year}/{row_cnr(index)}_1.pdf"
+    return (
+        f'<button type="button" class="btn btn-link" id="link_{index}" '
+        f"onclick=\"javascript:open_pdf('{index}','{year}','{path}','HCBM01')\">"
+        f'<font size="3">State vs Party {index}</font></button><br>'
+        f'<strong>Judge : HON\'BLE JUSTICE {index % 7}</strong>'
+        f'<span class="caseDetailsTD">CNR : {row_cnr(index)} | Date of registration : 01-01-{year} | '
+        f'Decision Date : 15-06-{year} | Disposal Nature : DISPOSED</span>'
+    )
+
+
+def pdf_bytes(name):
+    body = f"Stand-in judgment {name}\n".encode() * 2000
+    return b"%PDF-1.4\n" + body + b"\n%%EOF\n"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    sessions = {}  # session id -> {"token": ..., "authenticated": bool, "requests": int}
+    total_results = 10000
+
+    def session(self):
+        cookie = self.headers.get('Cookie', '')
+        for part in cookie.split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'PHPSESSID' and value in self.sessions:
+                return value, self.sessions[value]
+        return None, None
+
+    def send(self, status, body, content_type, cookie=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', f"PHPSESSID={cookie}; path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload, state):
+        state['token'] = secrets.token_hex(8)
+        payload['app_token'] = state['token']
+        self.send(200, json.dumps(payload).encode(), 'application/json')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith('/index.php'):
+            sid = secrets.token_hex(12)
+            self.sessions[sid] = {"token": secrets.token_hex(8), "authenticated": False, "requests": 0}
+            self.send(200, INDEX_HTML.format(token=self.sessions[sid]['token']).encode(), 'text/html', cookie=sid)
+        elif url.path.endswith('/securimage_show.php'):
+            self.send(200, CAPTCHA_PNG, 'image/png')
+        elif '/tmp/' in url.path and url.path.endswith('.pdf'):
+            sid, state = self.session()
+            if not state or not state['authenticated']:
+                self.send(403, b'<html>Session expired</html>', 'text/html')
+                return
+            self.send(200, pdf_bytes(os.path.basename(url.path)), 'application/pdf')
+        else:
+            self.send(404, b'not found', 'text/plain')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        route = parse_qs(urlparse(self.path).query).get('p', [''])[0]
+        sid, state = self.session()
+        if not state or form.get('app_token') != state['token']:
+            self.send(200, json.dumps({"errormsg": "Invalid token"}).encode(), 'application/json')
+            return
+        state['requests'] += 1
+        if STANDIN_SESSION_LIMIT and state['requests'] > STANDIN_SESSION_LIMIT:
+            state['authenticated'] = False
+
+        if route == 'pdf_search/home':
+            if not state['authenticated']:
+                if state['requests'] > 1 or (STANDIN_CAPTCHA and form.get('captcha') != STANDIN_CAPTCHA):
+                    self.send_json({"errormsg": "Invalid Captcha"}, state)
+                    return
+                state['authenticated'] = True
+            start = int(form.get('start', form.get('iDisplayStart', 0)))
+            count = int(form.get('length', form.get('iDisplayLength', 10)))
+            rows = [[row_html(i)] for i in range(start, min(start + count, self.total_results))]
+            self.send_json({
+                "sEcho": form.get('sEcho'),
+                "iTotalRecords": self.total_results,
+                "iTotalDisplayRecords": self.total_results,
+                "aaData": rows
+            }, state)
+        elif route == 'pdf_search/openpdfcaptcha':
+            if not state['authenticated']:
+                self.send_json({"errormsg": "Session expired"}, state)
+                return
+            name = hashlib.sha1(form.get('path', '').encode()).hexdigest()
+            self.send_json({"outputfile": f"/pdfsearch/tmp/{name}.pdf"}, state)
+        else:
+            self.send(404, b'not found', 'text/plain')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    if len(sys.argv) > 2:
+        StandinHandler.total_results = int(sys.argv[2])
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandinHandler)
+    print(f"Stand-in pdfsearch server on http://127.0.0.1:{port}/pdfsearch/ ({StandinHandler.total_results} results)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
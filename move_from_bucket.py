@@ -3,11 +3,13 @@ Script to move PDF files from ap-south-1 bucket (s3-vector-storage)
 to us-east-1 bucket (judgements-vectors-pdf)
 
 Source: s3://s3-vector-storage/judgements-test-final/{script_number}/{filename}
-Destination: s3://judgements-vectors-pdf/judgments/{script_number}/{filename}
+Destination: s3://judgements-vectors-pdf/judgments/{S3_KEY_LAYOUT}/{filename}
 """
 
 import boto3
+import hashlib
 import os
+import re
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
 import logging
@@ -15,6 +17,7 @@ from datetime import datetime
 import json
 from typing import Dict, List, Tuple
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +42,17 @@ DESTINATION_BUCKET = 'judgements-vectors-pdf'
 DESTINATION_REGION = 'us-east-1'
 DESTINATION_PREFIX = 'judgments/'
 
+# Destination partitions, rendered with the same tokens as the scraping scripts'
+# S3_KEY_LAYOUT: {year}, {court}, {court_code} and {shard}. Migrated files only
+# carry the CNR in their name (..._CNR_<cnr>_<timestamp>.pdf), so {court} falls
+# back to the CNR's court code like in the scripts and {year} is 'unknown'.
+# An empty layout keeps the old flat judgments/<filename> keys
+DESTINATION_KEY_LAYOUT = os.getenv('S3_KEY_LAYOUT', '{year}/{court}')
+LEGACY_CNR_RE = re.compile(r'_CNR_([A-Za-z0-9]+)_')
+
+# Source partitions (one per script directory) listed in parallel
+LIST_WORKERS = int(os.getenv('LIST_WORKERS', '16'))
+
 AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 
@@ -46,6 +60,21 @@ AWS_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 PROGRESS_FILE = 'migration_progress.json'
 
 
+def key_partition(filename: str) -> str:
+    """Render DESTINATION_KEY_LAYOUT for a migrated file ('' when the layout is flat)"""
+    match = LEGACY_CNR_RE.search(filename)
+    court_code = match.group(1)[:4].lower() if match else 'unknown'
+    name = filename[:-len('.pdf')] if filename.lower().endswith('.pdf') else filename
+    fields = {
+        'year': 'unknown',
+        'court': court_code,
+        'court_code': court_code,
+        'shard': hashlib.blake2b(name.encode('utf-8'), digest_size=1).hexdigest()
+    }
+    partition = DESTINATION_KEY_LAYOUT.format(**fields)
+    return '/'.join(part for part in partition.split('/') if part)
+
+
 class S3Migrator:
     """Class to handle S3 bucket migration"""
     
@@ -103,29 +132,40 @@ class S3Migrator:
         except Exception as e:
             logger.error(f"Could not save progress: {e}")
     
+    def _list_pdf_files(self, prefix: str, delimiter: str = '') -> Tuple[List[Dict], List[str]]:
+        """List the PDF files under prefix; with a delimiter also return the sub-prefixes"""
+        pdf_files = []
+        partitions = []
+        paginator = self.source_s3.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=SOURCE_BUCKET,
+            Prefix=prefix,
+            Delimiter=delimiter
+        )
+        
+        for page in pages:
+            partitions.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                # Only process PDF files
+                if key.lower().endswith('.pdf'):
+                    pdf_files.append({
+                        'key': key,
+                        'size': obj['Size'],
+                        'last_modified': obj['LastModified']
+                    })
+        return pdf_files, partitions
+    
     def list_all_pdf_files(self) -> List[Dict]:
-        """List all PDF files from source bucket"""
+        """List all PDF files from source bucket, one script directory per listing thread"""
         logger.info(f"Listing PDF files from s3://{SOURCE_BUCKET}/{SOURCE_PREFIX}")
-        pdf_files = []
         
         try:
-            paginator = self.source_s3.get_paginator('list_objects_v2')
-            pages = paginator.paginate(
-                Bucket=SOURCE_BUCKET,
-                Prefix=SOURCE_PREFIX
-            )
-            
-            for page in pages:
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        key = obj['Key']
-                        # Only process PDF files
-                        if key.lower().endswith('.pdf'):
-                            pdf_files.append({
-                                'key': key,
-                                'size': obj['Size'],
-                                'last_modified': obj['LastModified']
-                            })
+            pdf_files, partitions = self._list_pdf_files(SOURCE_PREFIX, delimiter='/')
+            logger.info(f"Listing {len(partitions)} partitions with {LIST_WORKERS} workers")
+            with ThreadPoolExecutor(max_workers=LIST_WORKERS) as executor:
+                for partition_files, _ in executor.map(self._list_pdf_files, partitions):
+                    pdf_files.extend(partition_files)
             
             logger.info(f"Found {len(pdf_files)} PDF files")
             return pdf_files
@@ -189,7 +229,7 @@ class S3Migrator:
         """
         Convert source path to destination path
         Source: judgements-test-final/03/filename.pdf
-        Destination: judgments/filename.pdf (without script number directory)
+        Destination: judgments/<DESTINATION_KEY_LAYOUT>/filename.pdf (without script number directory)
         """
         # Remove source prefix
         relative_path = source_key.replace(SOURCE_PREFIX, '', 1)
@@ -202,8 +242,8 @@ class S3Migrator:
         else:
             filename = relative_path
         
-        # Add destination prefix directly to filename
-        dest_key = DESTINATION_PREFIX + filename
+        partition = key_partition(filename)
+        dest_key = DESTINATION_PREFIX + (f"{partition}/{filename}" if partition else filename)
         
         return dest_key
     
@@ -26,14 +26,31 @@ import base64
 import json
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import random
 import tempfile
+import tarfile
 from datetime import datetime
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import traceback
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import math
+from collections import deque
+import itertools
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+import hashlib
+import bisect
+import struct
+from array import array
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +68,14 @@ try:
 except ImportError:
     SHUTIL_AVAILABLE = False
 
+# Parquet manifests are optional
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Script Configuration
 SCRIPT_ID = 13
 START_PAGE = 30709
@@ -103,12 +128,201 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_ENABLED = bool(EMAIL_HOST_USER and EMAIL_HOST_PASSWORD)  # Enabled
 
+# Instance-wide progress store: one SQLite (WAL) database per instance shared by
+# all of its scripts, keyed by script_id
+INSTANCE_ID = int(os.getenv('INSTANCE_ID', '0'))
+PROGRESS_DB_DIR = os.path.dirname(SCRIPT_DIR)
+
+# PDF URL resolution mode:
+#   'js'    - run the row's own open_pdf(...) handler in-page and capture the
+#             pdfsearch/tmp/ URL it produces (no modal open/close cycle)
+#   'modal' - click the row button and read the URL from the viewFiles modal
+PDF_URL_MODE = os.getenv('PDF_URL_MODE', 'js').lower()
+PDF_URL_JS_TIMEOUT = 20  # seconds to wait for open_pdf to produce a URL
+
+# Shared keep-alive HTTP client used for PDF fetches
+HTTP_POOL_SIZE = 10
+HTTP_TIMEOUT = 30
+
+# PDF transfer mode:
+#   'stream' - pipe the HTTP response straight into S3 (multipart above one part),
+#              no local file and no full in-memory copy
+#   'disk'   - write to the script directory, upload, then delete (also used
+#              automatically when S3 is unavailable)
+TRANSFER_MODE = os.getenv('TRANSFER_MODE', 'stream').lower()
+STREAM_CHUNK_SIZE = 64 * 1024
+S3_PART_SIZE = 8 * 1024 * 1024  # S3 requires >= 5MB for all but the last part
+
+# PDF validation: every downloaded or captured body is checked while it streams
+# (%PDF- header within the first PDF_HEADER_WINDOW bytes, %%EOF within the last
+# PDF_TRAILER_WINDOW bytes, byte count against Content-Length). A failure aborts
+# the upload and the judgment is recorded as a failed download ('invalid_pdf: ...')
+# so it is fetched again. Uploads carry the SHA-256 already computed for dedupe as
+# an S3 checksum, so S3 rejects a body that was corrupted on the way
+PDF_VALIDATION = os.getenv('PDF_VALIDATION', 'true').lower() == 'true'
+PDF_HEADER_WINDOW = 1024
+PDF_TRAILER_WINDOW = 1024
+
+# Background transfer pipeline: the browser only resolves PDF URLs and hands
+# them to worker threads that fetch and upload. 0 workers = transfer inline.
+TRANSFER_WORKERS = int(os.getenv('TRANSFER_WORKERS', '4'))
+TRANSFER_QUEUE_SIZE = int(os.getenv('TRANSFER_QUEUE_SIZE', '8'))  # crawl pauses when this many are waiting
+TRANSFER_RETRIES = 2
+
+# S3 key layout: judgments/<S3_KEY_LAYOUT>/<CNR>-<hash(pdf_path)>.pdf, where the
+# layout is a '/'-separated partition path built from {year} (decision year),
+# {court} (court folder of the PDF path), {court_code} (first four characters of
+# the CNR) and {shard} (first byte of a hash of the object name, 256 partitions).
+# S3 rate limits apply per prefix, so spreading keys over partitions raises the
+# request ceiling. move_from_bucket.py renders the same tokens
+S3_KEY_LAYOUT = os.getenv('S3_KEY_LAYOUT', '{year}/{court}')
+
+# Output layout: 'objects' stores one S3 object per PDF; 'shards' appends PDFs
+# to a local tar (fsynced per PDF) that is uploaded as one object every
+# SHARD_MAX_FILES PDFs / SHARD_MAX_BYTES, with a <shard>.idx.json sidecar of
+# byte offsets so a single PDF can be read back with one range GET
+OUTPUT_MODE = os.getenv('OUTPUT_MODE', 'objects').lower()
+SHARD_MAX_FILES = int(os.getenv('SHARD_MAX_FILES', '100'))
+SHARD_MAX_BYTES = 256 * 1024 * 1024
+SHARD_SPOOL_DIR = os.path.join(SCRIPT_DIR, "shards")
+
+# Content-addressed dedupe: every PDF is SHA-256 hashed while it streams and
+# looked up in the instance's content_hashes table before the PUT; a duplicate
+# is recorded as a pointer to the stored copy instead of being uploaded again.
+# DEDUPE_S3_MANIFEST (e.g. 'dedupe/sha256') also shares hashes across instances
+# through one small S3 object per unique PDF
+DEDUPE_ENABLED = os.getenv('DEDUPE_ENABLED', 'true').lower() == 'true'
+DEDUPE_S3_MANIFEST = os.getenv('DEDUPE_S3_MANIFEST', '')
+
+# Judgment metadata manifests: every recorded judgment (CNR, title, judge,
+# court, dates, pdf_path, S3 key, size, SHA-256) is appended to a rolling local
+# NDJSON file in MANIFEST_SPOOL_DIR, which is uploaded to manifests/scriptNN/
+# every MANIFEST_MAX_RECORDS records and at the end of the run.
+# MANIFEST_FORMAT 'parquet' converts each batch with pyarrow when it is
+# installed (NDJSON otherwise); 'ndjson' uploads the lines as they are
+MANIFEST_ENABLED = os.getenv('MANIFEST_ENABLED', 'true').lower() == 'true'
+MANIFEST_FORMAT = os.getenv('MANIFEST_FORMAT', 'parquet').lower()
+MANIFEST_MAX_RECORDS = int(os.getenv('MANIFEST_MAX_RECORDS', '5000'))
+MANIFEST_SPOOL_DIR = os.path.join(SCRIPT_DIR, "manifests")
+
+# Upload spool: a PDF whose upload fails is moved to UPLOAD_SPOOL_DIR and queued
+# in the upload_queue table; a background retrier re-uploads it with exponential
+# backoff (and drains whatever earlier runs left at startup). Above
+# UPLOAD_SPOOL_MAX_MB the oldest spooled PDFs are evicted and their judgments
+# become failed downloads for the retry pass to fetch again
+UPLOAD_SPOOL_DIR = os.path.join(SCRIPT_DIR, "spool")
+UPLOAD_SPOOL_MAX_MB = int(os.getenv('UPLOAD_SPOOL_MAX_MB', '2048'))
+UPLOAD_RETRY_BASE_SECONDS = 30
+UPLOAD_RETRY_MAX_SECONDS = 3600
+UPLOAD_RETRY_INTERVAL = 10  # seconds between retrier passes
+
+# Failed download retries: a failed judgment keeps its listing row in
+# failed_downloads and is tried again later - at session start and between
+# pages, FAILED_RETRY_BATCH at a time - straight from its stored open_pdf
+# handler, without going back to its listing page. Each failure class backs off
+# exponentially from its own base (FAILURE_RETRY_POLICY, capped at
+# FAILED_RETRY_MAX_SECONDS) and is given up after its attempt budget. Settled
+# rows keep only the outcome (recovered/abandoned, attempts, class)
+FAILED_RETRY_ENABLED = os.getenv('FAILED_RETRY_ENABLED', 'true').lower() == 'true'
+FAILED_RETRY_BATCH = int(os.getenv('FAILED_RETRY_BATCH', '20'))
+FAILED_RETRY_MAX_ATTEMPTS = int(os.getenv('FAILED_RETRY_MAX_ATTEMPTS', '6'))
+FAILED_RETRY_MAX_SECONDS = 24 * 3600
+FAILURE_RETRY_POLICY = {  # class -> (first backoff in seconds, attempts before giving up)
+    'session': (60, FAILED_RETRY_MAX_ATTEMPTS),
+    'network': (300, FAILED_RETRY_MAX_ATTEMPTS),
+    'upload': (600, FAILED_RETRY_MAX_ATTEMPTS),
+    'invalid_pdf': (1800, min(3, FAILED_RETRY_MAX_ATTEMPTS)),
+    'other': (1800, FAILED_RETRY_MAX_ATTEMPTS),
+}
+
+# PDF capture: 'cdp' reads the PDF Chrome already fetched for the viewer out of
+# its DevTools network buffer instead of downloading it a second time (falls
+# back to a normal download when the body is not available); 'http' always
+# downloads with requests
+PDF_CAPTURE_MODE = os.getenv('PDF_CAPTURE_MODE', 'http').lower()
+CDP_CAPTURE_TIMEOUT = 10  # seconds to wait for Chrome to finish loading the PDF
+CDP_BUFFER_SIZE = 64 * 1024 * 1024  # per-resource and total DevTools body buffer
+
+# Engine: 'browser' drives Chrome for everything (default), 'http' runs the
+# whole search flow over plain HTTP without a browser, 'hybrid' uses Chrome only
+# to solve the captcha and hands its session to HYBRID_WORKERS HTTP workers
+SCRAPER_ENGINE = os.getenv('SCRAPER_ENGINE', 'browser').lower()
+HYBRID_WORKERS = int(os.getenv('HYBRID_WORKERS', '4'))
+
+# A page of the HTTP and hybrid engines that keeps failing for any reason other
+# than an expired session is given up after PAGE_MAX_ATTEMPTS tries: its
+# unfinished rows become failed downloads for the retry pass or, when even its
+# listing never loaded, the run stops there so the next one resumes at that page
+PAGE_MAX_ATTEMPTS = 3
+
+# pdfsearch endpoints; point ECOURTS_BASE_URL at a local stand-in server to
+# exercise the HTTP engine offline
+ECOURTS_BASE_URL = os.getenv('ECOURTS_BASE_URL', 'https://judgments.ecourts.gov.in/pdfsearch/')
+ECOURTS_SEARCH_PATH = os.getenv('ECOURTS_SEARCH_PATH', '?p=pdf_search/home')
+ECOURTS_OPEN_PDF_PATH = os.getenv('ECOURTS_OPEN_PDF_PATH', '?p=pdf_search/openpdfcaptcha')
+ECOURTS_CAPTCHA_PATH = 'vendor/securimage/securimage_show.php'
+# Positional arguments of the page's open_pdf(...) handler, in order
+OPEN_PDF_ARG_NAMES = ('val', 'citation_year', 'path', 'nc_display')
+TABLE_PAGE_LENGTH = 100
+HTTP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Waits: 'events' finishes each step when the page signals it is ready (DataTables
+# draw.dt/xhr.dt, jQuery ajaxComplete, PDF viewer data set), with the old fixed
+# sleeps kept as fallbacks; 'sleep' restores the fixed sleeps
+WAIT_MODE = os.getenv('WAIT_MODE', 'events').lower()
+EVENT_WAIT_TIMEOUT = int(os.getenv('EVENT_WAIT_TIMEOUT', '20'))
+
+# Table extraction: 'js' reads every row of #report_body in one execute_script
+# call, 'webdriver' walks the rows element by element (old behaviour),
+# 'network' parses the DataTables AJAX JSON Chrome received for the draw (CDP
+# network log) without touching the DOM, falling back to 'js'
+TABLE_EXTRACT_MODE = os.getenv('TABLE_EXTRACT_MODE', 'js').lower()
+
+# Timing statistics: recent per-file samples kept in a ring buffer, everything
+# else summarised per stage (histogram buckets are TIMING_HISTOGRAM_GROWTH apart)
+TIMING_RECENT_SAMPLES = int(os.getenv('TIMING_RECENT_SAMPLES', '200'))
+TIMING_HISTOGRAM_GROWTH = 1.1
+TIMING_MIN_SECONDS = 0.001
+
+# Judgments finished this run are merged into the packed completed index every
+# this many downloads
+COMPLETED_INDEX_MERGE_AT = 4096
+
+# Fleet filter: Bloom filter of every judgment already stored anywhere in the
+# fleet, built by build_fleet_filter.py from the bucket listing and manifests.
+# Read from FLEET_FILTER_FILE if set, else from FLEET_FILTER_S3_KEY in the
+# bucket, at startup; listing rows it contains are skipped like rows this
+# script downloaded itself
+FLEET_FILTER_ENABLED = os.getenv('FLEET_FILTER_ENABLED', 'true').lower() == 'true'
+FLEET_FILTER_FILE = os.getenv('FLEET_FILTER_FILE', '')
+FLEET_FILTER_S3_KEY = os.getenv('FLEET_FILTER_S3_KEY', 'fleet/judgments.filter')
+
 # Global variables
 driver = None
 wait = None
 current_page = START_PAGE
 total_files_downloaded = 0
 start_time = None
+http_session = None
+http_session_driver_id = None  # driver.session_id the HTTP client's cookies were copied from
+http_session_generation = 0  # bumped on every cookie sync so workers know to refresh
+http_credentials = None  # (generation, cookies, headers) snapshot handed to transfer workers
+transfer_pipeline = None
+shard_writer = None
+manifest_writer = None
+upload_retrier = None
+progress_store = None
+completed_judgments = None
+hybrid_local = threading.local()  # per-thread HTTP client of hybrid workers
+wait_stats = {}  # wait label -> StreamingStats of seconds spent waiting
+wait_saved_seconds = {}  # wait label -> fixed sleep time no longer spent
+cdp_pdf_responses = {}  # PDF URL -> {"request_id", "finished", "failed"} seen in Chrome's network log
+cdp_request_urls = {}  # DevTools requestId -> PDF URL
+cdp_capture_stats = {"captured": 0, "fallback": 0, "bytes": 0}
+cdp_listing_response = {}  # latest DataTables listing XHR: {"request_id", "finished"}
+modal_selector_stats = {"probes": 0, "hits": {}}  # modal probes run, selector -> probes it found a PDF URL in
+spooled_uploads = {}  # S3 key -> spool entry of a failed upload, until record_download_result queues it
+spooled_uploads_lock = threading.Lock()
 
 
 def cleanup_resources():
@@ -286,49 +500,834 @@ def pre_launch_cleanup():
     
     logger.info(f"Pre-launch cleanup completed for Script {SCRIPT_ID}")
 
+def get_instance_id():
+    """Return this script's instance ID from INSTANCE_ID or instance_script_assignments.json"""
+    if INSTANCE_ID:
+        return INSTANCE_ID
+
+    try:
+        assignments_file = os.path.join(os.path.dirname(PROGRESS_DB_DIR), "instance_script_assignments.json")
+        if os.path.exists(assignments_file):
+            with open(assignments_file, 'r', encoding='utf-8') as f:
+                assignments = json.load(f)
+            for instance in assignments.values():
+                if SCRIPT_ID in instance.get('scripts', []):
+                    return instance['instance_id']
+    except Exception as e:
+        logger.warning(f"Could not read instance assignments: {e}")
+
+    return 1
+
+
+class ProgressStore:
+    """Instance-wide SQLite (WAL) store for script progress and timing.
+
+    Each judgment is a single-row insert in its own transaction instead of a
+    rewrite of the whole progress file, so the cost per file stays constant
+    and a crash mid-write can never leave a truncated file behind. All scripts
+    of an instance share the database, keyed by script_id.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS script_state (
+            script_id INTEGER PRIMARY KEY,
+            start_page INTEGER,
+            end_page INTEGER,
+            current_page INTEGER,
+            current_batch_on_page INTEGER DEFAULT 0,
+            total_files_downloaded INTEGER DEFAULT 0,
+            start_time TEXT,
+            completion_time TEXT,
+            last_updated TEXT,
+            timing_json TEXT
+        );
+        CREATE TABLE IF NOT EXISTS downloaded_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script_id INTEGER NOT NULL,
+            page INTEGER,
+            cnr TEXT,
+            pdf_path TEXT,
+            filename TEXT,
+            s3_key TEXT,
+            uploaded_to_s3 INTEGER,
+            size_bytes INTEGER,
+            case_title TEXT,
+            decision_date TEXT,
+            decision_year INTEGER,
+            download_time TEXT,
+            download_duration_seconds REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_downloaded_files_script_cnr ON downloaded_files(script_id, cnr);
+        CREATE INDEX IF NOT EXISTS idx_downloaded_files_s3_key ON downloaded_files(s3_key);
+        CREATE TABLE IF NOT EXISTS failed_downloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script_id INTEGER NOT NULL,
+            page INTEGER,
+            cnr TEXT,
+            pdf_path TEXT,
+            filename TEXT,
+            case_title TEXT,
+            error TEXT,
+            failed_at TEXT,
+            download_duration_seconds REAL,
+            error_class TEXT,
+            attempts INTEGER DEFAULT 1,
+            next_retry_at REAL,
+            status TEXT DEFAULT 'pending',
+            judgment_json TEXT,
+            resolved_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_failed_downloads_script ON failed_downloads(script_id);
+        CREATE INDEX IF NOT EXISTS idx_failed_downloads_cnr ON failed_downloads(script_id, cnr);
+        CREATE INDEX IF NOT EXISTS idx_failed_downloads_due ON failed_downloads(script_id, status, next_retry_at);
+        CREATE TABLE IF NOT EXISTS pages_completed (
+            script_id INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            completed_at TEXT,
+            PRIMARY KEY (script_id, page)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS page_checkpoints (
+            script_id INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            listing_json TEXT,
+            next_row INTEGER NOT NULL DEFAULT 0,
+            last_cnr TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (script_id, page)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS content_hashes (
+            sha256 TEXT PRIMARY KEY,
+            s3_key TEXT NOT NULL,
+            size_bytes INTEGER,
+            script_id INTEGER,
+            first_seen TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS shard_members (
+            requested_key TEXT PRIMARY KEY,
+            stored_key TEXT NOT NULL,
+            size_bytes INTEGER,
+            script_id INTEGER,
+            packed_at TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS uploaded_shards (
+            shard_key TEXT PRIMARY KEY,
+            script_id INTEGER,
+            uploaded_at TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS content_duplicates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script_id INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            s3_key TEXT,
+            stored_key TEXT,
+            size_bytes INTEGER,
+            uploaded INTEGER DEFAULT 0,
+            deduplicated_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_content_duplicates_script ON content_duplicates(script_id);
+        CREATE INDEX IF NOT EXISTS idx_content_duplicates_key ON content_duplicates(s3_key);
+        CREATE TABLE IF NOT EXISTS upload_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script_id INTEGER NOT NULL,
+            file_path TEXT NOT NULL,
+            filename TEXT,
+            s3_key TEXT NOT NULL,
+            sha256 TEXT,
+            size_bytes INTEGER,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL,
+            last_error TEXT,
+            queued_at TEXT,
+            download_id INTEGER,
+            judgment_json TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_upload_queue_due ON upload_queue(script_id, next_attempt_at);
+        CREATE TABLE IF NOT EXISTS yearly_counts (
+            script_id INTEGER NOT NULL,
+            year TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (script_id, year)
+        ) WITHOUT ROWID;
+    """
+
+    STATE_FIELDS = ("current_page", "current_batch_on_page", "total_files_downloaded",
+                    "start_time", "completion_time", "last_updated")
+
+    def __init__(self, db_path, script_id):
+        self.db_path = db_path
+        self.script_id = script_id
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO script_state (script_id, start_page, end_page) VALUES (?, ?, ?)",
+            (script_id, START_PAGE, END_PAGE)
+        )
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of statements as one atomic write transaction"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def load_state(self):
+        """Return this script's progress as a dict of scalar fields plus yearly counts"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM script_state WHERE script_id = ?", (self.script_id,)).fetchone()
+            yearly = self.conn.execute(
+                "SELECT year, count FROM yearly_counts WHERE script_id = ?", (self.script_id,)
+            ).fetchall()
+
+        state = {field: row[field] for field in self.STATE_FIELDS}
+        state["current_page"] = state["current_page"] or 1
+        state["current_batch_on_page"] = state["current_batch_on_page"] or 0
+        state["total_files_downloaded"] = state["total_files_downloaded"] or 0
+        state["yearly_counts"] = {r["year"]: r["count"] for r in yearly}
+        return state
+
+    def save_state(self, progress_data):
+        """Persist the scalar progress fields"""
+        with self.transaction() as conn:
+            conn.execute(
+                """UPDATE script_state SET current_page = ?, current_batch_on_page = ?,
+                   total_files_downloaded = ?, start_time = ?, completion_time = ?, last_updated = ?
+                   WHERE script_id = ?""",
+                (progress_data.get("current_page"), progress_data.get("current_batch_on_page", 0),
+                 progress_data.get("total_files_downloaded", 0), progress_data.get("start_time"),
+                 progress_data.get("completion_time"), progress_data.get("last_updated"), self.script_id)
+            )
+
+    def record_download(self, download_result, judgment, page, spooled=None):
+        """Insert one downloaded judgment and bump the per-script counters atomically.
+        
+        spooled is the spool entry of a PDF whose upload failed; it is queued for
+        the upload retrier in the same transaction, keyed on the new row. A shard
+        member counts as uploaded only once its shard is in S3 (see
+        mark_shard_uploaded). Returns whether the row was recorded as uploaded.
+        """
+        decision_year = download_result.get("decision_year")
+        s3_key = download_result.get("s3_key")
+        uploaded = bool(download_result.get("uploaded_to_s3"))
+        with self.transaction() as conn:
+            if uploaded and s3_key and "#" in s3_key:
+                uploaded = conn.execute(
+                    "SELECT 1 FROM uploaded_shards WHERE shard_key = ?", (s3_key.split("#", 1)[0],)
+                ).fetchone() is not None
+            download_id = conn.execute(
+                """INSERT INTO downloaded_files (script_id, page, cnr, pdf_path, filename, s3_key, uploaded_to_s3,
+                   size_bytes, case_title, decision_date, decision_year, download_time, download_duration_seconds)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.script_id, page, download_result.get("cnr"), judgment.get("pdf_path"),
+                 download_result.get("filename"), s3_key, int(uploaded), download_result.get("size_bytes"),
+                 download_result.get("case_title"), download_result.get("decision_date"), decision_year,
+                 download_result.get("download_time"), download_result.get("download_duration_seconds"))
+            ).lastrowid
+            if spooled is not None:
+                conn.execute(
+                    """INSERT INTO upload_queue (script_id, file_path, filename, s3_key, sha256, size_bytes,
+                       next_attempt_at, queued_at, download_id, judgment_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (self.script_id, spooled["file_path"], download_result.get("filename"), spooled["s3_key"],
+                     spooled["sha256"], spooled["size_bytes"], time.time() + UPLOAD_RETRY_BASE_SECONDS,
+                     datetime.now().isoformat(), download_id, json.dumps(judgment.to_dict(), ensure_ascii=False))
+                )
+            if decision_year:
+                conn.execute(
+                    """INSERT INTO yearly_counts (script_id, year, count) VALUES (?, ?, 1)
+                       ON CONFLICT(script_id, year) DO UPDATE SET count = count + 1""",
+                    (self.script_id, str(decision_year))
+                )
+            conn.execute(
+                """UPDATE script_state SET total_files_downloaded = total_files_downloaded + 1,
+                   current_page = MAX(COALESCE(current_page, 0), ?), last_updated = ? WHERE script_id = ?""",
+                (page, datetime.now().isoformat(), self.script_id)
+            )
+            # A judgment that failed earlier (or was given up) is now recovered
+            conn.execute(
+                """UPDATE failed_downloads SET status = 'recovered', error = NULL, judgment_json = NULL,
+                   next_retry_at = NULL, resolved_at = ?
+                   WHERE script_id = ? AND cnr = ? AND pdf_path IS ? AND status IN ('pending', 'abandoned')""",
+                (datetime.now().isoformat(), self.script_id, judgment.get("cnr"), judgment.get("pdf_path"))
+            )
+        return uploaded
+
+    def failure_attempts(self, judgment):
+        """How often a judgment has failed so far without being recovered or given up"""
+        with self.lock:
+            row = self.conn.execute(
+                """SELECT attempts FROM failed_downloads
+                   WHERE script_id = ? AND cnr = ? AND pdf_path IS ? AND status = 'pending'""",
+                (self.script_id, judgment.get("cnr"), judgment.get("pdf_path"))
+            ).fetchone()
+        return (row["attempts"] or 0) if row else 0
+
+    def record_failure(self, failed_download, judgment, page, error_class, attempts, next_retry_at):
+        """Record a failed download on the judgment's open failure row, or a new one.
+        
+        The row keeps the listing record for the retry pass; without a
+        next_retry_at the judgment is given up and only the outcome is kept.
+        """
+        now = datetime.now().isoformat()
+        if next_retry_at is None:
+            status, judgment_json, resolved_at = 'abandoned', None, now
+        else:
+            status, judgment_json, resolved_at = 'pending', json.dumps(judgment.to_dict(), ensure_ascii=False), None
+        with self.transaction() as conn:
+            row = conn.execute(
+                """SELECT id FROM failed_downloads
+                   WHERE script_id = ? AND cnr = ? AND pdf_path IS ? AND status = 'pending'""",
+                (self.script_id, judgment.get("cnr"), judgment.get("pdf_path"))
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    """INSERT INTO failed_downloads (script_id, page, cnr, pdf_path, filename, case_title, error,
+                       failed_at, download_duration_seconds, error_class, attempts, next_retry_at, status,
+                       judgment_json, resolved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (self.script_id, page, judgment.get("cnr"), judgment.get("pdf_path"), judgment.get("filename"),
+                     failed_download.get("case_title"), failed_download.get("error"), now,
+                     failed_download.get("download_duration_seconds"), error_class, attempts, next_retry_at, status,
+                     judgment_json, resolved_at)
+                )
+            else:
+                conn.execute(
+                    """UPDATE failed_downloads SET error = ?, failed_at = ?, download_duration_seconds = ?,
+                       error_class = ?, attempts = ?, next_retry_at = ?, status = ?, judgment_json = ?,
+                       resolved_at = ? WHERE id = ?""",
+                    (failed_download.get("error"), now, failed_download.get("download_duration_seconds"),
+                     error_class, attempts, next_retry_at, status, judgment_json, resolved_at, row["id"])
+                )
+
+    def due_failures(self, now, limit):
+        """Failed downloads whose retry is due at or before now, longest waiting first"""
+        with self.lock:
+            rows = self.conn.execute(
+                """SELECT * FROM failed_downloads
+                   WHERE script_id = ? AND status = 'pending' AND next_retry_at <= ? AND judgment_json IS NOT NULL
+                   ORDER BY next_retry_at LIMIT ?""", (self.script_id, now, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def resolve_failure(self, entry_id):
+        """Mark a failed download recovered without a new download row (it was stored in the meantime)"""
+        with self.transaction() as conn:
+            conn.execute(
+                """UPDATE failed_downloads SET status = 'recovered', error = NULL, judgment_json = NULL,
+                   next_retry_at = NULL, resolved_at = ? WHERE id = ?""",
+                (datetime.now().isoformat(), entry_id)
+            )
+
+    def iter_completed_judgments(self):
+        """Yield (cnr, pdf_path) for every judgment this script has downloaded"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT cnr, pdf_path FROM downloaded_files WHERE script_id = ? AND cnr IS NOT NULL AND cnr != ''",
+                (self.script_id,)
+            ).fetchall()
+        for row in rows:
+            yield row["cnr"], row["pdf_path"] or ""
+
+    def mark_page_completed(self, page, next_page=None):
+        """Record that every row on a page has been processed and drop its checkpoint.
+        
+        With next_page the resume point moves there in the same transaction, so a
+        restart never lands on the finished page again.
+        """
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO pages_completed (script_id, page, completed_at) VALUES (?, ?, ?)",
+                (self.script_id, page, now)
+            )
+            conn.execute(
+                "DELETE FROM page_checkpoints WHERE script_id = ? AND page = ?", (self.script_id, page)
+            )
+            if next_page is not None:
+                conn.execute(
+                    """UPDATE script_state SET current_page = ?, current_batch_on_page = 0, last_updated = ?
+                       WHERE script_id = ?""", (next_page, now, self.script_id)
+                )
+
+    def save_page_listing(self, page, judgments_data):
+        """Cache a page's extracted rows so a resumed run does not have to extract them again"""
+        with self.transaction() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO page_checkpoints (script_id, page, listing_json, next_row, last_cnr, updated_at)
+                   VALUES (?, ?, ?, 0, NULL, ?)""",
+                (self.script_id, page, json.dumps([judgment.to_dict() for judgment in judgments_data]),
+                 datetime.now().isoformat())
+            )
+
+    def save_row_checkpoint(self, page, next_row, cnr):
+        """Record that every row of `page` before `next_row` (the last being `cnr`) is done"""
+        with self.transaction() as conn:
+            conn.execute(
+                """UPDATE page_checkpoints SET next_row = ?, last_cnr = ?, updated_at = ?
+                   WHERE script_id = ? AND page = ?""",
+                (next_row, cnr, datetime.now().isoformat(), self.script_id, page)
+            )
+
+    def load_page_checkpoint(self, page):
+        """Return (judgments_data, next_row) for a page with a cached listing, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT listing_json, next_row FROM page_checkpoints WHERE script_id = ? AND page = ?",
+                (self.script_id, page)
+            ).fetchone()
+        if not row or not row["listing_json"]:
+            return None
+        return [JudgmentRecord.from_dict(data) for data in json.loads(row["listing_json"])], row["next_row"]
+
+    def count_pages_completed(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM pages_completed WHERE script_id = ?", (self.script_id,)
+            ).fetchone()[0]
+
+    def count_failed(self):
+        """Failed downloads not recovered since"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM failed_downloads WHERE script_id = ? AND status != 'recovered'",
+                (self.script_id,)
+            ).fetchone()[0]
+
+    def failure_stats(self):
+        """Failed downloads per status (pending, recovered, abandoned)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) AS count FROM failed_downloads WHERE script_id = ? GROUP BY status",
+                (self.script_id,)
+            ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def find_content(self, sha256):
+        """Return the S3 key already holding this content hash, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT s3_key FROM content_hashes WHERE sha256 = ?", (sha256,)).fetchone()
+        return row["s3_key"] if row else None
+
+    def register_content(self, sha256, s3_key, size_bytes):
+        """Record the canonical object for a content hash (the first one registered wins)"""
+        with self.transaction() as conn:
+            conn.execute(
+                """INSERT OR IGNORE INTO content_hashes (sha256, s3_key, size_bytes, script_id, first_seen)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (sha256, s3_key, size_bytes, self.script_id, datetime.now().isoformat())
+            )
+
+    def record_shard_member(self, requested_key, stored_key, size_bytes):
+        """Record where the PDF for requested_key was packed (its "<shard key>#<member>" pointer)"""
+        with self.transaction() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO shard_members (requested_key, stored_key, size_bytes, script_id, packed_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (requested_key, stored_key, size_bytes, self.script_id, datetime.now().isoformat())
+            )
+
+    def record_duplicate(self, sha256, s3_key, stored_key, size_bytes, uploaded):
+        """Record that s3_key's content was not stored again but points at stored_key"""
+        with self.transaction() as conn:
+            conn.execute(
+                """INSERT INTO content_duplicates (script_id, sha256, s3_key, stored_key, size_bytes, uploaded,
+                   deduplicated_at) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (self.script_id, sha256, s3_key, stored_key, size_bytes, int(uploaded), datetime.now().isoformat())
+            )
+
+    def mark_shard_uploaded(self, shard_key):
+        """Record a shard as stored in S3 and mark the download rows packed into it as uploaded"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO uploaded_shards (shard_key, script_id, uploaded_at) VALUES (?, ?, ?)",
+                (shard_key, self.script_id, datetime.now().isoformat())
+            )
+            # '$' sorts right after '#', so this is every "<shard key>#<member>" pointer
+            conn.execute(
+                "UPDATE downloaded_files SET uploaded_to_s3 = 1 WHERE s3_key > ? AND s3_key < ? AND uploaded_to_s3 = 0",
+                (f"{shard_key}#", f"{shard_key}$")
+            )
+
+    def find_stored(self, requested_key):
+        """Return (stored_key, size_bytes) of the shard member packed for requested_key, else None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stored_key, size_bytes FROM shard_members WHERE requested_key = ?", (requested_key,)
+            ).fetchone()
+        return (row["stored_key"], row["size_bytes"]) if row else None
+
+    def find_pointer(self, s3_key):
+        """Return (stored_key, size_bytes) if s3_key was deduplicated to another object, else None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stored_key, size_bytes FROM content_duplicates WHERE s3_key = ? LIMIT 1", (s3_key,)
+            ).fetchone()
+        return (row["stored_key"], row["size_bytes"]) if row else None
+
+    def dedupe_stats(self):
+        """Duplicates found by this script and the bytes and PUTs they saved"""
+        with self.lock:
+            row = self.conn.execute(
+                """SELECT COUNT(*) AS duplicates, COALESCE(SUM(size_bytes), 0) AS bytes_avoided,
+                   COALESCE(SUM(uploaded = 0), 0) AS puts_avoided
+                   FROM content_duplicates WHERE script_id = ?""", (self.script_id,)
+            ).fetchone()
+        return dict(row)
+
+    def due_uploads(self, now):
+        """Queued uploads whose next attempt is at or before now, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                """SELECT * FROM upload_queue WHERE script_id = ? AND next_attempt_at <= ?
+                   ORDER BY next_attempt_at""", (self.script_id, now)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def oldest_upload(self):
+        """The longest-queued upload, or None if the queue is empty"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM upload_queue WHERE script_id = ? ORDER BY id LIMIT 1", (self.script_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def upload_queue_stats(self):
+        """Uploads waiting in this script's spool and their total size"""
+        with self.lock:
+            row = self.conn.execute(
+                """SELECT COUNT(*) AS pending, COALESCE(SUM(size_bytes), 0) AS bytes
+                   FROM upload_queue WHERE script_id = ?""", (self.script_id,)
+            ).fetchone()
+        return dict(row)
+
+    def reschedule_upload(self, entry_id, attempts, next_attempt_at, error):
+        """Record a failed retry and when to try again"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE upload_queue SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, next_attempt_at, error, entry_id)
+            )
+
+    def complete_upload(self, entry, s3_key):
+        """Drop a queued upload and mark its download row as uploaded"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM upload_queue WHERE id = ?", (entry["id"],))
+            conn.execute(
+                "UPDATE downloaded_files SET s3_key = ?, uploaded_to_s3 = 1 WHERE id = ? AND uploaded_to_s3 = 0",
+                (s3_key, entry["download_id"])
+            )
+
+    def evict_upload(self, entry, reason, next_retry_at):
+        """Drop a queued upload and turn its download row back into a failure for the retry pass.
+        
+        Returns True if a download row was demoted.
+        """
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM upload_queue WHERE id = ?", (entry["id"],))
+            row = conn.execute(
+                "SELECT * FROM downloaded_files WHERE id = ? AND uploaded_to_s3 = 0", (entry["download_id"],)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM downloaded_files WHERE id = ?", (row["id"],))
+            conn.execute(
+                """INSERT INTO failed_downloads (script_id, page, cnr, pdf_path, filename, case_title, error,
+                   failed_at, download_duration_seconds, error_class, attempts, next_retry_at, judgment_json)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'upload', 1, ?, ?)""",
+                (self.script_id, row["page"], row["cnr"], row["pdf_path"], row["filename"], row["case_title"],
+                 reason, datetime.now().isoformat(), row["download_duration_seconds"], next_retry_at,
+                 entry["judgment_json"])
+            )
+            if row["decision_year"]:
+                conn.execute(
+                    "UPDATE yearly_counts SET count = count - 1 WHERE script_id = ? AND year = ? AND count > 0",
+                    (self.script_id, str(row["decision_year"]))
+                )
+            conn.execute(
+                """UPDATE script_state SET total_files_downloaded = MAX(total_files_downloaded - 1, 0)
+                   WHERE script_id = ?""", (self.script_id,)
+            )
+        return True
+
+    def load_timing(self):
+        """Return the stored timing summary, or None if there is none yet"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT timing_json FROM script_state WHERE script_id = ?", (self.script_id,)
+            ).fetchone()
+        return json.loads(row["timing_json"]) if row and row["timing_json"] else None
+
+    def save_timing(self, timing_data):
+        """Persist the timing summary (per-file timings live in the download rows)"""
+        summary = {k: v for k, v in timing_data.items() if k != "recent_file_times"}
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE script_state SET timing_json = ? WHERE script_id = ?",
+                (json.dumps(summary, ensure_ascii=False), self.script_id)
+            )
+
+    def import_json_progress(self, progress_file, timing_file):
+        """One-time import of a legacy scriptN_progress.json / scriptN_timing.json pair"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_updated FROM script_state WHERE script_id = ?", (self.script_id,)
+            ).fetchone()
+        if row["last_updated"] or not os.path.exists(progress_file):
+            return False
+
+        with open(progress_file, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        legacy_timing = None
+        if os.path.exists(timing_file):
+            with open(timing_file, 'r', encoding='utf-8') as f:
+                legacy_timing = json.load(f)
+            legacy_timing.pop("individual_file_times", None)
+
+        with self.transaction() as conn:
+            for item in legacy.get("downloaded_files", []):
+                conn.execute(
+                    """INSERT INTO downloaded_files (script_id, cnr, filename, s3_key, uploaded_to_s3, case_title,
+                       decision_date, decision_year, download_time, download_duration_seconds)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (self.script_id, item.get("cnr"), item.get("filename"), item.get("s3_key"),
+                     int(bool(item.get("uploaded_to_s3"))), item.get("case_title"), item.get("decision_date"),
+                     item.get("decision_year"), item.get("download_time"), item.get("download_duration_seconds"))
+                )
+            # No listing record survives in the JSON, so these failures cannot be retried
+            for item in legacy.get("failed_downloads", []):
+                conn.execute(
+                    """INSERT INTO failed_downloads (script_id, case_title, error, download_duration_seconds, status,
+                       resolved_at) VALUES (?, ?, ?, ?, 'abandoned', ?)""",
+                    (self.script_id, item.get("case_title"), item.get("error"), item.get("download_duration_seconds"),
+                     datetime.now().isoformat())
+                )
+            for page in legacy.get("pages_completed", []):
+                conn.execute(
+                    "INSERT OR IGNORE INTO pages_completed (script_id, page) VALUES (?, ?)", (self.script_id, page)
+                )
+            for year, count in legacy.get("yearly_counts", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO yearly_counts (script_id, year, count) VALUES (?, ?, ?)",
+                    (self.script_id, str(year), count)
+                )
+            conn.execute(
+                """UPDATE script_state SET current_page = ?, current_batch_on_page = ?, total_files_downloaded = ?,
+                   start_time = ?, completion_time = ?, last_updated = ?, timing_json = ? WHERE script_id = ?""",
+                (legacy.get("current_page", 1), legacy.get("current_batch_on_page", 0),
+                 legacy.get("total_files_downloaded", 0), legacy.get("start_time"), legacy.get("completion_time"),
+                 legacy.get("last_updated") or datetime.now().isoformat(),
+                 json.dumps(legacy_timing, ensure_ascii=False) if legacy_timing else None, self.script_id)
+            )
+
+        # Keep the originals around but out of the way
+        os.replace(progress_file, progress_file + ".migrated")
+        if legacy_timing is not None:
+            os.replace(timing_file, timing_file + ".migrated")
+        logger.info(f"Imported legacy progress from {progress_file} into {self.db_path}")
+        return True
+
+
+def get_progress_store():
+    """Open (once) this instance's progress database"""
+    global progress_store
+    if progress_store is None:
+        db_path = os.path.join(PROGRESS_DB_DIR, f"instance{get_instance_id()}_progress.db")
+        progress_store = ProgressStore(db_path, SCRIPT_ID)
+        logger.info(f"Using progress store {db_path}")
+        try:
+            progress_store.import_json_progress(PROGRESS_FILE, TIMING_FILE)
+        except Exception as e:
+            logger.error(f"Error importing legacy progress file: {e}")
+    return progress_store
+
+
+def judgment_key(cnr, pdf_path=""):
+    """64-bit key identifying one judgment PDF by CNR and pdf_path"""
+    digest = hashlib.blake2b(f"{cnr}|{pdf_path}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class CompletedJudgmentIndex:
+    """Set of already-downloaded judgments, keyed by CNR + pdf_path.
+
+    Keys loaded at startup are kept as a sorted array of 64-bit hashes (8 bytes
+    per judgment, binary-searched); judgments finished during this run go into a
+    small set on top. Rows imported from the old JSON progress carry no pdf_path,
+    so a CNR-only entry matches any PDF of that case. When a fleet filter is
+    attached, judgments stored by any other script count as done as well.
+    Judgments whose stored copy was lost again are masked by a third set.
+    """
+
+    def __init__(self, pairs=(), fleet=None):
+        self.loaded = array('Q', sorted({judgment_key(cnr, pdf_path) for cnr, pdf_path in pairs}))
+        self.added = set()
+        self.discarded = set()
+        self.fleet = fleet
+
+    def __len__(self):
+        return len(self.loaded) + len(self.added)
+
+    def _has_key(self, key):
+        if key in self.added:
+            return True
+        if key in self.discarded:
+            return False
+        i = bisect.bisect_left(self.loaded, key)
+        return i < len(self.loaded) and self.loaded[i] == key
+
+    def contains(self, judgment, include_fleet=True):
+        cnr = judgment.get("cnr")
+        if not cnr:
+            return False
+        key = judgment_key(cnr, judgment.get("pdf_path") or "")
+        if self._has_key(key) or self._has_key(judgment_key(cnr)):
+            return True
+        return (include_fleet and key not in self.discarded and self.fleet is not None
+                and self.fleet.contains(fleet_key(judgment)))
+
+    def add(self, judgment):
+        cnr = judgment.get("cnr")
+        if cnr:
+            key = judgment_key(cnr, judgment.get("pdf_path") or "")
+            self.discarded.discard(key)
+            self.added.add(key)
+            if len(self.added) >= COMPLETED_INDEX_MERGE_AT:
+                # Fold the set into the packed array so memory stays at 8 bytes per judgment
+                self.loaded = array('Q', sorted(itertools.chain(self.loaded, self.added)))
+                self.added.clear()
+
+    def discard(self, judgment):
+        cnr = judgment.get("cnr")
+        if cnr:
+            key = judgment_key(cnr, judgment.get("pdf_path") or "")
+            self.added.discard(key)
+            self.discarded.add(key)
+
+
+class FleetFilter:
+    """Read-only Bloom filter of judgment keys written by build_fleet_filter.py.
+    
+    Layout: b"JBF1", num_bits (u64), num_hashes (u32), count (u32), bit array.
+    A key is probed at (h1 + j * h2) mod num_bits, h1/h2 being the halves of
+    its 16-byte blake2b digest (h2 forced odd); a lookup costs one hash and
+    num_hashes bit tests.
+    """
+    
+    MAGIC = b"JBF1"
+    HEADER = struct.Struct('<4sQII')
+    
+    def __init__(self, data):
+        magic, self.num_bits, self.num_hashes, self.count = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC:
+            raise ValueError("not a fleet filter file")
+        self.bits = memoryview(data)[self.HEADER.size:]
+    
+    def contains(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for j in range(self.num_hashes):
+            bit = (h1 + j * h2) % self.num_bits
+            if not self.bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+        return True
+
+
+def fleet_key(judgment):
+    """Fleet filter key of a judgment: the <CNR>-<hash(pdf_path)> stem of its S3 key"""
+    return build_s3_key(judgment).rsplit('/', 1)[-1][:-len(".pdf")]
+
+
+def load_fleet_filter():
+    """Load the fleet filter from FLEET_FILTER_FILE or the bucket, or return None"""
+    if not FLEET_FILTER_ENABLED:
+        return None
+    try:
+        if FLEET_FILTER_FILE:
+            with open(FLEET_FILTER_FILE, 'rb') as f:
+                data = f.read()
+            source = FLEET_FILTER_FILE
+        elif s3_client is not None:
+            data = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=FLEET_FILTER_S3_KEY)['Body'].read()
+            source = f"s3://{S3_BUCKET_NAME}/{FLEET_FILTER_S3_KEY}"
+        else:
+            return None
+        fleet = FleetFilter(data)
+        logger.info(f"Loaded fleet filter from {source}: {fleet.count} judgments, "
+                    f"{len(data) / (1024 * 1024):.1f} MB")
+        return fleet
+    except Exception as e:
+        logger.warning(f"No fleet filter loaded, only this script's own downloads will be skipped: {e}")
+        return None
+
+
+def get_completed_judgments():
+    """Load (once) the index of judgments this script has already downloaded"""
+    global completed_judgments
+    if completed_judgments is None:
+        try:
+            completed_judgments = CompletedJudgmentIndex(get_progress_store().iter_completed_judgments())
+        except Exception as e:
+            logger.error(f"Error loading completed judgments: {e}")
+            completed_judgments = CompletedJudgmentIndex()
+        logger.info(f"Loaded {len(completed_judgments)} already-downloaded judgments")
+        completed_judgments.fleet = load_fleet_filter()
+    return completed_judgments
+
+
 # All scraping functions from legacy_judgements.py
 def load_progress():
-    """Load progress from JSON file"""
+    """Load progress from the instance progress store"""
     try:
-        if os.path.exists(PROGRESS_FILE):
-            with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return get_progress_store().load_state()
     except Exception as e:
-        logger.error(f"Error loading progress file: {e}")
-    
+        logger.error(f"Error loading progress: {e}")
+
     return {
         "current_page": 1,
         "total_files_downloaded": 0,
         "start_time": None,
-        "downloaded_files": [],
         "last_updated": None,
-        "pages_completed": [],
         "current_batch_on_page": 0,
-        "yearly_counts": {},
-        "failed_downloads": []
+        "yearly_counts": {}
     }
 
 
 def save_progress(progress_data):
-    """Save progress to JSON file"""
+    """Save scalar progress fields to the instance progress store"""
     try:
         progress_data["last_updated"] = datetime.now().isoformat()
-        with open(PROGRESS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(progress_data, f, indent=2, ensure_ascii=False)
-        logger.info(f"Progress saved to {PROGRESS_FILE}")
+        get_progress_store().save_state(progress_data)
+        logger.debug(f"Progress saved for Script {SCRIPT_ID}")
     except Exception as e:
         logger.error(f"Error saving progress: {e}")
 
 
 def load_timing_data():
-    """Load timing data from JSON file"""
+    """Load timing data from the instance progress store"""
     try:
-        if os.path.exists(TIMING_FILE):
-            with open(TIMING_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        timing_data = get_progress_store().load_timing()
+        if timing_data:
+            timing_data["recent_file_times"] = deque(maxlen=TIMING_RECENT_SAMPLES)
+            timing_data["stage_stats"] = {
+                stage: StreamingStats.from_dict(data) for stage, data in timing_data.get("stage_stats", {}).items()
+            }
+            wait_stats.update(
+                (label, StreamingStats.from_dict(data)) for label, data in timing_data.get("wait_stats", {}).items()
+            )
+            wait_saved_seconds.update(timing_data.get("wait_saved_seconds", {}))
+            modal_selector_stats.update(timing_data.get("modal_selector_stats", {}))
+            return timing_data
     except Exception as e:
-        logger.error(f"Error loading timing file: {e}")
-    
+        logger.error(f"Error loading timing data: {e}")
+
     return {
         "session_start": None,
         "session_end": None,
@@ -337,7 +1336,8 @@ def load_timing_data():
         "total_failed_downloads": 0,
         "total_time_seconds": 0,
         "average_time_per_file": 0,
-        "individual_file_times": [],
+        "recent_file_times": deque(maxlen=TIMING_RECENT_SAMPLES),
+        "stage_stats": {},
         "session_statistics": [],
         "fastest_download": None,
         "slowest_download": None,
@@ -346,20 +1346,122 @@ def load_timing_data():
 
 
 def save_timing_data(timing_data):
-    """Save timing data to JSON file"""
+    """Save timing summary to the instance progress store"""
     try:
         timing_data["last_updated"] = datetime.now().isoformat()
-        with open(TIMING_FILE, 'w', encoding='utf-8') as f:
-            json.dump(timing_data, f, indent=2, ensure_ascii=False)
-        logger.debug(f"Timing data saved to {TIMING_FILE}")
+        summary = dict(timing_data)
+        summary["stage_stats"] = {stage: stats.to_dict() for stage, stats in timing_data.get("stage_stats", {}).items()}
+        summary["wait_stats"] = {label: stats.to_dict() for label, stats in wait_stats.items()}
+        summary["wait_saved_seconds"] = {label: round(saved, 3) for label, saved in wait_saved_seconds.items()}
+        summary["modal_selector_stats"] = modal_selector_stats
+        get_progress_store().save_timing(summary)
+        logger.debug(f"Timing data saved for Script {SCRIPT_ID}")
     except Exception as e:
         logger.error(f"Error saving timing data: {e}")
 
 
-def update_timing_stats(timing_data, file_info, download_time_seconds, success=True):
+class StreamingStats:
+    """Bounded-memory running statistics for one timing stage.
+
+    Keeps count/mean/variance (Welford), min/max and a log-bucketed histogram
+    whose buckets are TIMING_HISTOGRAM_GROWTH apart, so percentiles are accurate
+    to about half a bucket width no matter how many samples are added. Two
+    instances merge exactly by adding buckets and combining the moments, which
+    is what the orchestrator does across scripts. The growth factor is saved
+    with the buckets, so readers never have to assume it.
+    """
+
+    __slots__ = ("count", "mean", "m2", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    @staticmethod
+    def bucket_for(value):
+        return math.ceil(math.log(max(value, TIMING_MIN_SECONDS)) / math.log(TIMING_HISTOGRAM_GROWTH))
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = self.bucket_for(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        return self
+
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) from the histogram"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Geometric midpoint of the bucket, clamped to the observed range
+                value = TIMING_HISTOGRAM_GROWTH ** (bucket - 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "stddev": round(self.stddev(), 3),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99)
+        }
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max,
+                "growth": TIMING_HISTOGRAM_GROWTH, "buckets": {str(b): n for b, n in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data.get("count", 0)
+        stats.mean = data.get("mean", 0.0)
+        stats.m2 = data.get("m2", 0.0)
+        stats.min = data.get("min")
+        stats.max = data.get("max")
+        growth = data.get("growth", TIMING_HISTOGRAM_GROWTH)
+        for b, n in data.get("buckets", {}).items():
+            # Buckets saved with another growth factor are re-filed by their geometric midpoint
+            bucket = int(b) if growth == TIMING_HISTOGRAM_GROWTH else cls.bucket_for(growth ** (int(b) - 0.5))
+            stats.buckets[bucket] = stats.buckets.get(bucket, 0) + n
+        return stats
+
+
+def update_timing_stats(timing_data, file_info, download_time_seconds, success=True, stage_seconds=None):
     """Update timing statistics with new download data"""
     try:
-        # Individual file timing
+        # Recent file timings (ring buffer, not persisted)
         file_timing = {
             "filename": file_info.get('filename', 'unknown'),
             "case_title": file_info.get('case_title', 'unknown')[:50],
@@ -370,7 +1472,14 @@ def update_timing_stats(timing_data, file_info, download_time_seconds, success=T
             "decision_year": file_info.get('decision_year')
         }
         
-        timing_data["individual_file_times"].append(file_timing)
+        timing_data["recent_file_times"].append(file_timing)
+        
+        # Per-stage streaming statistics
+        stage_stats = timing_data.setdefault("stage_stats", {})
+        samples = dict(stage_seconds or {})
+        samples["download" if success else "failed"] = download_time_seconds
+        for stage, seconds in samples.items():
+            stage_stats.setdefault(stage, StreamingStats()).add(seconds)
         
         # Update overall statistics
         timing_data["total_files_processed"] += 1
@@ -394,10 +1503,8 @@ def update_timing_stats(timing_data, file_info, download_time_seconds, success=T
         else:
             timing_data["total_failed_downloads"] += 1
         
-        # Calculate running averages (only for successful downloads)
-        successful_times = [f["download_time_seconds"] for f in timing_data["individual_file_times"] if f["success"]]
-        if successful_times:
-            timing_data["average_time_per_file"] = round(sum(successful_times) / len(successful_times), 2)
+        # Running average of successful downloads
+        timing_data["average_time_per_file"] = round(stage_stats["download"].mean, 2) if "download" in stage_stats else 0
         
         return timing_data
         
@@ -438,8 +1545,75 @@ def sanitize_filename(filename):
     return filename
 
 
-def upload_to_s3(file_path, s3_key):
-    """Upload file to S3 bucket"""
+def dedupe_manifest_key(sha256):
+    return f"{DEDUPE_S3_MANIFEST.rstrip('/')}/{sha256[:2]}/{sha256}.json"
+
+
+def find_duplicate_content(sha256):
+    """S3 key already holding this content: the instance index first, then the optional S3 manifest"""
+    if not DEDUPE_ENABLED:
+        return None
+    
+    stored_key = get_progress_store().find_content(sha256)
+    if stored_key is None and DEDUPE_S3_MANIFEST and s3_client is not None:
+        try:
+            manifest = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=dedupe_manifest_key(sha256))['Body'].read()
+            entry = json.loads(manifest)
+            stored_key = entry['s3_key']
+            get_progress_store().register_content(sha256, stored_key, entry.get('size_bytes'))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.warning(f"Could not read dedupe manifest for {sha256}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not read dedupe manifest for {sha256}: {e}")
+    return stored_key
+
+
+def register_content(sha256, s3_key, size_bytes):
+    """Record a freshly uploaded object as the stored copy of its content"""
+    if not DEDUPE_ENABLED:
+        return
+    try:
+        get_progress_store().register_content(sha256, s3_key, size_bytes)
+        if DEDUPE_ENABLED and DEDUPE_S3_MANIFEST and s3_client is not None:
+            s3_client.put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=dedupe_manifest_key(sha256),
+                Body=json.dumps({"s3_key": s3_key, "size_bytes": size_bytes, "script_id": SCRIPT_ID}).encode('utf-8'),
+                ContentType='application/json'
+            )
+    except Exception as e:
+        logger.warning(f"Could not register content hash for {s3_key}: {e}")
+
+
+def note_duplicate(sha256, s3_key, stored_key, size_bytes, uploaded=False):
+    """Store a pointer record for content that already exists under stored_key"""
+    if stored_key == s3_key:
+        logger.info(f"Identical content already stored at {s3_key}, not uploading again")
+        return
+    logger.info(f"Duplicate of {stored_key} ({size_bytes} bytes), recording a pointer instead of storing {s3_key}")
+    try:
+        get_progress_store().record_duplicate(sha256, s3_key, stored_key, size_bytes, uploaded)
+    except Exception as e:
+        logger.warning(f"Could not record duplicate {s3_key}: {e}")
+
+
+def file_sha256(file_path):
+    """SHA-256 hex digest of a local file"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def s3_checksum(digest):
+    """Base64 form of a SHA-256 digest, as S3's ChecksumSHA256 expects"""
+    return base64.b64encode(digest).decode('ascii')
+
+
+def upload_to_s3(file_path, s3_key, sha256=None):
+    """Upload file to S3 bucket, with its SHA-256 (hex) as the object checksum when given"""
     try:
         if s3_client is None:
             logger.error("S3 client is not initialized")
@@ -447,12 +1621,14 @@ def upload_to_s3(file_path, s3_key):
         
         logger.info(f"Uploading {file_path} to S3 bucket {S3_BUCKET_NAME}...")
         
+        checksum = {'ChecksumSHA256': s3_checksum(bytes.fromhex(sha256))} if sha256 else {}
         with open(file_path, 'rb') as file_data:
             s3_client.put_object(
                 Bucket=S3_BUCKET_NAME,
                 Key=s3_key,
                 Body=file_data,
-                ContentType='application/pdf'
+                ContentType='application/pdf',
+                **checksum
             )
         
         logger.info(f"Successfully uploaded to S3: {s3_key}")
@@ -463,46 +1639,544 @@ def upload_to_s3(file_path, s3_key):
         return False
 
 
-def delete_local_file(file_path):
-    """Delete local file after successful upload"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Deleted local file: {file_path}")
-            return True
-        else:
-            logger.warning(f"File not found for deletion: {file_path}")
-            return False
-    except Exception as e:
-        logger.error(f"Error deleting local file {file_path}: {e}")
-        return False
-
-
-def send_email(subject, body, is_html=False):
-    """Send email notification - DISABLED FOR TESTING"""
-    logger.info(f"EMAIL DISABLED - Would send: {subject}")
-    return False  # Emails disabled
-    if not EMAIL_ENABLED:
-        logger.warning("Email notifications disabled - missing credentials")
-        return False
+def stream_to_s3(chunks, s3_key):
+    """Upload an iterable of byte chunks to S3 without buffering more than one part in memory.
+    
+    The content is hashed on the way; PDFs that fit in one part are checked
+    against the dedupe index before the PUT, which carries the hash as its S3
+    checksum (multipart uploads carry one per part). Returns (size_bytes, stored_key, sha256),
+    where stored_key is the existing copy's key when the content was a duplicate.
+    """
+    if s3_client is None:
+        raise RuntimeError("S3 client is not initialized")
+    
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    upload_id = None
+    parts = []
+    total_bytes = 0
     
     try:
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['From'] = EMAIL_HOST_USER
-        msg['To'] = EMAIL_HOST_USER  # Sending to same email
-        msg['Subject'] = f"[Script {SCRIPT_ID}] {subject}"
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer.extend(chunk)
+            hasher.update(chunk)
+            total_bytes += len(chunk)
+            
+            if len(buffer) >= S3_PART_SIZE:
+                # Switch to multipart as soon as the object outgrows a single part
+                if upload_id is None:
+                    upload_id = s3_client.create_multipart_upload(
+                        Bucket=S3_BUCKET_NAME,
+                        Key=s3_key,
+                        ContentType='application/pdf',
+                        ChecksumAlgorithm='SHA256'
+                    )['UploadId']
+                    logger.info(f"Started multipart upload for {s3_key}")
+                
+                part_number = len(parts) + 1
+                part_checksum = s3_checksum(hashlib.sha256(buffer).digest())
+                part = s3_client.upload_part(
+                    Bucket=S3_BUCKET_NAME,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=bytes(buffer),
+                    ChecksumSHA256=part_checksum
+                )
+                parts.append({'PartNumber': part_number, 'ETag': part['ETag'], 'ChecksumSHA256': part_checksum})
+                buffer = bytearray()
         
-        # Attach body
-        if is_html:
-            msg.attach(MIMEText(body, 'html'))
+        sha256 = hasher.hexdigest()
+        if upload_id is None:
+            stored_key = find_duplicate_content(sha256)
+            if stored_key is not None:
+                note_duplicate(sha256, s3_key, stored_key, total_bytes)
+                return total_bytes, stored_key, sha256
+            
+            s3_client.put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=s3_key,
+                Body=bytes(buffer),
+                ContentType='application/pdf',
+                ChecksumSHA256=s3_checksum(hasher.digest())
+            )
         else:
-            msg.attach(MIMEText(body, 'plain'))
+            if buffer:
+                part_number = len(parts) + 1
+                part_checksum = s3_checksum(hashlib.sha256(buffer).digest())
+                part = s3_client.upload_part(
+                    Bucket=S3_BUCKET_NAME,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=bytes(buffer),
+                    ChecksumSHA256=part_checksum
+                )
+                parts.append({'PartNumber': part_number, 'ETag': part['ETag'], 'ChecksumSHA256': part_checksum})
+            
+            s3_client.complete_multipart_upload(
+                Bucket=S3_BUCKET_NAME,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            upload_id = None
+            
+            # Large PDFs are only hashed once fully uploaded, so a duplicate copy is removed afterwards
+            stored_key = find_duplicate_content(sha256)
+            if stored_key is not None and stored_key != s3_key:
+                try:
+                    s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+                    note_duplicate(sha256, s3_key, stored_key, total_bytes, uploaded=True)
+                    return total_bytes, stored_key, sha256
+                except Exception as delete_error:
+                    logger.warning(f"Could not remove duplicate {s3_key}: {delete_error}")
+                    return total_bytes, s3_key, sha256
         
-        # Send email via Gmail SMTP
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
+        register_content(sha256, s3_key, total_bytes)
+        logger.info(f"Streamed {total_bytes} bytes to S3: {s3_key}")
+        return total_bytes, s3_key, sha256
+        
+    except Exception:
+        if upload_id is not None:
+            try:
+                s3_client.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=s3_key, UploadId=upload_id)
+            except Exception as abort_error:
+                logger.warning(f"Could not abort multipart upload for {s3_key}: {abort_error}")
+        raise
+
+
+def stream_to_file(chunks, file_path):
+    """Write an iterable of byte chunks to a local file"""
+    total_bytes = 0
+    with open(file_path, 'wb') as f:
+        for chunk in chunks:
+            if chunk:
+                f.write(chunk)
+                total_bytes += len(chunk)
+    return total_bytes
+
+
+class InvalidPdfError(Exception):
+    """A PDF body failed validation (not a PDF, truncated or short of its Content-Length)"""
+
+
+class PdfStreamValidator:
+    """Chunk iterator that validates a PDF while it streams through.
+    
+    The %PDF- header is checked as soon as the first PDF_HEADER_WINDOW bytes
+    have arrived; the %%EOF trailer (in the last PDF_TRAILER_WINDOW bytes) and
+    the byte count against Content-Length once the body ends. A failure raises
+    InvalidPdfError out of the iteration itself, so the consumer never gets to
+    complete its PUT, multipart upload, shard entry or local file.
+    """
+    
+    def __init__(self, chunks, expected_length=None, source=""):
+        self.chunks = chunks
+        self.expected_length = expected_length
+        self.source = source
+    
+    def _fail(self, reason):
+        raise InvalidPdfError(f"invalid_pdf: {reason} ({self.source})")
+    
+    def _check_header(self):
+        if b"%PDF-" not in self.head:
+            self._fail(f"no %PDF- header in the first {len(self.head)} bytes")
+    
+    def __iter__(self):
+        # Reset per pass: captured bytes are re-read when a streaming upload falls back to a local file
+        self.size = 0
+        self.head = b""
+        self.tail = b""
+        header_checked = False
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            self.size += len(chunk)
+            if not header_checked:
+                self.head += chunk[:PDF_HEADER_WINDOW - len(self.head)]
+                if len(self.head) >= PDF_HEADER_WINDOW:
+                    self._check_header()
+                    header_checked = True
+            if len(chunk) >= PDF_TRAILER_WINDOW:
+                self.tail = chunk[-PDF_TRAILER_WINDOW:]
+            else:
+                self.tail = (self.tail + chunk)[-PDF_TRAILER_WINDOW:]
+            yield chunk
+        
+        if not header_checked:
+            self._check_header()
+        if b"%%EOF" not in self.tail:
+            self._fail(f"no %%EOF trailer after {self.size} bytes, body truncated")
+        if self.expected_length is not None and self.size != self.expected_length:
+            self._fail(f"got {self.size} bytes, Content-Length is {self.expected_length}")
+
+
+def validated_chunks(chunks, expected_length=None, source=""):
+    """Wrap chunks in a PdfStreamValidator unless PDF_VALIDATION is off"""
+    return PdfStreamValidator(chunks, expected_length, source) if PDF_VALIDATION else chunks
+
+
+class ShardWriter:
+    """Packs PDFs into tar shards uploaded as single S3 objects.
+    
+    Each PDF is appended to a local tar in SHARD_SPOOL_DIR and fsynced before
+    add() returns, so a recorded judgment is never only in memory. A full
+    shard is uploaded to shards/scriptNN/<name>.tar together with
+    <name>.tar.idx.json:
+    
+        {"shard": key, "members": {member: {"offset": o, "size": n, "sha256": h}}}
+    
+    where offset is the first byte of the PDF inside the tar, i.e. one PDF is
+    `Range: bytes=o-(o+n-1)` of the shard. Judgments are recorded with the
+    pointer "<shard key>#<member>" and count as uploaded once the shard is in
+    S3. A shard whose upload fails stays on disk and is retried with backoff
+    by the upload retrier; shards left behind by a crash or the end of a run
+    are re-indexed from the tar and uploaded when the writer starts.
+    """
+    
+    def __init__(self, spool_dir=SHARD_SPOOL_DIR):
+        self.spool_dir = spool_dir
+        self.lock = threading.Lock()
+        self.token = os.urandom(4).hex()  # keeps shard names unique across restarts and hosts
+        self.sequence = 0
+        self.tar = None
+        self.file = None
+        self.path = None
+        self.members = {}
+        self.failed = []  # (path, members, attempts, next_attempt_at) of shards whose upload failed
+        os.makedirs(spool_dir, exist_ok=True)
+        self.recover()
+    
+    @staticmethod
+    def shard_key(path):
+        return f"shards/script{SCRIPT_ID:02d}/{os.path.basename(path)}"
+    
+    def _open(self):
+        self.sequence += 1
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.token}-{self.sequence:05d}.tar"
+        self.path = os.path.join(self.spool_dir, name)
+        self.file = open(self.path, 'wb')
+        self.tar = tarfile.open(fileobj=self.file, mode='w', format=tarfile.USTAR_FORMAT)
+        self.members = {}
+    
+    def add(self, chunks, s3_key):
+        """Append one PDF; returns (size_bytes, stored_key, sha256) like stream_to_s3"""
+        member = s3_key[len("judgments/"):] if s3_key.startswith("judgments/") else s3_key
+        hasher = hashlib.sha256()
+        size_bytes = 0
+        with tempfile.SpooledTemporaryFile(max_size=S3_PART_SIZE) as body:
+            for chunk in chunks:
+                if chunk:
+                    body.write(chunk)
+                    hasher.update(chunk)
+                    size_bytes += len(chunk)
+            sha256 = hasher.hexdigest()
+            
+            stored_key = find_duplicate_content(sha256)
+            if stored_key is not None:
+                note_duplicate(sha256, s3_key, stored_key, size_bytes)
+                return size_bytes, stored_key, sha256
+            
+            body.seek(0)
+            with self.lock:
+                if self.tar is None:
+                    self._open()
+                info = tarfile.TarInfo(member)
+                info.size = size_bytes
+                info.mtime = int(time.time())
+                offset = self.tar.offset + len(info.tobuf(self.tar.format, self.tar.encoding, self.tar.errors))
+                self.tar.addfile(info, body)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                
+                self.members[member] = {"offset": offset, "size": size_bytes, "sha256": sha256}
+                stored_key = f"{self.shard_key(self.path)}#{member}"
+                full = len(self.members) >= SHARD_MAX_FILES or self.tar.offset >= SHARD_MAX_BYTES
+                finished = self._close() if full else None
+        
+        # Upload outside the lock so other workers keep appending to the next shard
+        if finished:
+            self.upload(*finished)
+        # Members never exist under their own key; this is the only record of where each one went
+        get_progress_store().record_shard_member(s3_key, stored_key, size_bytes)
+        register_content(sha256, stored_key, size_bytes)
+        return size_bytes, stored_key, sha256
+    
+    def flush(self):
+        """Upload the shard being filled, if any"""
+        with self.lock:
+            finished = self._close() if self.tar is not None else None
+        if finished:
+            self.upload(*finished)
+    
+    def _close(self):
+        """Terminate the current tar and return its (path, members) for upload"""
+        self.tar.close()
+        self.file.close()
+        finished = (self.path, self.members)
+        self.tar = self.file = self.path = None
+        self.members = {}
+        return finished
+    
+    def upload(self, path, members, attempts=0):
+        """Upload a closed shard and its index, then mark its members uploaded.
+        
+        On failure the local files are kept and the shard is scheduled for
+        retry_failed() with exponential backoff.
+        """
+        shard_key = self.shard_key(path)
+        index = {"shard": shard_key, "created": datetime.now().isoformat(), "members": members}
+        index_path = f"{path}.idx.json"
+        try:
+            with open(index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            s3_client.upload_file(path, S3_BUCKET_NAME, shard_key,
+                                  ExtraArgs={'ContentType': 'application/x-tar', 'ChecksumAlgorithm': 'SHA256'})
+            s3_client.upload_file(index_path, S3_BUCKET_NAME, f"{shard_key}.idx.json",
+                                  ExtraArgs={'ContentType': 'application/json'})
+            get_progress_store().mark_shard_uploaded(shard_key)
+        except Exception as e:
+            attempts += 1
+            delay = min(UPLOAD_RETRY_BASE_SECONDS * 2 ** attempts, UPLOAD_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+            with self.lock:
+                self.failed.append((path, members, attempts, time.time() + delay))
+            logger.error(f"Failed to upload shard {shard_key} (attempt {attempts}), next try in {delay:.0f}s: {e}")
+            return False
+        logger.info(f"Uploaded shard {shard_key} ({len(members)} PDFs, {os.path.getsize(path)} bytes)")
+        delete_local_file(path)
+        delete_local_file(index_path)
+        return True
+    
+    def retry_failed(self, now=math.inf):
+        """Upload again the failed shards whose backoff has expired; returns how many are still waiting"""
+        with self.lock:
+            due = [entry for entry in self.failed if entry[3] <= now]
+            self.failed = [entry for entry in self.failed if entry[3] > now]
+        for path, members, attempts, _ in due:
+            self.upload(path, members, attempts)
+        with self.lock:
+            return len(self.failed)
+    
+    def recover(self):
+        """Re-index and upload shards a previous run did not get to upload"""
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.tar'):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            members = {}
+            end = 0
+            try:
+                with tarfile.open(path, mode='r') as tar:
+                    for info in tar:
+                        sha256 = hashlib.sha256(tar.extractfile(info).read()).hexdigest()
+                        members[info.name] = {"offset": info.offset_data, "size": info.size, "sha256": sha256}
+                        end = info.offset_data + -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            except (tarfile.ReadError, EOFError) as e:
+                logger.warning(f"Shard {name} ends in a partial entry, keeping {len(members)} PDFs: {e}")
+            
+            if not members:
+                delete_local_file(path)
+                continue
+            
+            # Cut any partial entry and terminate the archive
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+                f.seek(end)
+                f.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+            logger.info(f"Recovered shard {name} with {len(members)} PDFs")
+            self.upload(path, members)
+
+
+def get_shard_writer():
+    """Create (once) the shard writer, uploading shards left over from a crash"""
+    global shard_writer
+    if shard_writer is None:
+        shard_writer = ShardWriter()
+    return shard_writer
+
+
+# Column types of the Parquet manifests (NDJSON lines carry the same fields)
+MANIFEST_FIELDS = (
+    ("cnr", "string"), ("case_title", "string"), ("judge", "string"), ("court", "string"),
+    ("decision_date", "string"), ("decision_year", "int32"), ("pdf_path", "string"), ("s3_key", "string"),
+    ("uploaded", "bool"), ("size_bytes", "int64"), ("sha256", "string"), ("script_id", "int32"),
+    ("page", "int32"), ("recorded_at", "string"),
+)
+
+
+class ManifestWriter:
+    """Rolling judgment metadata manifest, uploaded to S3 in batches.
+    
+    Records are appended as NDJSON lines to a local file in MANIFEST_SPOOL_DIR
+    (flushed per record). Every MANIFEST_MAX_RECORDS records the file is closed
+    and uploaded to manifests/scriptNN/<name>.ndjson, or <name>.parquet when
+    MANIFEST_FORMAT is 'parquet' and pyarrow is available. Files a previous
+    run did not upload are uploaded when the writer starts.
+    """
+    
+    def __init__(self, spool_dir=MANIFEST_SPOOL_DIR):
+        self.spool_dir = spool_dir
+        self.lock = threading.Lock()
+        self.token = os.urandom(4).hex()
+        self.sequence = 0
+        self.file = None
+        self.path = None
+        self.records = 0
+        os.makedirs(spool_dir, exist_ok=True)
+        self.recover()
+    
+    def _open(self):
+        self.sequence += 1
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self.token}-{self.sequence:05d}.ndjson"
+        self.path = os.path.join(self.spool_dir, name)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.records = 0
+    
+    def add(self, record):
+        """Append one record, uploading the file once it holds MANIFEST_MAX_RECORDS"""
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.records += 1
+            finished = self._close() if self.records >= MANIFEST_MAX_RECORDS else None
+        if finished:
+            self.upload(finished)
+    
+    def flush(self):
+        """Upload the file being filled, if any"""
+        with self.lock:
+            finished = self._close() if self.file is not None else None
+        if finished:
+            self.upload(finished)
+    
+    def _close(self):
+        self.file.close()
+        finished = self.path
+        self.file = self.path = None
+        return finished
+    
+    def upload(self, path):
+        """Upload a closed manifest file; it is kept for the next start if this fails"""
+        if s3_client is None:
+            return False
+        body_path = path
+        try:
+            if MANIFEST_FORMAT == 'parquet' and PYARROW_AVAILABLE:
+                with open(path, encoding='utf-8') as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+                schema = pyarrow.schema([(name, type_name) for name, type_name in MANIFEST_FIELDS])
+                body_path = path[:-len(".ndjson")] + ".parquet"
+                pyarrow.parquet.write_table(pyarrow.Table.from_pylist(records, schema=schema), body_path)
+                content_type = 'application/vnd.apache.parquet'
+            else:
+                content_type = 'application/x-ndjson'
+            key = f"manifests/script{SCRIPT_ID:02d}/{os.path.basename(body_path)}"
+            s3_client.upload_file(body_path, S3_BUCKET_NAME, key, ExtraArgs={'ContentType': content_type})
+            logger.info(f"Uploaded manifest {key}")
+            delete_local_file(path)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to upload manifest {path}, will retry on next start: {e}")
+            return False
+        finally:
+            if body_path != path and os.path.exists(body_path):
+                os.remove(body_path)
+    
+    def recover(self):
+        """Upload manifest files left by a previous run, dropping a torn last line"""
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.ndjson'):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            with open(path, 'r+b') as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+            if os.path.getsize(path) == 0:
+                delete_local_file(path)
+                continue
+            self.upload(path)
+
+
+def get_manifest_writer():
+    """Create (once) the manifest writer, uploading manifests left over from a crash"""
+    global manifest_writer
+    if manifest_writer is None:
+        manifest_writer = ManifestWriter()
+    return manifest_writer
+
+
+def write_manifest_record(judgment, download_result, page):
+    """Append a recorded judgment's metadata to the rolling manifest"""
+    if not MANIFEST_ENABLED:
+        return
+    try:
+        get_manifest_writer().add({
+            "cnr": judgment.get('cnr'),
+            "case_title": judgment.get('case_title'),
+            "judge": judgment.get('judge'),
+            "court": judgment.get('court'),
+            "decision_date": judgment.get('decision_date'),
+            "decision_year": judgment.get('decision_year'),
+            "pdf_path": judgment.get('pdf_path'),
+            # Spooled uploads land on their deterministic key once retried
+            "s3_key": download_result.get('s3_key') or build_s3_key(judgment),
+            "uploaded": bool(download_result.get('uploaded_to_s3')),
+            "size_bytes": download_result.get('size_bytes'),
+            "sha256": download_result.get('sha256'),
+            "script_id": SCRIPT_ID,
+            "page": page,
+            "recorded_at": download_result.get('download_time')
+        })
+    except Exception as e:
+        logger.warning(f"Could not write manifest record for {judgment.get('cnr')}: {e}")
+
+
+def delete_local_file(file_path):
+    """Delete local file after successful upload"""
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            logger.info(f"Deleted local file: {file_path}")
+            return True
+        else:
+            logger.warning(f"File not found for deletion: {file_path}")
+            return False
+    except Exception as e:
+        logger.error(f"Error deleting local file {file_path}: {e}")
+        return False
+
+
+def send_email(subject, body, is_html=False):
+    """Send email notification - DISABLED FOR TESTING"""
+    logger.info(f"EMAIL DISABLED - Would send: {subject}")
+    return False  # Emails disabled
+    if not EMAIL_ENABLED:
+        logger.warning("Email notifications disabled - missing credentials")
+        return False
+    
+    try:
+        # Create message
+        msg = MIMEMultipart('alternative')
+        msg['From'] = EMAIL_HOST_USER
+        msg['To'] = EMAIL_HOST_USER  # Sending to same email
+        msg['Subject'] = f"[Script {SCRIPT_ID}] {subject}"
+        
+        # Attach body
+        if is_html:
+            msg.attach(MIMEText(body, 'html'))
+        else:
+            msg.attach(MIMEText(body, 'plain'))
+        
+        # Send email via Gmail SMTP
+        with smtplib.SMTP('smtp.gmail.com', 587) as server:
+            server.starttls()
+            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
             server.send_message(msg)
         
         logger.info(f"Email sent: {subject}")
@@ -640,6 +2314,110 @@ def load_distributed_config():
         return False
 
 
+# Counts DataTables draw.dt / xhr.dt and jQuery ajaxComplete events on the page
+# (installed once per page load) and returns the current counters
+WAIT_HOOKS_JS = r"""
+var ev = window.__scraperEvents;
+if (!ev || (!ev.hooked && window.jQuery)) {
+    ev = window.__scraperEvents = {draw: 0, xhr: 0, ajax: 0, hooked: false};
+    if (window.jQuery) {
+        jQuery(document).on('draw.dt.scraperWait', function() { ev.draw++; });
+        jQuery(document).on('xhr.dt.scraperWait', function() { ev.xhr++; });
+        jQuery(document).on('ajaxComplete.scraperWait', function() { ev.ajax++; });
+        ev.hooked = true;
+    }
+}
+return {draw: ev.draw, xhr: ev.xhr, ajax: ev.ajax, hooked: ev.hooked};
+"""
+
+# Resolves true as soon as the requested condition holds, false on timeout:
+# a counter ('draw', 'xhr', 'ajax') moving past the snapshot, the PDF viewer
+# getting its data/src ('pdf_object'), or the results table being rendered
+# with the loading overlay gone ('table_ready')
+WAIT_EVENT_JS = r"""
+var kind = arguments[0];
+var since = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = Date.now();
+
+function ready() {
+    if (kind === 'pdf_object') {
+        var nodes = document.querySelectorAll('#viewFiles object, #viewFiles embed, #viewFiles iframe');
+        for (var i = 0; i < nodes.length; i++) {
+            if (nodes[i].getAttribute('data') || nodes[i].getAttribute('src')) return true;
+        }
+        return false;
+    }
+    if (kind === 'table_ready') {
+        var loader = document.getElementById('loadMe');
+        if (loader && window.getComputedStyle(loader).display !== 'none') return false;
+        return !!document.querySelector('#report_body tr');
+    }
+    var ev = window.__scraperEvents;
+    return !!ev && ev[kind] > since;
+}
+
+(function poll() {
+    if (ready()) return done(true);
+    if (Date.now() - start >= timeoutMs) return done(false);
+    setTimeout(poll, 25);
+})();
+"""
+
+
+def record_wait(label, seconds, replaced_sleep):
+    """Add one wait to the per-label histogram and the idle-time-removed tally"""
+    wait_stats.setdefault(label, StreamingStats()).add(seconds)
+    wait_saved_seconds[label] = wait_saved_seconds.get(label, 0.0) + (replaced_sleep - seconds)
+
+
+def page_event_counts():
+    """Install the page event hooks if needed and return the counters (None if unavailable)"""
+    if WAIT_MODE != 'events':
+        return None
+    try:
+        counts = driver.execute_script(WAIT_HOOKS_JS)
+        return counts if counts and counts.get('hooked') else None
+    except Exception as e:
+        logger.debug(f"Could not install page event hooks: {e}")
+        return None
+
+
+def wait_for_page_event(kind, since, fallback_sleep, label, timeout=None):
+    """Wait until the page signals `kind`, or sleep `fallback_sleep` when events are unavailable.
+    
+    Counter kinds ('draw', 'xhr', 'ajax') need the page_event_counts() snapshot
+    taken before the triggering action; 'pdf_object' and 'table_ready' do not.
+    """
+    is_counter = kind in ('draw', 'xhr', 'ajax')
+    if WAIT_MODE != 'events' or (is_counter and since is None):
+        time.sleep(fallback_sleep)
+        return False
+    
+    timeout = timeout or EVENT_WAIT_TIMEOUT
+    wait_start = time.time()
+    try:
+        seen = driver.execute_async_script(WAIT_EVENT_JS, kind, since[kind] if is_counter else 0, int(timeout * 1000))
+    except Exception as e:
+        logger.debug(f"Event wait '{label}' failed, sleeping instead: {e}")
+        time.sleep(fallback_sleep)
+        return False
+    
+    record_wait(label, time.time() - wait_start, fallback_sleep)
+    if not seen:
+        logger.warning(f"Timed out after {timeout}s waiting for {kind} ({label})")
+    return seen
+
+
+def settle(seconds, label):
+    """Fixed settling delay, skipped in event-driven mode where the preceding wait covers it"""
+    if WAIT_MODE == 'events':
+        record_wait(label, 0.0, seconds)
+        return
+    time.sleep(seconds)
+
+
 def extract_total_results():
     """Extract total number of results from the page"""
     try:
@@ -709,6 +2487,7 @@ def navigate_to_specific_page(target_page, max_retries=3):
                 logger.info(f"Using DataTables API to jump directly to page {target_page}")
                 
                 # Execute the page navigation
+                events_before = page_event_counts()
                 script = f"""
                     var table = $('#example_pdf').DataTable();
                     table.page({target_page - 1}).draw('page');
@@ -718,11 +2497,11 @@ def navigate_to_specific_page(target_page, max_retries=3):
                 resulting_page = driver.execute_script(script)
                 
                 # Wait for the table to redraw
-                time.sleep(3)
+                wait_for_page_event('draw', events_before, 3, 'jump_to_page')
                 
                 # Verify the navigation was successful
                 wait.until(EC.presence_of_element_located((By.ID, "report_body")))
-                time.sleep(1)
+                settle(1, 'jump_to_page_render')
                 
                 # Verify current page number
                 actual_page = driver.execute_script("""
@@ -798,15 +2577,16 @@ def navigate_by_clicking(target_page, batch_size=50):
                     return False
                 
                 # Use JavaScript click for reliability
+                events_before = page_event_counts()
                 driver.execute_script("arguments[0].click();", next_button)
                 
                 # Short wait for page transition
-                time.sleep(0.5)
+                wait_for_page_event('draw', events_before, 0.5, 'click_next')
                 
                 # Every 10 clicks, wait for table to fully load
                 if (i + 1) % 10 == 0:
                     wait.until(EC.presence_of_element_located((By.ID, "report_body")))
-                    time.sleep(1)
+                    settle(1, 'click_next_render')
                     logger.info(f"Progress: {clicks_done + i + 1}/{clicks_needed} clicks completed")
                 
             except Exception as click_error:
@@ -817,7 +2597,7 @@ def navigate_by_clicking(target_page, batch_size=50):
         
         # After each batch, ensure table is loaded
         wait.until(EC.presence_of_element_located((By.ID, "report_body")))
-        time.sleep(2)
+        settle(2, 'click_batch_render')
         
         logger.info(f"Batch complete: {clicks_done}/{clicks_needed} clicks done")
     
@@ -956,7 +2736,12 @@ def initialize_browser():
     })
     
     # Set custom user agent to avoid detection
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    chrome_options.add_argument(f'--user-agent={HTTP_USER_AGENT}')
+    
+    if PDF_CAPTURE_MODE == 'cdp' or TABLE_EXTRACT_MODE == 'network':
+        # Network events go to the performance log so responses can be matched to request ids
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
     
     # Create new Chrome instance with enhanced isolation and retry logic
     max_init_attempts = 5
@@ -994,6 +2779,9 @@ def initialize_browser():
             except Exception as stealth_error:
                 logger.warning(f"Could not apply stealth settings: {stealth_error}")
             
+            if PDF_CAPTURE_MODE == 'cdp' or TABLE_EXTRACT_MODE == 'network':
+                enable_network_capture()
+            
             logger.info(f"Chrome instance created successfully for Script {SCRIPT_ID}")
             break
             
@@ -1020,7 +2808,7 @@ def initialize_browser():
        
     try:
         # Navigate to the webpage
-        url = "https://judgments.ecourts.gov.in/pdfsearch/index.php"
+        url = urljoin(ECOURTS_BASE_URL, "index.php")
         logger.info(f"Navigating to {url}")
         driver.get(url)
         
@@ -1039,6 +2827,110 @@ def initialize_browser():
         logger.error(f"An error occurred: {e}")
     
        
+def enable_network_capture():
+    """Let Chrome keep response bodies (PDFs, listing JSON) in its DevTools buffer"""
+    cdp_pdf_responses.clear()
+    cdp_request_urls.clear()
+    cdp_listing_response.clear()
+    try:
+        driver.execute_cdp_cmd('Network.enable', {
+            'maxTotalBufferSize': CDP_BUFFER_SIZE,
+            'maxResourceBufferSize': CDP_BUFFER_SIZE
+        })
+        driver.get_log('performance')  # drop events from browser startup
+        logger.info("CDP network capture enabled")
+    except Exception as e:
+        logger.warning(f"Could not enable CDP network capture, falling back to HTTP downloads and DOM extraction: {e}")
+
+
+def drain_network_events():
+    """Fold Chrome's buffered network events into the PDF response map and the latest listing XHR"""
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        
+        if method == 'Network.responseReceived':
+            response = params.get('response', {})
+            url = response.get('url', '')
+            is_pdf = 'pdf' in response.get('mimeType', '').lower() or url.lower().split('?')[0].endswith('.pdf')
+            if PDF_CAPTURE_MODE == 'cdp' and is_pdf:
+                cdp_pdf_responses[url] = {"request_id": params['requestId'], "finished": False, "failed": False}
+                cdp_request_urls[params['requestId']] = url
+            elif (TABLE_EXTRACT_MODE == 'network' and params.get('type') in ('XHR', 'Fetch')
+                    and ECOURTS_SEARCH_PATH.lstrip('?') in url):
+                cdp_listing_response.clear()
+                cdp_listing_response.update(request_id=params['requestId'], finished=False)
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            request_id = params.get('requestId')
+            url = cdp_request_urls.get(request_id)
+            if url in cdp_pdf_responses:
+                cdp_pdf_responses[url]['finished' if method == 'Network.loadingFinished' else 'failed'] = True
+            elif request_id is not None and request_id == cdp_listing_response.get('request_id'):
+                if method == 'Network.loadingFinished':
+                    cdp_listing_response['finished'] = True
+                else:
+                    cdp_listing_response.clear()
+
+
+def capture_pdf_from_browser(pdf_urls):
+    """Return the PDF bytes Chrome already loaded for one of pdf_urls, or None.
+    
+    Waits up to CDP_CAPTURE_TIMEOUT for the viewer's request to finish and reads
+    its body with Network.getResponseBody, so the file is not fetched twice.
+    """
+    targets = [urljoin(driver.current_url, url) for url in pdf_urls]
+    deadline = time.time() + CDP_CAPTURE_TIMEOUT
+    try:
+        while True:
+            drain_network_events()
+            for target in targets:
+                entry = cdp_pdf_responses.get(target)
+                if entry is None or not (entry['finished'] or entry['failed']):
+                    continue
+                if entry['failed']:
+                    logger.warning(f"Chrome failed to load {target}, downloading it instead")
+                    return None
+                
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': entry['request_id']})
+                pdf_bytes = base64.b64decode(body['body']) if body.get('base64Encoded') else body['body'].encode('latin-1')
+                if pdf_bytes[:4] != b'%PDF':
+                    logger.warning(f"Captured response for {target} is not a PDF, downloading it instead")
+                    return None
+                
+                logger.info(f"Captured {len(pdf_bytes)} PDF bytes from the browser for {target}")
+                return pdf_bytes
+            
+            if time.time() >= deadline:
+                logger.info(f"Chrome did not load the PDF within {CDP_CAPTURE_TIMEOUT}s, downloading it instead")
+                return None
+            time.sleep(0.05)
+    except Exception as e:
+        logger.warning(f"CDP PDF capture failed, downloading instead: {e}")
+        return None
+    finally:
+        # Temporary PDF URLs are single-use, so nothing older is worth keeping
+        cdp_pdf_responses.clear()
+        cdp_request_urls.clear()
+
+
+def capture_pdf(pdf_urls):
+    """Capture the viewer's PDF when PDF_CAPTURE_MODE is 'cdp', counting hits and fallbacks"""
+    if PDF_CAPTURE_MODE != 'cdp':
+        return None
+    
+    pdf_bytes = capture_pdf_from_browser(pdf_urls)
+    if pdf_bytes is None:
+        cdp_capture_stats['fallback'] += 1
+    else:
+        cdp_capture_stats['captured'] += 1
+        cdp_capture_stats['bytes'] += len(pdf_bytes)
+    return pdf_bytes
+
+
 def check_captcha_error():
     """Check if captcha error modal is present"""
     try:
@@ -1075,6 +2967,45 @@ def close_captcha_error_modal():
     return False
 
 
+def solve_captcha_image(image_bytes, media_type="image/png"):
+    """Read the captcha text from image bytes with AWS Bedrock (Claude)"""
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 30,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": base64.b64encode(image_bytes).decode('utf-8')
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": "What text is shown in this image? Only respond with the text—no explanation."
+                    }
+                ]
+            }
+        ]
+    }
+
+    response = bedrock_runtime.invoke_model(
+        modelId="arn:aws:bedrock:ap-south-1:491085399248:inference-profile/apac.anthropic.claude-3-7-sonnet-20250219-v1:0",
+        body=json.dumps(body)
+    )
+
+    result_json = json.loads(response['body'].read())
+    result = result_json['content'][0]['text'].strip()
+    # Remove any newlines or spaces
+    result = result.replace('\n', '').replace(' ', '')
+    logger.info(f"Claude Prediction: {result}")
+    return result
+
+
 def fill_captcha():
     global driver
     if driver is None:
@@ -1105,43 +3036,10 @@ def fill_captcha():
             
             # Use AWS Bedrock (Claude) to solve captcha
             with open(f"captcha_script_{SCRIPT_ID}.png", "rb") as image_file:
-                captcha_base64 = base64.b64encode(image_file.read()).decode('utf-8')
-
-            body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 30,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/png",
-                                    "data": captcha_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": "What text is shown in this image? Only respond with the text—no explanation."
-                            }
-                        ]
-                    }
-                ]
-            }
-
+                captcha_image = image_file.read()
+            
             try:
-                response = bedrock_runtime.invoke_model(
-                    modelId="arn:aws:bedrock:ap-south-1:491085399248:inference-profile/apac.anthropic.claude-3-7-sonnet-20250219-v1:0",
-                    body=json.dumps(body)
-                )
-
-                result_json = json.loads(response['body'].read())
-                result = result_json['content'][0]['text'].strip()
-                # Remove any newlines or spaces
-                result = result.replace('\n', '').replace(' ', '')
-                logger.info(f"Claude Prediction: {result}")
+                result = solve_captcha_image(captcha_image)
             except Exception as bedrock_error:
                 logger.error(f"Bedrock API error: {bedrock_error}")
                 driver.refresh()
@@ -1157,10 +3055,11 @@ def fill_captcha():
             # Submit the captcha
             submit_button = wait.until(EC.presence_of_element_located((By.ID, "main_search")))
             logger.info("Submitting the captcha...")
+            events_before = page_event_counts()
             submit_button.click()
             
-            # Wait a moment for potential error modal
-            time.sleep(2)
+            # Wait for the validation response (and a potential error modal)
+            wait_for_page_event('ajax', events_before, 2, 'captcha_submit')
             
             # Check if captcha error occurred
             if check_captcha_error():
@@ -1176,6 +3075,8 @@ def fill_captcha():
             else:
                 # Captcha seems to be successful
                 logger.info("Captcha submitted successfully")
+                # The authenticated cookies changed - resync the HTTP client lazily
+                invalidate_http_session()
                 return True
                 
         except Exception as e:
@@ -1191,6 +3092,13 @@ def fill_captcha():
     
 
 def wait_for_loading_component():
+    if WAIT_MODE == 'events':
+        # Done as soon as the results table is rendered and the overlay is gone
+        if wait_for_page_event('table_ready', None, 3, 'search_results'):
+            logger.info("Page processing completed.")
+            driver.save_screenshot(f"after_loading_script_{SCRIPT_ID}.png")
+            return
+    
     try:
         # First, wait a moment for the loading to potentially start
         time.sleep(1)
@@ -1231,325 +3139,1027 @@ def set_table_display_count():
         
         # Click on the select element to open dropdown
         select_element.click()
-        time.sleep(1)
+        settle(1, 'page_length_dropdown')
         
         # Find and click the option with value "100"
         option_100 = wait.until(EC.element_to_be_clickable((By.XPATH, "//select[@name='example_pdf_length']/option[@value='100']")))
+        events_before = page_event_counts()
         option_100.click()
         
         logger.info("Successfully set table display count to 100")
         
         # Wait for the table to reload with new data
-        time.sleep(3)
+        wait_for_page_event('draw', events_before, 3, 'page_length_redraw')
         
     except Exception as e:
         logger.error(f"Error setting table display count: {e}")
 
 
-def extract_table_data():
-    """Extract all judgment data from the table"""
-    try:
-        logger.info("Extracting table data...")
-        
-        # Wait for table body to be present
-        table_body = wait.until(EC.presence_of_element_located((By.ID, "report_body")))
-        
-        # Get all rows in the table body
-        rows = table_body.find_elements(By.TAG_NAME, "tr")
-        
-        judgments_data = []
-        
-        for i, row in enumerate(rows):
-            try:
-                # Get the button element with case information
-                button_element = row.find_element(By.CSS_SELECTOR, "button.btn-link")
-                
-                # Extract case title from button text
-                case_title = button_element.find_element(By.TAG_NAME, "font").text.strip()
-                
-                # Extract judge information
-                judge_element = row.find_element(By.XPATH, ".//strong[contains(text(), 'Judge :')]")
-                judge = judge_element.text.replace("Judge :", "").strip()
-                
-                # Extract CNR and other case details
-                case_details_element = row.find_element(By.CLASS_NAME, "caseDetailsTD")
-                case_details_text = case_details_element.text
-                
-                # Parse CNR number
-                cnr_start = case_details_text.find("CNR :") + 6
-                cnr_end = case_details_text.find("|", cnr_start)
-                cnr = case_details_text[cnr_start:cnr_end].strip() if cnr_end != -1 else ""
-                
-                # Parse Decision Date
-                decision_date = ""
-                decision_year = None
-                try:
-                    decision_start = case_details_text.find("Decision Date :") + 16
-                    decision_end = case_details_text.find("|", decision_start)
-                    if decision_end == -1:
-                        decision_end = case_details_text.find("Disposal Nature", decision_start)
-                    
-                    if decision_start > 15 and decision_end > decision_start:
-                        decision_date = case_details_text[decision_start:decision_end].strip()
-                        # Extract year from decision date (format: DD-MM-YYYY)
-                        if len(decision_date) >= 4 and decision_date[-4:].isdigit():
-                            decision_year = int(decision_date[-4:])
-                except Exception as date_error:
-                    logger.debug(f"Error parsing decision date: {date_error}")
-                
-                # Get the onclick attribute to extract PDF path
-                onclick_attr = button_element.get_attribute("onclick")
-                pdf_path = ""
-                if "open_pdf" in onclick_attr:
-                    # Extract PDF path from onclick function
-                    start_idx = onclick_attr.find("'court/")
-                    end_idx = onclick_attr.find("'", start_idx + 1)
-                    if start_idx != -1 and end_idx != -1:
-                        pdf_path = onclick_attr[start_idx+1:end_idx]
-                
-                # Create filename with CNR number and timestamp for uniqueness
-                base_filename = sanitize_filename(case_title)
-                timestamp = int(time.time() * 1000)  # milliseconds for uniqueness
-                
-                # Ensure base_filename is not empty
-                if not base_filename or base_filename == "document":
-                    base_filename = f"judgment_{timestamp}"
-                
-                if cnr:
-                    filename = f"{base_filename}_CNR_{sanitize_filename(cnr)}_{timestamp}.pdf"
-                else:
-                    filename = f"{base_filename}_{timestamp}.pdf"
-                
-                judgment_data = {
-                    "row_number": i + 1,
-                    "case_title": case_title,
-                    "judge": judge,
-                    "cnr": cnr,
-                    "pdf_path": pdf_path,
-                    "button_id": button_element.get_attribute("id"),
-                    "filename": filename,
-                    "decision_date": decision_date,
-                    "decision_year": decision_year
-                }
-                
-                judgments_data.append(judgment_data)
-                logger.info(f"Extracted data for row {i+1}: {case_title[:50]}...")
-                
-            except Exception as e:
-                logger.error(f"Error extracting data from row {i+1}: {e}")
-                continue
-        
-        logger.info(f"Successfully extracted data for {len(judgments_data)} judgments")
-        return judgments_data
-        
-    except Exception as e:
-        logger.error(f"Error extracting table data: {e}")
-        return []
+# Collects the raw fields of every row in #report_body in a single round trip;
+# parsing happens in Python (build_judgment_record)
+EXTRACT_ROWS_JS = r"""
+var body = document.getElementById('report_body');
+if (!body) return null;
+var rows = body.getElementsByTagName('tr');
+var out = [];
+for (var i = 0; i < rows.length; i++) {
+    var row = rows[i];
+    var button = row.querySelector('button.btn-link');
+    var font = button ? button.querySelector('font') : null;
+    var details = row.querySelector('.caseDetailsTD');
+    var judge = '';
+    var strongs = row.getElementsByTagName('strong');
+    for (var j = 0; j < strongs.length; j++) {
+        if (strongs[j].textContent.indexOf('Judge :') !== -1) { judge = strongs[j].innerText; break; }
+    }
+    out.push({
+        index: i,
+        title: font ? font.innerText : null,
+        judge: judge,
+        details: details ? details.innerText : null,
+        onclick: button ? button.getAttribute('onclick') : null,
+        button_id: button ? button.getAttribute('id') : null
+    });
+}
+return out;
+"""
 
 
-def download_pdf(judgment_data):
-    """Download PDF for a specific judgment"""
-    download_start_time = time.time()
+class JudgmentRecord:
+    """One listing row.
+
+    Slotted instead of a dict, with the judge and court strings interned since
+    they repeat across thousands of rows. Supports judgment['cnr'] and
+    judgment.get(...) like the dicts it replaces.
+    """
+
+    __slots__ = ("row_number", "case_title", "judge", "court", "cnr", "pdf_path", "onclick",
+                 "button_id", "filename", "decision_date", "decision_year")
+
+    def __init__(self, row_number=None, case_title="", judge="", court="", cnr="", pdf_path="", onclick="",
+                 button_id=None, filename="", decision_date="", decision_year=None):
+        self.row_number = row_number
+        self.case_title = case_title
+        self.judge = sys.intern(judge)
+        self.court = sys.intern(court)
+        self.cnr = cnr
+        self.pdf_path = pdf_path
+        self.onclick = onclick
+        self.button_id = button_id
+        self.filename = filename
+        self.decision_date = decision_date
+        self.decision_year = decision_year
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+
+def court_from_pdf_path(pdf_path, cnr=""):
+    """Court code of a judgment: the segment after court/cnrorders/ in its PDF path, else the CNR prefix"""
+    parts = pdf_path.split('/')
+    if len(parts) > 2 and parts[0] == 'court':
+        return parts[2]
+    return cnr[:4].lower()
+
+
+def build_judgment_record(row_number, case_title, judge, case_details_text, onclick_attr, button_id):
+    """Parse one table row's raw text/attributes into a judgment record"""
+    case_title = case_title.strip()
+    judge = judge.replace("Judge :", "").strip()
     
+    # Parse CNR number
+    cnr_start = case_details_text.find("CNR :") + 6
+    cnr_end = case_details_text.find("|", cnr_start)
+    cnr = case_details_text[cnr_start:cnr_end].strip() if cnr_end != -1 else ""
+    
+    # Parse Decision Date
+    decision_date = ""
+    decision_year = None
     try:
-        logger.info(f"Downloading PDF for: {judgment_data['case_title'][:50]}...")
-        
-        # First, ensure any existing modal is closed
-        close_any_open_modal()
+        decision_start = case_details_text.find("Decision Date :") + 16
+        decision_end = case_details_text.find("|", decision_start)
+        if decision_end == -1:
+            decision_end = case_details_text.find("Disposal Nature", decision_start)
         
-        # Wait a moment for any modal to fully close
-        time.sleep(1)
-        
-        # Find and click the judgment link with retry logic
-        button_element = driver.find_element(By.ID, judgment_data["button_id"])
-        
-        # Try regular click first
+        if decision_start > 15 and decision_end > decision_start:
+            decision_date = case_details_text[decision_start:decision_end].strip()
+            # Extract year from decision date (format: DD-MM-YYYY)
+            if len(decision_date) >= 4 and decision_date[-4:].isdigit():
+                decision_year = int(decision_date[-4:])
+    except Exception as date_error:
+        logger.debug(f"Error parsing decision date: {date_error}")
+    
+    # Extract PDF path from the onclick attribute
+    pdf_path = ""
+    if "open_pdf" in onclick_attr:
+        start_idx = onclick_attr.find("'court/")
+        end_idx = onclick_attr.find("'", start_idx + 1)
+        if start_idx != -1 and end_idx != -1:
+            pdf_path = onclick_attr[start_idx+1:end_idx]
+    
+    # Create filename with CNR number and timestamp for uniqueness
+    base_filename = sanitize_filename(case_title)
+    timestamp = int(time.time() * 1000)  # milliseconds for uniqueness
+    
+    # Ensure base_filename is not empty
+    if not base_filename or base_filename == "document":
+        base_filename = f"judgment_{timestamp}"
+    
+    if cnr:
+        filename = f"{base_filename}_CNR_{sanitize_filename(cnr)}_{timestamp}.pdf"
+    else:
+        filename = f"{base_filename}_{timestamp}.pdf"
+    
+    return JudgmentRecord(
+        row_number=row_number,
+        case_title=case_title,
+        judge=judge,
+        court=court_from_pdf_path(pdf_path, cnr),
+        cnr=cnr,
+        pdf_path=pdf_path,
+        onclick=onclick_attr,
+        button_id=button_id,
+        filename=filename,
+        decision_date=decision_date,
+        decision_year=decision_year
+    )
+
+
+def extract_table_rows_js():
+    """Extract all rows with one execute_script call; returns None if the script failed"""
+    raw_rows = driver.execute_script(EXTRACT_ROWS_JS)
+    if raw_rows is None:
+        return None
+    
+    judgments_data = []
+    for raw in raw_rows:
+        i = raw['index']
+        # Rows without the case button (e.g. "no records") are skipped like before
+        if raw['title'] is None or raw['details'] is None or not raw['onclick']:
+            logger.error(f"Error extracting data from row {i+1}: incomplete row")
+            continue
+        try:
+            judgments_data.append(build_judgment_record(
+                i + 1, raw['title'], raw['judge'], raw['details'], raw['onclick'], raw['button_id']
+            ))
+        except Exception as e:
+            logger.error(f"Error extracting data from row {i+1}: {e}")
+    return judgments_data
+
+
+def extract_table_rows_network():
+    """Parse the rows from the DataTables JSON Chrome received for the current draw; None if not captured"""
+    drain_network_events()
+    if not cdp_listing_response.get('finished'):
+        return None
+    
+    request_id = cdp_listing_response['request_id']
+    cdp_listing_response.clear()  # each draw's payload is read once
+    body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+    text = base64.b64decode(body['body']).decode('utf-8', errors='replace') if body.get('base64Encoded') else body['body']
+    payload = json.loads(text.lstrip('\ufeff'))
+    rows = payload.get('aaData', payload.get('data')) if isinstance(payload, dict) else None
+    if rows is None:
+        logger.warning(f"Listing response has no rows: {text[:200]}")
+        return None
+    return parse_listing_rows(rows)
+
+
+def extract_table_rows_webdriver(table_body):
+    """Extract all rows element by element (several WebDriver calls per row)"""
+    rows = table_body.find_elements(By.TAG_NAME, "tr")
+    
+    judgments_data = []
+    
+    for i, row in enumerate(rows):
         try:
-            # Scroll to element to ensure it's visible
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button_element)
-            time.sleep(0.5)
+            # Get the button element with case information
+            button_element = row.find_element(By.CSS_SELECTOR, "button.btn-link")
+            case_title = button_element.find_element(By.TAG_NAME, "font").text
+            judge = row.find_element(By.XPATH, ".//strong[contains(text(), 'Judge :')]").text
+            case_details_text = row.find_element(By.CLASS_NAME, "caseDetailsTD").text
             
-            # Wait for element to be clickable
-            wait.until(EC.element_to_be_clickable((By.ID, judgment_data["button_id"])))
-            button_element.click()
+            judgment_data = build_judgment_record(
+                i + 1, case_title, judge, case_details_text,
+                button_element.get_attribute("onclick"), button_element.get_attribute("id")
+            )
+            judgments_data.append(judgment_data)
+            logger.info(f"Extracted data for row {i+1}: {judgment_data['case_title'][:50]}...")
             
-        except Exception as click_error:
-            logger.warning(f"Regular click failed, trying JavaScript click: {click_error}")
-            # Fallback to JavaScript click
-            driver.execute_script("arguments[0].click();", button_element)
+        except Exception as e:
+            logger.error(f"Error extracting data from row {i+1}: {e}")
+            continue
+    
+    return judgments_data
+
+
+def extract_table_data():
+    """Extract all judgment data from the table"""
+    try:
+        logger.info("Extracting table data...")
+        extract_start = time.time()
+        
+        judgments_data = None
+        if TABLE_EXTRACT_MODE == 'network':
+            try:
+                judgments_data = extract_table_rows_network()
+            except Exception as e:
+                logger.warning(f"Could not read the listing JSON: {e}")
+            if judgments_data is None:
+                logger.info("No listing response captured for this draw, reading the rendered table instead")
+        
+        if judgments_data is not None:
+            logger.info(f"Read {len(judgments_data)} judgments from the listing JSON in {time.time() - extract_start:.2f}s")
+            return judgments_data
+        
+        # Wait for table body to be present
+        table_body = wait.until(EC.presence_of_element_located((By.ID, "report_body")))
+        
+        if TABLE_EXTRACT_MODE in ('js', 'network'):
+            try:
+                judgments_data = extract_table_rows_js()
+            except Exception as e:
+                logger.warning(f"Single-call table extraction failed, walking rows instead: {e}")
+        
+        if judgments_data is None:
+            judgments_data = extract_table_rows_webdriver(table_body)
+        
+        logger.info(f"Successfully extracted data for {len(judgments_data)} judgments in {time.time() - extract_start:.2f}s")
+        return judgments_data
+        
+    except Exception as e:
+        logger.error(f"Error extracting table data: {e}")
+        return []
+
+
+# Runs the row's open_pdf(...) handler in the page and resolves with the PDF URL
+# as soon as it is known - either from the AJAX response that open_pdf triggers
+# or from the <object>/<embed> it injects into #viewFiles - then hides the modal
+# again without waiting for it to render.
+OPEN_PDF_JS = r"""
+var onclick = arguments[0];
+var timeoutMs = arguments[1];
+var keepViewer = arguments[2];
+var done = arguments[arguments.length - 1];
+var finished = false;
+var observer = null;
+var timer = null;
+var hasJQuery = typeof window.jQuery !== 'undefined';
+var PDF_RE = /[^"'\s<>]*tmp\/[^"'\s<>]+?\.pdf/i;
+
+function absolute(url) {
+    try { return new URL(url, document.baseURI).href; } catch (e) { return url; }
+}
+
+function finish(url) {
+    if (finished) return;
+    finished = true;
+    if (timer) clearTimeout(timer);
+    if (observer) observer.disconnect();
+    if (hasJQuery) jQuery(document).off('ajaxComplete.scraperPdf');
+    if (hasJQuery && !keepViewer) {
+        try { jQuery('#viewFiles').modal('hide'); } catch (e) {}
+        jQuery('#viewFiles').hide();
+        jQuery('.modal-backdrop').remove();
+        jQuery('body').removeClass('modal-open').css('padding-right', '');
+    }
+    done(url ? absolute(url) : null);
+}
+
+function scanModal() {
+    var root = document.getElementById('viewFiles') || document;
+    var nodes = root.querySelectorAll('object, embed, iframe');
+    for (var i = 0; i < nodes.length; i++) {
+        var url = nodes[i].getAttribute('data') || nodes[i].getAttribute('src');
+        if (url && (url.toLowerCase().indexOf('.pdf') !== -1 || url.toLowerCase().indexOf('pdfsearch/tmp/') !== -1)) {
+            return url;
+        }
+    }
+    return null;
+}
+
+// Drop the previous judgment's viewer so a stale URL is never picked up
+var stale = document.querySelectorAll('#viewFiles object, #viewFiles embed, #viewFiles iframe');
+for (var i = 0; i < stale.length; i++) { stale[i].parentNode.removeChild(stale[i]); }
+
+observer = new MutationObserver(function() {
+    var url = scanModal();
+    if (url) finish(url);
+});
+observer.observe(document.getElementById('viewFiles') || document.body, {
+    childList: true, subtree: true, attributes: true, attributeFilter: ['data', 'src']
+});
+
+if (hasJQuery) {
+    jQuery(document).on('ajaxComplete.scraperPdf', function(evt, xhr) {
+        var text = ((xhr && xhr.responseText) || '').replace(/\\\//g, '/');
+        var match = text.match(PDF_RE);
+        if (match) finish(match[0]);
+    });
+}
+
+timer = setTimeout(function() { finish(null); }, timeoutMs);
+
+try {
+    (new Function(onclick.replace(/^\s*javascript:/i, '')))();
+} catch (e) {
+    finish(null);
+}
+"""
+
+
+def resolve_pdf_url_via_js(judgment_data):
+    """Resolve the temporary PDF URL by running the row's open_pdf handler in-page"""
+    onclick_attr = judgment_data.get('onclick') or ""
+    if "open_pdf" not in onclick_attr:
+        logger.debug("No open_pdf handler recorded for this row")
+        return None
+    
+    try:
+        # With CDP capture the viewer stays open so Chrome loads the PDF for us
+        pdf_url = driver.execute_async_script(OPEN_PDF_JS, onclick_attr, PDF_URL_JS_TIMEOUT * 1000, PDF_CAPTURE_MODE == 'cdp')
+        if pdf_url:
+            logger.info(f"Resolved PDF URL in-page: {pdf_url}")
+        else:
+            logger.warning(f"open_pdf did not produce a PDF URL within {PDF_URL_JS_TIMEOUT}s")
+        return pdf_url
+    except Exception as e:
+        logger.warning(f"In-page PDF URL resolution failed: {e}")
+        return None
+
+
+def invalidate_http_session():
+    """Mark the shared HTTP client's cookies as stale so they are resynced on next use"""
+    global http_session_driver_id
+    http_session_driver_id = None
+
+
+def build_http_session():
+    """Create a keep-alive HTTP client with a connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session():
+    """Return the shared keep-alive HTTP client, syncing cookies only when the browser session changed"""
+    global http_session, http_session_driver_id, http_session_generation, http_credentials
+    
+    if http_session is None:
+        http_session = build_http_session()
+        logger.info(f"Created shared HTTP client (pool size {HTTP_POOL_SIZE})")
+    
+    if http_session_driver_id is None or http_session_driver_id != driver.session_id:
+        # Copy the authenticated cookies, user agent and referer once per browser session
+        http_session.cookies.clear()
+        for cookie in driver.get_cookies():
+            http_session.cookies.set(cookie['name'], cookie['value'])
         
-        # Wait for modal to appear
-        modal = wait.until(EC.visibility_of_element_located((By.ID, "viewFiles")))
-        logger.info("Modal appeared, waiting for PDF to load...")
+        http_session.headers.update({
+            'User-Agent': driver.execute_script("return navigator.userAgent;"),
+            'Referer': driver.current_url
+        })
+        http_session_driver_id = driver.session_id
+        http_session_generation += 1
+        http_credentials = None
+        logger.info(f"Synced {len(http_session.cookies)} cookies from browser session into HTTP client")
+    
+    return http_session
+
+
+def get_http_credentials():
+    """Return a (generation, cookies, headers) snapshot of the shared HTTP client for transfer workers"""
+    global http_credentials
+    
+    session = get_http_session()
+    if http_credentials is None:
+        http_credentials = (
+            http_session_generation,
+            session.cookies.get_dict(),
+            {
+                'User-Agent': session.headers.get('User-Agent'),
+                'Referer': session.headers.get('Referer')
+            }
+        )
+    return http_credentials
+
+
+def fetch_pdf(pdf_url, session=None):
+    """Open a streamed PDF response with the browser's cookies.
+    
+    Returns (response, chunks) where chunks iterates the body with the already
+    inspected first chunk included, or None if the URL did not yield a PDF.
+    """
+    response = None
+    try:
+        if session is None:
+            session = get_http_session()
         
-        # Wait for PDF object to load
-        time.sleep(3)
+        # Construct full URL if needed
+        if pdf_url.startswith('/'):
+            base_url = "https://services.ecourts.gov.in"
+            pdf_url = base_url + pdf_url
+        elif not pdf_url.startswith('http'):
+            # Handle relative URLs
+            base_url = "https://services.ecourts.gov.in"
+            pdf_url = base_url + "/" + pdf_url
         
-        # New approach: Look for object/embed tags with multiple selectors
-        pdf_downloaded_success = False
-        response = None
+        logger.info(f"Attempting to download from: {pdf_url}")
+        response = session.get(pdf_url, timeout=HTTP_TIMEOUT, stream=True)
         
+        if response.status_code == 200:
+            # Check if response is actually a PDF, looking only at the first chunk
+            content_type = response.headers.get('content-type', '').lower()
+            content_length = response.headers.get('content-length', 'unknown')
+            is_pdf_content = content_type.startswith('application/pdf')
+            chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            first_chunk = next(chunks, b'')
+            has_pdf_signature = first_chunk[:4] == b'%PDF'
+            
+            if is_pdf_content or has_pdf_signature:
+                logger.info(f"Opened PDF stream (Content-Length: {content_length})")
+                # requests decodes gzip/deflate bodies, so only an identity body can be held to Content-Length
+                identity = response.headers.get('content-encoding', 'identity').lower() in ('', 'identity')
+                expected_length = int(content_length) if identity and content_length.isdigit() else None
+                return response, validated_chunks(itertools.chain([first_chunk], chunks), expected_length, pdf_url)
+            else:
+                logger.error(f" Invalid PDF content - Content-Type: {content_type}, Content-Length: {content_length}")
+                logger.error(f" URL: {pdf_url}")
+                if len(first_chunk) < 1000:
+                    logger.error(f" Response preview: {first_chunk[:500].decode('utf-8', errors='replace')}")
+        else:
+            logger.error(f" HTTP {response.status_code} for URL: {pdf_url}")
+            logger.error(f" Response headers: {dict(response.headers)}")
+            
+    except Exception as obj_download_error:
+        logger.error(f"Error downloading from object: {str(obj_download_error)}")
+    
+    if response is not None:
+        response.close()
+    return None
+
+
+# Candidate viewer selectors for the modal path, most specific first; the probe
+# reorders them by how often each has found the PDF
+MODAL_PDF_SELECTORS = (
+    "object[data*='.pdf']",
+    "object[type='application/pdf']",
+    "embed[src*='.pdf']",
+    "embed[type='application/pdf']",
+    "#viewFiles-body object",
+    "#viewFiles-body embed",
+    "object",
+    "embed"
+)
+
+# Evaluates every selector in one call and returns the visible PDF URLs in
+# selector order plus the selectors that produced one
+MODAL_PDF_PROBE_JS = r"""
+var selectors = arguments[0];
+var urls = [];
+var matched = [];
+for (var s = 0; s < selectors.length; s++) {
+    var nodes;
+    try { nodes = document.querySelectorAll(selectors[s]); } catch (e) { continue; }
+    var hit = false;
+    for (var i = 0; i < nodes.length; i++) {
+        var node = nodes[i];
+        if (!(node.offsetWidth || node.offsetHeight || node.getClientRects().length)) continue;
+        var url = node.getAttribute('data') || node.getAttribute('src');
+        if (!url) continue;
+        var lower = url.toLowerCase();
+        if (lower.indexOf('.pdf') === -1 && lower.indexOf('pdfsearch/tmp/') === -1) continue;
+        hit = true;
+        if (urls.indexOf(url) === -1) urls.push(url);
+    }
+    if (hit) matched.push(selectors[s]);
+}
+return {urls: urls, matched: matched};
+"""
+
+
+def ordered_modal_selectors():
+    """MODAL_PDF_SELECTORS with the ones that found the PDF most often first"""
+    hits = modal_selector_stats['hits']
+    return sorted(MODAL_PDF_SELECTORS, key=lambda selector: -hits.get(selector, 0))
+
+
+def probe_modal_pdf_urls_webdriver(selectors):
+    """Walk the selectors element by element (several WebDriver calls per match)"""
+    pdf_urls = []
+    matched = []
+    for selector in selectors:
         try:
-            pdf_selectors = [
-                "object[data*='.pdf']",
-                "object[type='application/pdf']", 
-                "embed[src*='.pdf']",
-                "embed[type='application/pdf']",
-                "#viewFiles-body object",
-                "#viewFiles-body embed",
-                "object",
-                "embed"
-            ]
-            
-            for selector in pdf_selectors:
-                try:
-                    pdf_objects = driver.find_elements(By.CSS_SELECTOR, selector)
-                    logger.info(f"Found {len(pdf_objects)} objects with selector: {selector}")
-                    
-                    for obj in pdf_objects:
-                        if obj.is_displayed():
-                            # Check both 'data' and 'src' attributes
-                            pdf_url = obj.get_attribute("data") or obj.get_attribute("src")
-                            
-                            if not pdf_url:
-                                logger.warning(f"No URL found for displayed object with selector: {selector}")
-                                continue
-                            
-                            logger.info(f"Object URL: {pdf_url}")
-                            
-                            if pdf_url and (".pdf" in pdf_url.lower() or "pdfsearch/tmp/" in pdf_url.lower()):
-                                # Get cookies and headers
-                                cookies = driver.get_cookies()
-                                session = requests.Session()
-                                for cookie in cookies:
-                                    session.cookies.set(cookie['name'], cookie['value'])
-                                
-                                headers = {
-                                    'User-Agent': driver.execute_script("return navigator.userAgent;"),
-                                    'Referer': driver.current_url
-                                }
-                                
-                                try:
-                                    # Construct full URL if needed
-                                    if pdf_url.startswith('/'):
-                                        base_url = "https://services.ecourts.gov.in"
-                                        pdf_url = base_url + pdf_url
-                                    elif not pdf_url.startswith('http'):
-                                        # Handle relative URLs
-                                        base_url = "https://services.ecourts.gov.in"
-                                        pdf_url = base_url + "/" + pdf_url
-                                    
-                                    logger.info(f"Attempting to download from: {pdf_url}")
-                                    response = session.get(pdf_url, timeout=30, headers=headers)
-                                    
-                                    if response.status_code == 200:
-                                        # Check if response is actually a PDF
-                                        content_type = response.headers.get('content-type', '').lower()
-                                        is_pdf_content = content_type.startswith('application/pdf')
-                                        has_pdf_signature = response.content[:4] == b'%PDF'
-                                        
-                                        if is_pdf_content or has_pdf_signature:
-                                            logger.info(f"Successfully fetched PDF content ({len(response.content)} bytes)")
-                                            pdf_downloaded_success = True
-                                            break
-                                        else:
-                                            logger.error(f" Invalid PDF content - Content-Type: {content_type}, Size: {len(response.content)} bytes")
-                                            logger.error(f" URL: {pdf_url}")
-                                            if len(response.content) < 1000:
-                                                logger.error(f" Response preview: {response.text[:500]}")
-                                    else:
-                                        logger.error(f" HTTP {response.status_code} for URL: {pdf_url}")
-                                        logger.error(f" Response headers: {dict(response.headers)}")
-                                        
-                                except Exception as obj_download_error:
-                                    logger.error(f"Error downloading from object: {str(obj_download_error)}")
-                                    continue
-                    
-                    if pdf_downloaded_success:
+            for obj in driver.find_elements(By.CSS_SELECTOR, selector):
+                if obj.is_displayed():
+                    # Check both 'data' and 'src' attributes
+                    pdf_url = obj.get_attribute("data") or obj.get_attribute("src")
+                    if pdf_url and (".pdf" in pdf_url.lower() or "pdfsearch/tmp/" in pdf_url.lower()):
+                        if selector not in matched:
+                            matched.append(selector)
+                        if pdf_url not in pdf_urls:
+                            pdf_urls.append(pdf_url)
+        except Exception as selector_error:
+            logger.debug(f"Selector {selector} failed: {str(selector_error)}")
+    return {"urls": pdf_urls, "matched": matched}
+
+
+def probe_modal_pdf_urls():
+    """Return the visible PDF URLs in the modal, best selector first, and update the selector hit counts"""
+    selectors = ordered_modal_selectors()
+    try:
+        result = driver.execute_script(MODAL_PDF_PROBE_JS, list(selectors))
+    except Exception as e:
+        logger.warning(f"Modal probe script failed, checking selectors one by one: {e}")
+        result = None
+    if result is None:
+        result = probe_modal_pdf_urls_webdriver(selectors)
+    
+    modal_selector_stats['probes'] += 1
+    hits = modal_selector_stats['hits']
+    for selector in result.get('matched', []):
+        hits[selector] = hits.get(selector, 0) + 1
+    
+    pdf_urls = result.get('urls', [])
+    if pdf_urls:
+        logger.info(f"Modal PDF URL: {pdf_urls[0]} (selector {result['matched'][0]})")
+    return pdf_urls
+
+
+def resolve_pdf_urls_via_modal(judgment_data):
+    """Open the viewFiles modal for a judgment and return the candidate PDF URLs it displays"""
+    # First, ensure any existing modal is closed
+    close_any_open_modal()
+    
+    # Wait a moment for any modal to fully close
+    settle(1, 'modal_close')
+    
+    # Drop the previous judgment's viewer so the wait below cannot match it
+    if WAIT_MODE == 'events':
+        driver.execute_script(
+            "document.querySelectorAll('#viewFiles object, #viewFiles embed, #viewFiles iframe')"
+            ".forEach(function(n) { n.parentNode.removeChild(n); });"
+        )
+    
+    # Find and click the judgment link with retry logic
+    button_element = driver.find_element(By.ID, judgment_data["button_id"])
+    
+    # Try regular click first
+    try:
+        # Scroll to element to ensure it's visible
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button_element)
+        settle(0.5, 'scroll_into_view')
+        
+        # Wait for element to be clickable
+        wait.until(EC.element_to_be_clickable((By.ID, judgment_data["button_id"])))
+        button_element.click()
+        
+    except Exception as click_error:
+        logger.warning(f"Regular click failed, trying JavaScript click: {click_error}")
+        # Fallback to JavaScript click
+        driver.execute_script("arguments[0].click();", button_element)
+    
+    # Wait for modal to appear
+    modal = wait.until(EC.visibility_of_element_located((By.ID, "viewFiles")))
+    logger.info("Modal appeared, waiting for PDF to load...")
+    
+    # Wait for the PDF object to get its data URL
+    wait_for_page_event('pdf_object', None, 3, 'pdf_object')
+    
+    # Look for object/embed tags with all candidate selectors in one round trip
+    pdf_urls = probe_modal_pdf_urls()
+    
+    if not pdf_urls:
+        logger.error(f" FAILED: Could not find a PDF URL using any selector")
+        logger.error(f" Tried {len(MODAL_PDF_SELECTORS)} different selectors")
+        logger.error(f" Case: {judgment_data.get('case_title', 'Unknown')[:100]}")
+        raise Exception("Could not download PDF using any selector")
+    
+    return pdf_urls
+
+
+def resolve_pdf_urls(judgment_data):
+    """Use the browser to find candidate PDF URLs for a judgment.
+    
+    Returns (pdf_urls, used_modal). Tries the in-page open_pdf call first when
+    PDF_URL_MODE is 'js' and falls back to the viewFiles modal.
+    """
+    if PDF_URL_MODE == 'js':
+        pdf_url = resolve_pdf_url_via_js(judgment_data)
+        if pdf_url:
+            return [pdf_url], False
+        logger.warning("In-page resolution did not yield a PDF URL, falling back to modal")
+    
+    return resolve_pdf_urls_via_modal(judgment_data), True
+
+
+def open_pdf_stream(pdf_urls, session=None):
+    """Open a stream for the first candidate URL that yields a PDF, or None"""
+    for pdf_url in pdf_urls:
+        fetched = fetch_pdf(pdf_url, session)
+        if fetched is not None:
+            return fetched
+    return None
+
+
+def transfer_pdf_stream(response, chunks, safe_filename, s3_key, session=None):
+    """Move an opened PDF stream to its destination.
+    
+    Streams straight into S3 when possible; otherwise (or if the S3 upload
+    fails) the PDF is written to the script directory and uploaded from there.
+    Returns (stored_key, size_bytes, upload_success, sha256).
+    """
+    if OUTPUT_MODE == 'shards' and s3_client is not None:
+        try:
+            size_bytes, stored_key, sha256 = get_shard_writer().add(chunks, s3_key)
+            return stored_key, size_bytes, True, sha256
+        finally:
+            response.close()
+    
+    if TRANSFER_MODE == 'stream' and s3_client is not None:
+        try:
+            size_bytes, stored_key, sha256 = stream_to_s3(chunks, s3_key)
+            return stored_key, size_bytes, True, sha256
+        except InvalidPdfError:
+            response.close()
+            raise
+        except Exception as stream_error:
+            logger.error(f"Streaming upload failed for {s3_key}: {stream_error}")
+            logger.info("Falling back to local download for this file")
+            response.close()
+            fetched = fetch_pdf(response.url, session)
+            if fetched is None:
+                raise
+            response, chunks = fetched
+    
+    try:
+        # Save the PDF locally first
+        size_bytes = stream_to_file(chunks, safe_filename)
+    except InvalidPdfError:
+        delete_local_file(safe_filename)
+        raise
+    finally:
+        response.close()
+    
+    upload_success, stored_key, sha256 = upload_local_pdf(safe_filename, s3_key, size_bytes)
+    return stored_key, size_bytes, upload_success, sha256
+
+
+def upload_local_pdf(safe_filename, s3_key, size_bytes):
+    """Upload a PDF saved in the script directory, unless its content is already stored, and delete it once done.
+    
+    Returns (upload_success, stored_key, sha256).
+    """
+    logger.info(f"Successfully downloaded: {safe_filename}")
+    sha256 = file_sha256(safe_filename)
+    stored_key = find_duplicate_content(sha256)
+    if stored_key is not None:
+        note_duplicate(sha256, s3_key, stored_key, size_bytes)
+        delete_local_file(safe_filename)
+        return True, stored_key, sha256
+    
+    upload_success = upload_to_s3(safe_filename, s3_key, sha256)
+    
+    # Delete local file after successful upload
+    if upload_success:
+        register_content(sha256, s3_key, size_bytes)
+        delete_local_file(safe_filename)
+    elif s3_client is not None:
+        spool_failed_upload(safe_filename, s3_key, sha256, size_bytes)
+    else:
+        logger.warning(f"Failed to upload to S3, keeping local file: {safe_filename}")
+    
+    return upload_success, s3_key, sha256
+
+
+def spool_failed_upload(safe_filename, s3_key, sha256, size_bytes):
+    """Move a PDF whose upload failed into the spool.
+    
+    It is queued for the upload retrier when its result is recorded (see
+    take_spooled_upload), together with the download row the retry completes.
+    """
+    spool_path = os.path.join(UPLOAD_SPOOL_DIR, os.path.basename(safe_filename))
+    try:
+        os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+        os.replace(safe_filename, spool_path)
+    except Exception as e:
+        logger.error(f"Could not spool {safe_filename} for retry, keeping local file: {e}")
+        return
+    with spooled_uploads_lock:
+        spooled_uploads[s3_key] = {"file_path": spool_path, "s3_key": s3_key, "sha256": sha256,
+                                   "size_bytes": size_bytes}
+    logger.warning(f"Failed to upload to S3, spooled for retry: {spool_path}")
+
+
+def take_spooled_upload(judgment):
+    """Claim the spool entry left by this judgment's transfer, if its upload failed"""
+    with spooled_uploads_lock:
+        return spooled_uploads.pop(build_s3_key(judgment), None)
+
+
+def enforce_spool_limit(keep_path=None):
+    """Evict the oldest spooled PDFs while the spool is over UPLOAD_SPOOL_MAX_MB (never keep_path)"""
+    store = get_progress_store()
+    while store.upload_queue_stats()["bytes"] > UPLOAD_SPOOL_MAX_MB * 1024 * 1024:
+        oldest = store.oldest_upload()
+        if oldest is None or oldest["file_path"] == keep_path:
+            return
+        logger.warning(f"Upload spool over {UPLOAD_SPOOL_MAX_MB} MB, evicting {oldest['file_path']} "
+                       f"(queued {oldest['queued_at']}); its judgment goes back to the failed-download retries")
+        evict_spooled_upload(oldest, "Evicted from upload spool before it could be uploaded")
+        delete_local_file(oldest["file_path"])
+
+
+def evict_spooled_upload(entry, reason):
+    """Give up on a queued upload: its download row becomes a failed download for the retry pass"""
+    global total_files_downloaded
+    if get_progress_store().evict_upload(entry, reason, failure_retry_at('upload', 1)):
+        total_files_downloaded = max(total_files_downloaded - 1, 0)
+        if completed_judgments is not None:
+            completed_judgments.discard(JudgmentRecord.from_dict(json.loads(entry["judgment_json"])))
+
+
+def retry_spooled_upload(entry):
+    """One retry of a queued upload: upload (or dedupe) it, else back off exponentially.
+    
+    Returns True once the entry has left the queue.
+    """
+    store = get_progress_store()
+    if not os.path.exists(entry["file_path"]):
+        logger.warning(f"Spooled file {entry['file_path']} is gone; its judgment goes back to the failed-download retries")
+        evict_spooled_upload(entry, "Spooled file missing before it could be uploaded")
+        return True
+    
+    stored_key = find_duplicate_content(entry["sha256"]) if entry["sha256"] else None
+    if stored_key is not None:
+        note_duplicate(entry["sha256"], entry["s3_key"], stored_key, entry["size_bytes"])
+    elif upload_to_s3(entry["file_path"], entry["s3_key"], entry["sha256"]):
+        stored_key = entry["s3_key"]
+        register_content(entry["sha256"], stored_key, entry["size_bytes"])
+    
+    if stored_key is not None:
+        store.complete_upload(entry, stored_key)
+        delete_local_file(entry["file_path"])
+        logger.info(f"Spooled upload of {entry['filename']} succeeded after {entry['attempts'] + 1} retries")
+        return True
+    
+    attempts = entry["attempts"] + 1
+    delay = min(UPLOAD_RETRY_BASE_SECONDS * 2 ** attempts, UPLOAD_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+    store.reschedule_upload(entry["id"], attempts, time.time() + delay, "upload failed")
+    logger.info(f"Spooled upload of {entry['filename']} failed (attempt {attempts}), next try in {delay:.0f}s")
+    return False
+
+
+class UploadRetrier:
+    """Background thread that re-uploads spooled PDFs from the upload_queue table
+    and shards whose upload failed.
+    
+    The first pass runs at once over every queued entry, whatever its backoff,
+    so uploads left by an earlier run are drained at startup.
+    """
+    
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"upload-retrier-{SCRIPT_ID}", daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        pending = get_progress_store().upload_queue_stats()["pending"]
+        if pending:
+            logger.info(f"Draining {pending} spooled uploads left by an earlier run")
+        now = math.inf
+        while not self.stop_event.is_set():
+            try:
+                for entry in get_progress_store().due_uploads(now):
+                    if self.stop_event.is_set() or not retry_spooled_upload(entry):
+                        # S3 is still failing; leave the rest to their own backoff
                         break
-                except Exception as selector_error:
-                    logger.debug(f"Selector {selector} failed: {str(selector_error)}")
-                    continue
-            
-            if not pdf_downloaded_success:
-                logger.error(f" FAILED: Could not download PDF using any selector")
-                logger.error(f" Tried {len(pdf_selectors)} different selectors")
-                logger.error(f" Case: {judgment_data.get('case_title', 'Unknown')[:100]}")
-                raise Exception("Could not download PDF using any selector")
-                
-        except Exception as e:
-            logger.error(f" Error in PDF download approach: {e}")
-            logger.error(f" Case: {judgment_data.get('case_title', 'Unknown')[:100]}")
+                if shard_writer is not None:
+                    shard_writer.retry_failed(now)
+            except Exception as e:
+                logger.error(f"Upload retrier pass failed: {e}")
+            self.stop_event.wait(UPLOAD_RETRY_INTERVAL)
+            now = time.time()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=HTTP_TIMEOUT)
+
+
+def s3_key_partition(name, year=None, court=None, cnr=""):
+    """Render S3_KEY_LAYOUT for an object called name ('' when the layout is flat)"""
+    fields = {
+        "year": str(year) if year else "unknown",
+        "court": sanitize_filename(court) if court else "unknown",
+        "court_code": sanitize_filename(cnr[:4].lower()) if cnr else "unknown",
+        "shard": hashlib.blake2b(name.encode('utf-8'), digest_size=1).hexdigest()
+    }
+    try:
+        partition = S3_KEY_LAYOUT.format(**fields)
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"S3_KEY_LAYOUT {S3_KEY_LAYOUT!r} uses an unknown token {e}") from None
+    return "/".join(part for part in partition.split("/") if part)
+
+
+def build_s3_key(judgment_data):
+    """Deterministic S3 key judgments/<S3_KEY_LAYOUT>/<CNR>-<hash(pdf_path)>.pdf.
+    
+    Depends only on the judgment itself (no timestamp or script id), so a retry,
+    resume or another script lands on the same object.
+    """
+    cnr = sanitize_filename(judgment_data.get('cnr') or judgment_data['case_title'])
+    source = judgment_data.get('pdf_path') or judgment_data['case_title']
+    name = f"{cnr}-{hashlib.blake2b(source.encode('utf-8'), digest_size=6).hexdigest()}"
+    partition = s3_key_partition(name, judgment_data.get('decision_year'), judgment_data.get('court'),
+                                 judgment_data.get('cnr') or "")
+    return f"judgments/{partition}/{name}.pdf" if partition else f"judgments/{name}.pdf"
+
+
+def find_uploaded_pdf(s3_key):
+    """Return the size of s3_key if it already exists in the bucket, else None"""
+    if s3_client is None:
+        return None
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=s3_key)['ContentLength']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            logger.warning(f"Could not check whether {s3_key} exists: {e}")
+    except Exception as e:
+        logger.warning(f"Could not check whether {s3_key} exists: {e}")
+    return None
+
+
+def already_uploaded_result(judgment_data, start_time):
+    """Download result for a judgment whose PDF is already in S3, or None if it still has to be fetched.
+    
+    Checked before the PDF URL is resolved, so a re-run costs one HEAD request
+    per judgment and no open_pdf call, download or PUT. In shard mode the local
+    store answers and no request is made.
+    """
+    s3_key = build_s3_key(judgment_data)
+    pointer = get_progress_store().find_pointer(s3_key) if DEDUPE_ENABLED else None
+    if pointer is None and OUTPUT_MODE == 'shards':
+        # Shard members never exist under their own key, so only the local store can tell
+        pointer = get_progress_store().find_stored(s3_key)
+    if pointer is not None:
+        # Deduplicated or packed into a shard earlier: the content lives under another key
+        s3_key, size_bytes = pointer
+    elif OUTPUT_MODE == 'shards':
+        size_bytes = None
+    else:
+        size_bytes = find_uploaded_pdf(s3_key)
+    if size_bytes is None:
+        return None
+    
+    logger.info(f"Already in S3, skipping download: {s3_key}")
+    result = build_download_result(judgment_data, s3_key, size_bytes, True, time.time() - start_time)
+    result["already_uploaded"] = True
+    return result
+
+
+def transfer_pdf(pdf_urls, judgment_data, session=None):
+    """Fetch a judgment's PDF from one of its candidate URLs and store it.
+    
+    Returns (s3_key, size_bytes, upload_success, sha256); raises if no URL yields a PDF.
+    """
+    fetched = open_pdf_stream(pdf_urls, session)
+    if fetched is None:
+        raise Exception("Could not download PDF from any resolved URL")
+    response, chunks = fetched
+    
+    # Use the sanitized case title as the local filename
+    safe_filename = judgment_data['filename']
+    s3_key = build_s3_key(judgment_data)
+    
+    return transfer_pdf_stream(response, chunks, safe_filename, s3_key, session)
+
+
+def transfer_pdf_bytes(pdf_bytes, judgment_data):
+    """Store a PDF already captured from the browser.
+    
+    Returns (s3_key, size_bytes, upload_success, sha256) like transfer_pdf.
+    """
+    safe_filename = judgment_data['filename']
+    s3_key = build_s3_key(judgment_data)
+    chunks = validated_chunks([pdf_bytes], source="captured from the browser")
+    
+    if OUTPUT_MODE == 'shards' and s3_client is not None:
+        size_bytes, stored_key, sha256 = get_shard_writer().add(chunks, s3_key)
+        return stored_key, size_bytes, True, sha256
+    
+    if TRANSFER_MODE == 'stream' and s3_client is not None:
+        try:
+            size_bytes, stored_key, sha256 = stream_to_s3(chunks, s3_key)
+            return stored_key, size_bytes, True, sha256
+        except InvalidPdfError:
             raise
+        except Exception as stream_error:
+            logger.error(f"Streaming upload failed for {s3_key}: {stream_error}")
+            logger.info("Falling back to local file for this PDF")
+    
+    try:
+        size_bytes = stream_to_file(chunks, safe_filename)
+    except InvalidPdfError:
+        delete_local_file(safe_filename)
+        raise
+    upload_success, stored_key, sha256 = upload_local_pdf(safe_filename, s3_key, size_bytes)
+    return stored_key, size_bytes, upload_success, sha256
+
+
+def build_download_result(judgment_data, s3_key, size_bytes, upload_success, download_duration, stage_seconds=None,
+                          sha256=None):
+    """Build the success record stored in progress for a downloaded judgment"""
+    return {
+        "success": True,
+        "filename": judgment_data['filename'],
+        "s3_key": s3_key if upload_success else None,
+        "uploaded_to_s3": upload_success,
+        "size_bytes": size_bytes,
+        "sha256": sha256,
+        "cnr": judgment_data['cnr'],
+        "case_title": judgment_data['case_title'],
+        "decision_date": judgment_data.get('decision_date', ''),
+        "decision_year": judgment_data.get('decision_year'),
+        "download_time": datetime.now().isoformat(),
+        "download_duration_seconds": round(download_duration, 2),
+        "stage_seconds": stage_seconds or {}
+    }
+
+
+def download_pdf(judgment_data, direct=False):
+    """Download PDF for a specific judgment.
+    
+    direct resolves the URL only through the row's stored open_pdf handler, for
+    retries of rows that are not on the current listing page.
+    """
+    download_start_time = time.time()
+    
+    try:
+        logger.info(f"Downloading PDF for: {judgment_data['case_title'][:50]}...")
         
-        if response and response.status_code == 200:
-            # Use the sanitized case title as filename
-            safe_filename = judgment_data['filename']
-            
-            # Save the PDF locally first
-            with open(safe_filename, 'wb') as f:
-                f.write(response.content)
-            
-            logger.info(f"Successfully downloaded: {safe_filename}")
-            
-            # Upload to S3 with new path structure: /judgments/(filename_scriptno)
-            # Extract base filename without extension and add script ID
-            base_name = os.path.splitext(safe_filename)[0]
-            file_extension = os.path.splitext(safe_filename)[1]
-            s3_filename = f"{base_name}_{SCRIPT_ID:02d}{file_extension}"
-            s3_key = f"judgments/{s3_filename}"
-            upload_success = upload_to_s3(safe_filename, s3_key)
-            
-            # Delete local file after successful upload
-            if upload_success:
-                delete_local_file(safe_filename)
+        existing = already_uploaded_result(judgment_data, download_start_time)
+        if existing is not None:
+            return existing
+        
+        if direct:
+            pdf_url = resolve_pdf_url_via_js(judgment_data)
+            if not pdf_url:
+                raise Exception("open_pdf did not yield a PDF URL")
+            pdf_urls, used_modal = [pdf_url], False
+        else:
+            pdf_urls, used_modal = resolve_pdf_urls(judgment_data)
+        pdf_bytes = capture_pdf(pdf_urls)
+        resolve_seconds = time.time() - download_start_time
+        
+        try:
+            if pdf_bytes is not None:
+                s3_key, size_bytes, upload_success, sha256 = transfer_pdf_bytes(pdf_bytes, judgment_data)
             else:
-                logger.warning(f"Failed to upload to S3, keeping local file: {safe_filename}")
-            
-            # Calculate download time
-            download_end_time = time.time()
-            download_duration = download_end_time - download_start_time
-            
+                s3_key, size_bytes, upload_success, sha256 = transfer_pdf(pdf_urls, judgment_data)
+        except Exception:
+            if used_modal or direct:
+                raise
+            # The in-page URL did not work out - give the modal a chance
+            logger.warning("In-page URL did not yield a PDF, falling back to modal")
+            used_modal = True
+            s3_key, size_bytes, upload_success, sha256 = transfer_pdf(resolve_pdf_urls_via_modal(judgment_data),
+                                                                      judgment_data)
+        
+        # Calculate download time
+        download_end_time = time.time()
+        download_duration = download_end_time - download_start_time
+        
+        if used_modal or PDF_CAPTURE_MODE == 'cdp':
             # Close the modal
             if not close_any_open_modal():
                 logger.warning("Failed to close modal properly")
             
             # Additional wait to ensure modal is fully closed
-            time.sleep(1)
-            
-            # Return success info for tracking
-            return {
-                "success": True,
-                "filename": safe_filename,
-                "s3_key": s3_key if upload_success else None,
-                "uploaded_to_s3": upload_success,
-                "cnr": judgment_data['cnr'],
-                "case_title": judgment_data['case_title'],
-                "decision_date": judgment_data.get('decision_date', ''),
-                "decision_year": judgment_data.get('decision_year'),
-                "download_time": datetime.now().isoformat(),
-                "download_duration_seconds": round(download_duration, 2)
-            }
-        else:
-            logger.error(f" DOWNLOAD FAILED for: {judgment_data['case_title'][:50]}")
-            logger.error(f" Status code: {response.status_code if response else 'No response'}")
-            logger.error(f" CNR: {judgment_data.get('cnr', 'N/A')}")
-            if response:
-                logger.error(f" Response size: {len(response.content)} bytes")
-                logger.error(f" Content-Type: {response.headers.get('content-type', 'Unknown')}")
-            download_end_time = time.time()
-            download_duration = download_end_time - download_start_time
-            
-            # Close the modal
-            close_any_open_modal()
-            time.sleep(1)
-            
-            return {
-                "success": False,
-                "error": f"HTTP {response.status_code}" if response else "No response",
-                "case_title": judgment_data['case_title'],
-                "download_duration_seconds": round(download_duration, 2)
-            }
+            settle(1, 'modal_close')
+        
+        # Return success info for tracking
+        stage_seconds = {"resolve": resolve_seconds, "transfer": download_duration - resolve_seconds}
+        return build_download_result(judgment_data, s3_key, size_bytes, upload_success, download_duration, stage_seconds,
+                                     sha256)
         
     except Exception as e:
         logger.error(f" EXCEPTION during PDF download")
@@ -1572,6 +4182,167 @@ def download_pdf(judgment_data):
         }
 
 
+class TransferPipeline:
+    """Bounded producer/consumer pipeline that fetches and uploads PDFs off the browser thread.
+    
+    The browser loop submits jobs (resolved URLs or captured PDF bytes, cookie
+    snapshot, judgment metadata); submit() blocks while the queue is full so
+    crawling pauses instead of piling up work. Results are only handed back once the transfer
+    has finished, so progress never records an unconfirmed upload.
+    """
+    
+    def __init__(self, num_workers=TRANSFER_WORKERS, queue_size=TRANSFER_QUEUE_SIZE):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue()
+        self.local = threading.local()
+        self.workers = []
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"transfer-{SCRIPT_ID}-{i + 1}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        logger.info(f"Transfer pipeline started with {num_workers} workers (queue size {queue_size})")
+    
+    def submit(self, job):
+        """Queue a transfer job, blocking while the pipeline is saturated"""
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            logger.info("Transfer queue full - pausing crawl until a worker frees up")
+            wait_start = time.time()
+            self.jobs.put(job)
+            logger.info(f"Transfer queue accepted job after {time.time() - wait_start:.2f}s")
+    
+    def collect_results(self):
+        """Return all (judgment, result) pairs finished so far without blocking"""
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+    
+    def wait_for_all(self):
+        """Block until every queued transfer has finished and return their results"""
+        self.jobs.join()
+        return self.collect_results()
+    
+    def shutdown(self):
+        """Finish outstanding transfers and stop the worker threads"""
+        results = self.wait_for_all()
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout=HTTP_TIMEOUT)
+        logger.info("Transfer pipeline stopped")
+        return results
+    
+    def _session_for(self, job):
+        """Per-worker HTTP client, refreshed when the job carries newer browser cookies"""
+        if getattr(self.local, 'session', None) is None:
+            self.local.session = build_http_session()
+            self.local.generation = None
+        
+        if self.local.generation != job['cookie_generation']:
+            self.local.session.cookies.clear()
+            for name, value in job['cookies'].items():
+                self.local.session.cookies.set(name, value)
+            self.local.session.headers.update(job['headers'])
+            self.local.generation = job['cookie_generation']
+        
+        return self.local.session
+    
+    def _worker_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            
+            judgment_data = job['judgment']
+            transfer_start = time.time()
+            try:
+                result = None
+                session = self._session_for(job)
+                for attempt in range(TRANSFER_RETRIES):
+                    try:
+                        if job.get('pdf_bytes') is not None:
+                            s3_key, size_bytes, upload_success, sha256 = transfer_pdf_bytes(job['pdf_bytes'],
+                                                                                            judgment_data)
+                        else:
+                            s3_key, size_bytes, upload_success, sha256 = transfer_pdf(job['pdf_urls'], judgment_data,
+                                                                                      session)
+                        transfer_seconds = time.time() - transfer_start
+                        stage_seconds = {"resolve": job['resolve_seconds'], "transfer": transfer_seconds}
+                        result = build_download_result(judgment_data, s3_key, size_bytes, upload_success,
+                                                       job['resolve_seconds'] + transfer_seconds, stage_seconds, sha256)
+                        break
+                    except Exception as transfer_error:
+                        logger.warning(f"Transfer attempt {attempt + 1}/{TRANSFER_RETRIES} failed for {judgment_data['case_title'][:50]}: {transfer_error}")
+                        result = {
+                            "success": False,
+                            "error": str(transfer_error),
+                            "case_title": judgment_data['case_title'],
+                            "download_duration_seconds": round(job['resolve_seconds'] + (time.time() - transfer_start), 2)
+                        }
+                self.results.put((job, result))
+            except Exception as e:
+                logger.error(f"Transfer worker error: {e}")
+                self.results.put((job, {
+                    "success": False,
+                    "error": str(e),
+                    "case_title": judgment_data['case_title'],
+                    "download_duration_seconds": round(job['resolve_seconds'] + (time.time() - transfer_start), 2)
+                }))
+            finally:
+                self.jobs.task_done()
+
+
+def queue_pdf_download(judgment_data, page):
+    """Resolve a judgment's PDF URL in the browser and hand the transfer to the pipeline.
+    
+    Returns None once the job is queued, or a result to record right away: a
+    failure if the URL could not be resolved, or a success if the PDF is
+    already in S3.
+    """
+    resolve_start = time.time()
+    
+    existing = already_uploaded_result(judgment_data, resolve_start)
+    if existing is not None:
+        return existing
+    
+    for retry in range(TRANSFER_RETRIES):
+        try:
+            pdf_urls, used_modal = resolve_pdf_urls(judgment_data)
+            pdf_bytes = capture_pdf(pdf_urls)
+            if used_modal or PDF_CAPTURE_MODE == 'cdp':
+                close_any_open_modal()
+            
+            generation, cookies, headers = get_http_credentials()
+            transfer_pipeline.submit({
+                "judgment": judgment_data,
+                "page": page,
+                "pdf_urls": pdf_urls,
+                "pdf_bytes": pdf_bytes,
+                "cookie_generation": generation,
+                "cookies": cookies,
+                "headers": headers,
+                "resolve_seconds": time.time() - resolve_start
+            })
+            return None
+        except Exception as e:
+            logger.error(f"Could not resolve PDF URL (attempt {retry + 1}/{TRANSFER_RETRIES}): {e}")
+            close_any_open_modal()
+            if retry < TRANSFER_RETRIES - 1:
+                time.sleep(2)
+            else:
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "case_title": judgment_data['case_title'],
+                    "download_duration_seconds": round(time.time() - resolve_start, 2)
+                }
+
+
 def download_pdfs_in_batches(judgments_data, start_index=0):
     """Download PDFs in batches of 25"""
     global total_files_downloaded
@@ -1642,6 +4413,7 @@ def navigate_to_next_page():
                 return False
             
             # Use JavaScript click for reliability
+            events_before = page_event_counts()
             driver.execute_script("arguments[0].click();", next_button)
             logger.debug("Next button clicked")
             
@@ -1650,7 +4422,7 @@ def navigate_to_next_page():
             return False
         
         # Wait for page transition
-        time.sleep(3)
+        wait_for_page_event('draw', events_before, 3, 'next_page')
         
         # Wait for table to reload with timeout
         try:
@@ -1661,7 +4433,7 @@ def navigate_to_next_page():
             return False
         
         # Additional wait for full rendering
-        time.sleep(2)
+        settle(2, 'next_page_render')
         
         current_page += 1
         logger.info(f"✓ Successfully navigated to page {current_page}")
@@ -1696,7 +4468,7 @@ def recover_browser_session():
         initialize_browser()
         
         # Navigate to the main URL with retries
-        url = "https://judgments.ecourts.gov.in/pdfsearch/index.php"
+        url = urljoin(ECOURTS_BASE_URL, "index.php")
         max_retries = 3
         
         for attempt in range(max_retries):
@@ -1794,7 +4566,7 @@ def reinitialize_session():
         logger.info("Going back to main URL...")
         
         # Navigate back to the main URL
-        url = "https://judgments.ecourts.gov.in/pdfsearch/index.php"
+        url = urljoin(ECOURTS_BASE_URL, "index.php")
         driver.get(url)
         
         # Wait for page to load
@@ -1820,13 +4592,197 @@ def reinitialize_session():
         return False
 
 
-def process_all_pages():
-    """Process all pages with batch downloading"""
-    global current_page, total_files_downloaded, start_time
+def record_download_result(progress, timing_data, judgment, download_result, page):
+    """Record a finished (uploaded or failed) download in progress and timing data"""
+    global total_files_downloaded
+    
+    spooled = take_spooled_upload(judgment)
+    if download_result and download_result.get('success'):
+        total_files_downloaded += 1
+        # A shard member is not uploaded until its shard is; the manifest records what the store decided
+        download_result['uploaded_to_s3'] = get_progress_store().record_download(download_result, judgment, page,
+                                                                                 spooled)
+        get_completed_judgments().add(judgment)
+        write_manifest_record(judgment, download_result, page)
+        if spooled is not None:
+            enforce_spool_limit(spooled["file_path"])
+        progress['total_files_downloaded'] = total_files_downloaded
+        # Retries record rows of earlier pages; the resume point only moves forward
+        progress['current_page'] = max(progress.get('current_page') or page, page)
+        
+        # Update yearly counts
+        decision_year = download_result.get('decision_year')
+        if decision_year:
+            if 'yearly_counts' not in progress:
+                progress['yearly_counts'] = {}
+            year_str = str(decision_year)
+            progress['yearly_counts'][year_str] = progress['yearly_counts'].get(year_str, 0) + 1
+        
+        # Update timing statistics (PDFs found already in S3 involved no download)
+        if not download_result.get('already_uploaded'):
+            download_duration = download_result.get('download_duration_seconds', 0)
+            update_timing_stats(timing_data, judgment, download_duration, success=True,
+                                stage_seconds=download_result.get('stage_seconds'))
+        
+        # The download row already updated the stored counters; only timing is left
+        save_timing_data(timing_data)
+    else:
+        if spooled is not None:
+            delete_local_file(spooled["file_path"])
+        # Log failed download
+        logger.error(f"Failed to download: {judgment['case_title'][:50]}")
+        failed_download = download_result or {
+            "success": False,
+            "error": "Unknown error",
+            "case_title": judgment['case_title'],
+            "download_duration_seconds": 0
+        }
+        store = get_progress_store()
+        error_class = classify_failure(failed_download.get('error'))
+        attempts = store.failure_attempts(judgment) + 1
+        retry_at = failure_retry_at(error_class, attempts)
+        store.record_failure(failed_download, judgment, page, error_class, attempts, retry_at)
+        if retry_at is None:
+            logger.warning(f"Giving up on {judgment['case_title'][:50]} after {attempts} failed attempts ({error_class})")
+        
+        # Update timing statistics for failed download
+        download_duration = failed_download.get('download_duration_seconds', 0)
+        update_timing_stats(timing_data, judgment, download_duration, success=False)
+        
+        save_timing_data(timing_data)
+
+
+# Checked in order; anything else is 'other'
+FAILURE_CLASS_PATTERNS = (
+    ('invalid_pdf', re.compile(r'^invalid_pdf')),
+    ('session', re.compile(r'session expired|invalid token|captcha|open_pdf returned no pdf|non-json response|'
+                           r'listing request rejected|\b403\b', re.IGNORECASE)),
+    ('network', re.compile(r'timed? ?out|connection|could not download pdf|max retries|\b50[234]\b',
+                           re.IGNORECASE)),
+    ('upload', re.compile(r'upload|spool|\bs3\b', re.IGNORECASE)),
+)
+
+
+def classify_failure(error):
+    """Failure class of a download error, which picks its retry backoff"""
+    for error_class, pattern in FAILURE_CLASS_PATTERNS:
+        if pattern.search(error or ""):
+            return error_class
+    return 'other'
+
+
+def failure_retry_at(error_class, attempts):
+    """When to retry a judgment that has failed `attempts` times, or None to give up on it"""
+    base_seconds, max_attempts = FAILURE_RETRY_POLICY.get(error_class, FAILURE_RETRY_POLICY['other'])
+    if attempts >= max_attempts:
+        return None
+    delay = min(base_seconds * 2 ** (attempts - 1), FAILED_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+    return time.time() + delay
+
+
+def checkpoint_row(progress, page, next_row, judgment):
+    """Durably record that every row of `page` before `next_row` has been handled"""
+    progress['current_batch_on_page'] = next_row
+    try:
+        get_progress_store().save_row_checkpoint(page, next_row, judgment.get('cnr'))
+    except Exception as e:
+        logger.warning(f"Could not save checkpoint for page {page} row {next_row}: {e}")
+
+
+def flush_transfer_pipeline(progress, timing_data):
+    """Wait for all queued transfers to finish and record their results"""
+    if transfer_pipeline is None:
+        return
+    
+    for job, download_result in transfer_pipeline.wait_for_all():
+        record_download_result(progress, timing_data, job['judgment'], download_result, job['page'])
+
+
+def give_up_on_page(progress, timing_data, page, judgments_data, error, next_page=None):
+    """Hand the unfinished rows of a page that failed PAGE_MAX_ATTEMPTS times to the retry pass.
+    
+    Returns False when the page's listing never loaded: there are no rows to
+    record, so the page must not be passed.
+    """
+    logger.error(f"Giving up on page {page} after {PAGE_MAX_ATTEMPTS} attempts: {error}")
+    if not judgments_data:
+        return False
+    
+    store = get_progress_store()
+    completed = get_completed_judgments()
+    for judgment in judgments_data:
+        # Rows that failed on their own are already waiting for the retry pass
+        if completed.contains(judgment) or store.failure_attempts(judgment):
+            continue
+        record_download_result(progress, timing_data, judgment, {
+            "success": False,
+            "error": f"Page {page} failed {PAGE_MAX_ATTEMPTS} times: {error}",
+            "case_title": judgment['case_title'],
+            "download_duration_seconds": 0
+        }, page)
+    store.mark_page_completed(page, next_page=next_page)
+    return True
+
+
+def retry_failed_downloads(progress, timing_data, fetch, limit=FAILED_RETRY_BATCH):
+    """Run failed downloads whose backoff has expired through fetch(judgment) again.
+    
+    fetch works from the stored open_pdf handler, so no listing page is
+    revisited; record_download_result then settles or reschedules the failure
+    row. A SessionExpiredError from fetch is re-raised once the entry has been
+    rescheduled. Returns the number of judgments recovered.
+    """
+    if not FAILED_RETRY_ENABLED:
+        return 0
+    store = get_progress_store()
+    due = store.due_failures(time.time(), limit)
+    if not due:
+        return 0
+    
+    logger.info(f"Retrying {len(due)} failed downloads")
+    completed = get_completed_judgments()
+    recovered = 0
+    for entry in due:
+        judgment = JudgmentRecord.from_dict(json.loads(entry['judgment_json']))
+        # Only this script's own records prove it was stored since; a fleet filter
+        # hit may be a false positive and fetch() checks S3 before downloading anyway
+        if completed.contains(judgment, include_fleet=False):
+            store.resolve_failure(entry['id'])
+            recovered += 1
+            continue
+        
+        logger.info(f"Retry {entry['attempts']} of failed download ({entry['error_class']}): {judgment['case_title'][:50]}")
+        try:
+            download_result = fetch(judgment)
+        except SessionExpiredError as e:
+            record_download_result(progress, timing_data, judgment, {
+                "success": False,
+                "error": f"Session expired: {e}",
+                "case_title": judgment['case_title'],
+                "download_duration_seconds": 0
+            }, entry['page'])
+            raise
+        record_download_result(progress, timing_data, judgment, download_result, entry['page'])
+        if download_result and download_result.get('success'):
+            recovered += 1
+    
+    logger.info(f"Retry pass recovered {recovered}/{len(due)} failed downloads")
+    return recovered
+
+
+def begin_run(start_pipeline=True):
+    """Load config, progress and timing, work out the starting page and start the transfer workers.
+    
+    Returns (progress, timing_data, max_page).
+    """
+    global current_page, total_files_downloaded, start_time, transfer_pipeline, upload_retrier
     
     # Load distributed configuration
     load_distributed_config()
     
+    # Fail at startup on a mistyped S3_KEY_LAYOUT rather than on every upload
+    s3_key_partition("")
+    
     # Load existing progress and timing data
     progress = load_progress()
     timing_data = load_timing_data()
@@ -1852,12 +4808,6 @@ def process_all_pages():
     total_files_downloaded = progress.get("total_files_downloaded", 0)
     
     # Ensure all required keys exist in progress
-    if 'downloaded_files' not in progress:
-        progress['downloaded_files'] = []
-    if 'failed_downloads' not in progress:
-        progress['failed_downloads'] = []
-    if 'pages_completed' not in progress:
-        progress['pages_completed'] = []
     if 'yearly_counts' not in progress:
         progress['yearly_counts'] = {}
     
@@ -1871,8 +4821,177 @@ def process_all_pages():
         timing_data["script_id"] = SCRIPT_ID
         logger.info("Starting new comprehensive PDF download process...")
     
-    save_progress(progress)
-    save_timing_data(timing_data)
+    save_progress(progress)
+    save_timing_data(timing_data)
+    
+    # Start the background transfer workers
+    if start_pipeline and TRANSFER_WORKERS > 0 and transfer_pipeline is None:
+        transfer_pipeline = TransferPipeline()
+    
+    # Retry spooled uploads in the background, starting with any left by earlier runs
+    if s3_client is not None and upload_retrier is None:
+        upload_retrier = UploadRetrier()
+    
+    return progress, timing_data, max_page
+
+
+def finish_run(progress, timing_data):
+    """Drain the transfer workers, save final progress/timing and send the completion summary"""
+    global transfer_pipeline, upload_retrier
+    
+    # Let in-flight transfers finish so their results are recorded
+    if transfer_pipeline is not None:
+        for job, download_result in transfer_pipeline.shutdown():
+            record_download_result(progress, timing_data, job['judgment'], download_result, job['page'])
+        transfer_pipeline = None
+    
+    # A spooled PDF whose result was never recorded has no download row to complete
+    with spooled_uploads_lock:
+        for entry in spooled_uploads.values():
+            delete_local_file(entry["file_path"])
+        spooled_uploads.clear()
+    
+    # Upload the partly filled shard, and once more any whose upload failed
+    if shard_writer is not None:
+        shard_writer.flush()
+        waiting = shard_writer.retry_failed()
+        if waiting:
+            logger.warning(f"{waiting} shards could not be uploaded and remain in {SHARD_SPOOL_DIR} "
+                           f"until the script starts again")
+    if manifest_writer is not None:
+        manifest_writer.flush()
+    
+    # Uploads still spooled stay queued for the next run
+    if upload_retrier is not None:
+        upload_retrier.stop()
+        upload_retrier = None
+        spooled = get_progress_store().upload_queue_stats()
+        if spooled["pending"]:
+            logger.warning(f"{spooled['pending']} uploads ({spooled['bytes'] / (1024 * 1024):.1f} MB) "
+                           f"remain spooled in {UPLOAD_SPOOL_DIR} for the next run")
+    
+    # Final summary
+    total_time = time.time() - start_time
+    
+    # Final progress and timing updates
+    progress['total_files_downloaded'] = total_files_downloaded
+    # The browser engine has already moved the resume point past its last completed page
+    progress['current_page'] = max(progress.get('current_page') or current_page, current_page)
+    progress['completion_time'] = datetime.now().isoformat()
+    
+    # Final timing statistics
+    timing_data['session_end'] = datetime.now().isoformat()
+    timing_data['total_time_seconds'] = round(total_time, 2)
+    
+    # Add session summary
+    session_summary = {
+        "script_id": SCRIPT_ID,
+        "session_start": timing_data.get('session_start'),
+        "session_end": timing_data['session_end'],
+        "total_files_processed": timing_data['total_files_processed'],
+        "successful_downloads": timing_data['total_successful_downloads'],
+        "failed_downloads": timing_data['total_failed_downloads'],
+        "session_duration_seconds": round(total_time, 2),
+        "session_duration_minutes": round(total_time / 60, 2),
+        "average_time_per_file": timing_data['average_time_per_file'],
+        "stage_percentiles": {stage: stats.summary() for stage, stats in timing_data.get('stage_stats', {}).items()},
+        "pages_processed": current_page,
+        "start_page": START_PAGE,
+        "end_page": END_PAGE
+    }
+    
+    if 'session_statistics' not in timing_data:
+        timing_data['session_statistics'] = []
+    timing_data['session_statistics'].append(session_summary)
+    
+    save_progress(progress)
+    save_timing_data(timing_data)
+    
+    logger.info(f"\n=== DOWNLOAD COMPLETE ===")
+    logger.info(f"Script ID: {SCRIPT_ID}")
+    if START_PAGE and END_PAGE:
+        logger.info(f"Assigned Range: Pages {START_PAGE} to {END_PAGE}")
+    logger.info(f"Total files downloaded: {total_files_downloaded}")
+    logger.info(f"Total pages processed: {current_page}")
+    pages_completed_count = get_progress_store().count_pages_completed()
+    logger.info(f"Pages completed: {pages_completed_count}")
+    failed_count = get_progress_store().count_failed()
+    failures = get_progress_store().failure_stats()
+    logger.info(f"Failed downloads: {failed_count} (awaiting retry: {failures.get('pending', 0)}, "
+                f"given up: {failures.get('abandoned', 0)}, recovered by retries: {failures.get('recovered', 0)})")
+    dedupe = get_progress_store().dedupe_stats()
+    if dedupe['duplicates']:
+        logger.info(f"Duplicate PDFs not stored again: {dedupe['duplicates']} "
+                    f"({dedupe['bytes_avoided'] / (1024 * 1024):.1f} MB, {dedupe['puts_avoided']} PUTs avoided)")
+    logger.info(f"Success rate: {(total_files_downloaded / (total_files_downloaded + failed_count) * 100):.1f}%" if (total_files_downloaded + failed_count) > 0 else "N/A")
+    
+    # Log yearly distribution
+    yearly_counts = progress.get('yearly_counts', {})
+    if yearly_counts:
+        logger.info(f"\n=== YEARLY DISTRIBUTION ===")
+        for year in sorted(yearly_counts.keys(), reverse=True):
+            logger.info(f"Year {year}: {yearly_counts[year]} files")
+        logger.info(f"Total years covered: {len(yearly_counts)}")
+    
+    # Log timing statistics
+    logger.info(f"\n=== TIMING STATISTICS ===")
+    logger.info(f"Total time taken: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
+    logger.info(f"Average time per file: {timing_data.get('average_time_per_file', 0):.2f} seconds")
+    for stage, stats in sorted(timing_data.get('stage_stats', {}).items()):
+        if stats.count:
+            logger.info(f"{stage}: n={stats.count} mean={stats.mean:.2f}s p50={stats.percentile(50):.2f}s "
+                        f"p90={stats.percentile(90):.2f}s p99={stats.percentile(99):.2f}s")
+    
+    if wait_stats:
+        logger.info(f"\n=== WAIT STATISTICS ({WAIT_MODE}) ===")
+        for label, stats in sorted(wait_stats.items()):
+            logger.info(f"{label}: n={stats.count} mean={stats.mean:.2f}s p50={stats.percentile(50):.2f}s "
+                        f"p90={stats.percentile(90):.2f}s idle removed={wait_saved_seconds.get(label, 0):.0f}s")
+        logger.info(f"Total idle time removed: {sum(wait_saved_seconds.values()):.0f}s")
+    
+    if modal_selector_stats['probes']:
+        logger.info(f"\n=== MODAL SELECTOR HIT RATES ({modal_selector_stats['probes']} probes) ===")
+        for selector in ordered_modal_selectors():
+            hit_rate = modal_selector_stats['hits'].get(selector, 0) / modal_selector_stats['probes'] * 100
+            logger.info(f"{selector}: {hit_rate:.1f}%")
+    
+    if PDF_CAPTURE_MODE == 'cdp':
+        logger.info(f"CDP PDF capture: {cdp_capture_stats['captured']} captured from the browser "
+                    f"({cdp_capture_stats['bytes'] / (1024 * 1024):.1f} MB not downloaded twice), "
+                    f"{cdp_capture_stats['fallback']} downloaded over HTTP")
+    
+    if timing_data.get('fastest_download'):
+        logger.info(f"Fastest download: {timing_data['fastest_download']['time']:.2f}s - {timing_data['fastest_download']['case_title']}")
+    
+    if timing_data.get('slowest_download'):
+        logger.info(f"Slowest download: {timing_data['slowest_download']['time']:.2f}s - {timing_data['slowest_download']['case_title']}")
+    
+    logger.info(f"\nDownload completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"Progress and timing data: {get_progress_store().db_path} (script {SCRIPT_ID})")
+    
+    # Send completion notification email
+    yearly_summary = "\n".join([f"Year {year}: {count} files" for year, count in sorted(yearly_counts.items(), reverse=True)]) if yearly_counts else "No data"
+    
+    completion_stats = {
+        'total_downloaded': total_files_downloaded,
+        'total_pages': current_page,
+        'failed_count': failed_count,
+        'success_rate': (total_files_downloaded / (total_files_downloaded + failed_count) * 100) if (total_files_downloaded + failed_count) > 0 else 0,
+        'total_time_minutes': total_time / 60,
+        'total_time_hours': total_time / 3600,
+        'avg_time_per_file': timing_data.get('average_time_per_file', 0),
+        'start_page': START_PAGE,
+        'end_page': END_PAGE,
+        'pages_completed': pages_completed_count,
+        'yearly_summary': yearly_summary
+    }
+    
+    send_completion_notification(completion_stats)
+
+
+def process_all_pages():
+    """Process all pages with batch downloading"""
+    progress, timing_data, max_page = begin_run()
     
     # If starting from a page other than 1, navigate to it with multiple attempts
     if current_page > 1:
@@ -1900,6 +5019,9 @@ def process_all_pages():
             )
             return
     
+    # Failed downloads from earlier runs whose backoff has run out
+    retry_failed_downloads(progress, timing_data, lambda judgment: download_pdf(judgment, direct=True))
+    
     while True:
         try:
             # Check if we've reached the max page for this instance
@@ -1911,108 +5033,97 @@ def process_all_pages():
             if max_page:
                 logger.info(f"Progress: Page {current_page} of {max_page} (Script {SCRIPT_ID})")
             
-            # Extract table data for current page
-            judgments_data = extract_table_data()
-            
-            if not judgments_data:
-                logger.warning(f"No judgment data found on page {current_page}")
-                break
-            
-            logger.info(f"Found {len(judgments_data)} judgments on page {current_page}")
+            # Resume from the page's checkpoint if it has one, otherwise extract and cache the listing
+            checkpoint = get_progress_store().load_page_checkpoint(current_page)
+            if checkpoint:
+                judgments_data, files_processed_on_page = checkpoint
+                logger.info(f"Resuming page {current_page} at row {files_processed_on_page + 1} "
+                            f"from cached listing ({len(judgments_data)} judgments)")
+            else:
+                judgments_data = extract_table_data()
+                
+                if not judgments_data:
+                    logger.warning(f"No judgment data found on page {current_page}")
+                    break
+                
+                logger.info(f"Found {len(judgments_data)} judgments on page {current_page}")
+                get_progress_store().save_page_listing(current_page, judgments_data)
+                files_processed_on_page = 0
             
             # Process in batches of 25
-            files_processed_on_page = 0
-            
             while files_processed_on_page < len(judgments_data):
                 batch_start = files_processed_on_page
                 batch_end = min(files_processed_on_page + 25, len(judgments_data))
                 
                 logger.info(f"\n--- Processing batch {batch_start+1}-{batch_end} on page {current_page} (Total on page: {len(judgments_data)}) ---")
                 
+                # Skip batches that were fully downloaded in an earlier run without touching the page
+                completed = get_completed_judgments()
+                if all(completed.contains(judgments_data[i]) for i in range(batch_start, batch_end)):
+                    logger.info(f"Batch {batch_start+1}-{batch_end} on page {current_page} already downloaded, skipping")
+                    files_processed_on_page = batch_end
+                    continue
+                
                 # Ensure clean state before starting batch
                 close_any_open_modal()
-                time.sleep(1)
+                settle(1, 'batch_start')
                 
                 # Download current batch
                 for i in range(batch_start, batch_end):
                     judgment = judgments_data[i]
                     logger.info(f"Processing file {i+1}/{len(judgments_data)} on page {current_page}: {judgment['case_title'][:50]}...")
                     
-                    # Check if file already downloaded
-                    if judgment['filename'] in [f.get('filename', '') for f in progress.get('downloaded_files', [])]:
-                        logger.info(f"File already downloaded, skipping: {judgment['filename']}")
+                    # Check if judgment already downloaded (before any click or fetch)
+                    if completed.contains(judgment):
+                        logger.info(f"Already downloaded, skipping: CNR {judgment['cnr']}")
                         continue
                     
-                    # Retry mechanism for downloads
-                    max_retries = 2
-                    download_result = None
-                    
-                    for retry in range(max_retries):
-                        try:
-                            download_result = download_pdf(judgment)
-                            if download_result and download_result.get('success'):
-                                break
-                            else:
-                                logger.warning(f"Download failed, retry {retry + 1}/{max_retries}")
-                                time.sleep(2)
-                        except Exception as retry_error:
-                            logger.error(f"Download attempt {retry + 1} failed: {retry_error}")
-                            if retry < max_retries - 1:
-                                time.sleep(3)
-                            else:
-                                download_result = {
-                                    "success": False,
-                                    "error": f"Failed after {max_retries} retries: {str(retry_error)}",
-                                    "case_title": judgment['case_title']
-                                }
-                    
-                    if download_result and download_result.get('success'):
-                        total_files_downloaded += 1
-                        progress['downloaded_files'].append(download_result)
-                        progress['total_files_downloaded'] = total_files_downloaded
-                        progress['current_page'] = current_page
-                        
-                        # Update yearly counts
-                        decision_year = download_result.get('decision_year')
-                        if decision_year:
-                            if 'yearly_counts' not in progress:
-                                progress['yearly_counts'] = {}
-                            year_str = str(decision_year)
-                            progress['yearly_counts'][year_str] = progress['yearly_counts'].get(year_str, 0) + 1
+                    if transfer_pipeline is not None:
+                        # Browser only resolves the URL; fetch + upload happen on a worker
+                        immediate_result = queue_pdf_download(judgment, current_page)
+                        if immediate_result is not None:
+                            record_download_result(progress, timing_data, judgment, immediate_result, current_page)
                         
-                        # Update timing statistics
-                        download_duration = download_result.get('download_duration_seconds', 0)
-                        timing_data = update_timing_stats(timing_data, judgment, download_duration, success=True)
-                        
-                        # Save progress and timing after each successful download
-                        save_progress(progress)
-                        save_timing_data(timing_data)
+                        # Record transfers that have been confirmed in the meantime
+                        for job, download_result in transfer_pipeline.collect_results():
+                            record_download_result(progress, timing_data, job['judgment'], download_result, job['page'])
                     else:
-                        # Log failed download
-                        logger.error(f"Failed to download: {judgment['case_title'][:50]}")
-                        failed_download = download_result or {
-                            "success": False,
-                            "error": "Unknown error",
-                            "case_title": judgment['case_title'],
-                            "download_duration_seconds": 0
-                        }
-                        if 'failed_downloads' not in progress:
-                            progress['failed_downloads'] = []
-                        progress['failed_downloads'].append(failed_download)
+                        # Retry mechanism for downloads
+                        max_retries = 2
+                        download_result = None
                         
-                        # Update timing statistics for failed download
-                        download_duration = failed_download.get('download_duration_seconds', 0)
-                        timing_data = update_timing_stats(timing_data, judgment, download_duration, success=False)
+                        for retry in range(max_retries):
+                            try:
+                                download_result = download_pdf(judgment)
+                                if download_result and download_result.get('success'):
+                                    break
+                                else:
+                                    logger.warning(f"Download failed, retry {retry + 1}/{max_retries}")
+                                    time.sleep(2)
+                            except Exception as retry_error:
+                                logger.error(f"Download attempt {retry + 1} failed: {retry_error}")
+                                if retry < max_retries - 1:
+                                    time.sleep(3)
+                                else:
+                                    download_result = {
+                                        "success": False,
+                                        "error": f"Failed after {max_retries} retries: {str(retry_error)}",
+                                        "case_title": judgment['case_title']
+                                    }
                         
-                        save_progress(progress)
-                        save_timing_data(timing_data)
+                        record_download_result(progress, timing_data, judgment, download_result, current_page)
+                        checkpoint_row(progress, current_page, i + 1, judgment)
                     
                     # Log progress with timing
                     elapsed_time = time.time() - start_time
                     avg_time_per_file = elapsed_time / total_files_downloaded if total_files_downloaded > 0 else 0
                     logger.info(f"Progress: {total_files_downloaded} files downloaded | Elapsed: {elapsed_time:.2f}s | Avg: {avg_time_per_file:.2f}s/file")
                     
-                    time.sleep(1)
+                    settle(1, 'between_files')
+                
+                # Wait for this batch's transfers before the session may be reset
+                flush_transfer_pipeline(progress, timing_data)
+                checkpoint_row(progress, current_page, batch_end, judgments_data[batch_end - 1])
                 
                 files_processed_on_page = batch_end
                 logger.info(f"Batch complete. Processed {files_processed_on_page}/{len(judgments_data)} files on page {current_page}")
@@ -2025,27 +5136,23 @@ def process_all_pages():
                         logger.error("Failed to reinitialize session. Stopping process.")
                         return
                     
-                    # Navigate back to current page
+                    # Navigate back to current page; its listing is already in hand
                     if not navigate_to_specific_page(current_page):
                         logger.error(f"Failed to navigate back to page {current_page} after reinitialization")
                         return
-                    
-                    # Re-extract table data after reinitialization
-                    judgments_data = extract_table_data()
-                    if not judgments_data:
-                        logger.error("Failed to re-extract table data after reinitialization")
-                        return
-                    
-                    logger.info(f"Successfully re-extracted {len(judgments_data)} judgments on page {current_page}")
                 else:
                     logger.info(f"No reinitialization needed. Continuing to next page.")
             
             logger.info(f"Completed page {current_page}. Total files downloaded so far: {total_files_downloaded}")
             
-            # Mark page as completed
-            if current_page not in progress.get('pages_completed', []):
-                progress['pages_completed'].append(current_page)
-                save_progress(progress)
+            # Mark page as completed and resume from the next one
+            get_progress_store().mark_page_completed(current_page, next_page=current_page + 1)
+            progress['current_page'] = current_page + 1
+            progress['current_batch_on_page'] = 0
+            save_progress(progress)
+            
+            # The browser is idle between pages: retry failed downloads that are due
+            retry_failed_downloads(progress, timing_data, lambda judgment: download_pdf(judgment, direct=True))
             
             # Try to navigate to next page with recovery logic
             navigation_success = False
@@ -2105,8 +5212,8 @@ def process_all_pages():
                 logger.info(f"Recovery attempt {recovery_attempt + 1}/3...")
                 
                 if recovery_attempt == 0:
-                    # First try simple session reinitialization
-                    if reinitialize_session():
+                    # First try simple session reinitialization, which lands on page 1
+                    if reinitialize_session() and (current_page == 1 or navigate_to_specific_page(current_page, max_retries=2)):
                         recovery_success = True
                         break
                 else:
@@ -2131,96 +5238,607 @@ def process_all_pages():
                 send_shutdown_notification("Failed to recover from error after multiple attempts")
                 break
     
-    # Final summary
-    total_time = time.time() - start_time
-    avg_time_per_file = total_time / total_files_downloaded if total_files_downloaded > 0 else 0
+    finish_run(progress, timing_data)
+
+        
+class SessionExpiredError(Exception):
+    """The search session is no longer valid and a new captcha has to be solved"""
+
+
+class SearchPageParser(HTMLParser):
+    """Collects the search form's default field values and the captcha image URL from index.php"""
     
-    # Final progress and timing updates
-    progress['total_files_downloaded'] = total_files_downloaded
-    progress['current_page'] = current_page
-    progress['completion_time'] = datetime.now().isoformat()
+    def __init__(self):
+        super().__init__()
+        self.fields = {}
+        self.captcha_src = None
+        self.select_name = None
+        self.select_value = None
     
-    # Final timing statistics
-    timing_data['session_end'] = datetime.now().isoformat()
-    timing_data['total_time_seconds'] = round(total_time, 2)
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'img' and attrs.get('id') == 'captcha_image':
+            self.captcha_src = attrs.get('src')
+        elif tag == 'input' and attrs.get('name'):
+            input_type = (attrs.get('type') or 'text').lower()
+            if input_type in ('submit', 'button', 'image', 'reset', 'file'):
+                return
+            if input_type in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            self.fields[attrs['name']] = attrs.get('value') or ''
+        elif tag == 'select' and attrs.get('name'):
+            self.select_name = attrs['name']
+            self.select_value = None
+        elif tag == 'option' and self.select_name:
+            value = attrs.get('value') or ''
+            if self.select_value is None or 'selected' in attrs:
+                self.select_value = value
     
-    # Add session summary
-    session_summary = {
-        "script_id": SCRIPT_ID,
-        "session_start": timing_data.get('session_start'),
-        "session_end": timing_data['session_end'],
-        "total_files_processed": timing_data['total_files_processed'],
-        "successful_downloads": timing_data['total_successful_downloads'],
-        "failed_downloads": timing_data['total_failed_downloads'],
-        "session_duration_seconds": round(total_time, 2),
-        "session_duration_minutes": round(total_time / 60, 2),
-        "average_time_per_file": timing_data['average_time_per_file'],
-        "pages_processed": current_page,
-        "start_page": START_PAGE,
-        "end_page": END_PAGE
-    }
+    def handle_endtag(self, tag):
+        if tag == 'select' and self.select_name:
+            self.fields[self.select_name] = self.select_value or ''
+            self.select_name = None
+
+
+class ListingRowParser(HTMLParser):
+    """Pulls the same raw fields as EXTRACT_ROWS_JS out of one DataTables row's HTML"""
     
-    if 'session_statistics' not in timing_data:
-        timing_data['session_statistics'] = []
-    timing_data['session_statistics'].append(session_summary)
+    VOID_TAGS = {'br', 'img', 'input', 'hr', 'meta', 'link', 'wbr'}
     
-    save_progress(progress)
-    save_timing_data(timing_data)
+    def __init__(self):
+        super().__init__()
+        self.depth = 0
+        self.button_depth = None
+        self.font_depth = None
+        self.strong_depth = None
+        self.details_depth = None
+        self.title = []
+        self.details = []
+        self.text = []
+        self.strong = []
+        self.judge = ''
+        self.onclick = None
+        self.button_id = None
     
-    logger.info(f"\n=== DOWNLOAD COMPLETE ===")
-    logger.info(f"Script ID: {SCRIPT_ID}")
-    if START_PAGE and END_PAGE:
-        logger.info(f"Assigned Range: Pages {START_PAGE} to {END_PAGE}")
-    logger.info(f"Total files downloaded: {total_files_downloaded}")
-    logger.info(f"Total pages processed: {current_page}")
-    logger.info(f"Pages completed: {len(progress.get('pages_completed', []))}")
-    failed_count = len(progress.get('failed_downloads', []))
-    logger.info(f"Failed downloads: {failed_count}")
-    logger.info(f"Success rate: {(total_files_downloaded / (total_files_downloaded + failed_count) * 100):.1f}%" if (total_files_downloaded + failed_count) > 0 else "N/A")
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            self.handle_data(' ')
+            return
+        self.depth += 1
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'button' and 'btn-link' in classes and self.onclick is None:
+            self.button_depth = self.depth
+            self.onclick = attrs.get('onclick')
+            self.button_id = attrs.get('id')
+        elif tag == 'font' and self.button_depth is not None and self.font_depth is None:
+            self.font_depth = self.depth
+        elif tag == 'strong' and self.strong_depth is None:
+            self.strong_depth = self.depth
+            self.strong = []
+        if 'caseDetailsTD' in classes and self.details_depth is None:
+            self.details_depth = self.depth
     
-    # Log yearly distribution
-    yearly_counts = progress.get('yearly_counts', {})
-    if yearly_counts:
-        logger.info(f"\n=== YEARLY DISTRIBUTION ===")
-        for year in sorted(yearly_counts.keys(), reverse=True):
-            logger.info(f"Year {year}: {yearly_counts[year]} files")
-        logger.info(f"Total years covered: {len(yearly_counts)}")
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        if self.strong_depth == self.depth:
+            text = ' '.join(''.join(self.strong).split())
+            if not self.judge and 'Judge :' in text:
+                self.judge = text
+            self.strong_depth = None
+        if self.font_depth == self.depth:
+            self.font_depth = -1  # only the first <font> inside the button is the title
+        if self.button_depth == self.depth:
+            self.button_depth = None
+        if self.details_depth == self.depth:
+            self.details_depth = -1
+        self.depth -= 1
     
-    # Log timing statistics
-    logger.info(f"\n=== TIMING STATISTICS ===")
-    logger.info(f"Total time taken: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
-    logger.info(f"Average time per file: {timing_data.get('average_time_per_file', 0):.2f} seconds")
+    def handle_data(self, data):
+        self.text.append(data)
+        if self.font_depth is not None and self.font_depth > 0:
+            self.title.append(data)
+        if self.strong_depth is not None:
+            self.strong.append(data)
+        if self.details_depth is not None and self.details_depth > 0:
+            self.details.append(data)
     
-    if timing_data.get('fastest_download'):
-        logger.info(f"Fastest download: {timing_data['fastest_download']['time']:.2f}s - {timing_data['fastest_download']['case_title']}")
+    def raw_row(self):
+        details = self.details if self.details_depth is not None else self.text
+        return {
+            "title": ' '.join(''.join(self.title).split()) if self.font_depth is not None else None,
+            "judge": self.judge,
+            "details": ' '.join(''.join(details).split()),
+            "onclick": self.onclick,
+            "button_id": self.button_id
+        }
+
+
+def parse_listing_rows(rows):
+    """Turn the aaData rows of a DataTables listing response into judgment records"""
+    judgments_data = []
+    for i, row in enumerate(rows):
+        try:
+            parser = ListingRowParser()
+            parser.feed(''.join(row) if isinstance(row, list) else str(row))
+            raw = parser.raw_row()
+            if raw['title'] is None or not raw['onclick']:
+                logger.error(f"Error extracting data from row {i+1}: incomplete row")
+                continue
+            judgments_data.append(build_judgment_record(
+                i + 1, raw['title'], raw['judge'], raw['details'], raw['onclick'], raw['button_id']
+            ))
+        except Exception as e:
+            logger.error(f"Error extracting data from row {i+1}: {e}")
+    return judgments_data
+
+
+class EcourtsHttpClient:
+    """Browserless client for the pdfsearch flow: captcha, search form, DataTables listing and open_pdf.
     
-    if timing_data.get('slowest_download'):
-        logger.info(f"Slowest download: {timing_data['slowest_download']['time']:.2f}s - {timing_data['slowest_download']['case_title']}")
+    Sends the same requests the page's own JavaScript does, carrying forward
+    the app_token the site rotates on every AJAX response. Point
+    ECOURTS_BASE_URL at a local stand-in server to run it offline.
+    """
     
-    logger.info(f"\nDownload completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info(f"Progress tracking file: {PROGRESS_FILE}")
-    logger.info(f"Timing data file: {TIMING_FILE}")
+    def __init__(self, base_url=ECOURTS_BASE_URL):
+        self.base_url = base_url
+        self.session = build_http_session()
+        self.session.headers.update({'User-Agent': HTTP_USER_AGENT, 'X-Requested-With': 'XMLHttpRequest'})
+        self.form_fields = {}
+        self.captcha_url = None
+        self.app_token = ''
+        self.echo = 0
+        self.generation = 0
+        self.total_records = None
+        # The site rotates app_token on every AJAX response, so token-bearing
+        # requests go one at a time; PDF downloads do not need it
+        self.lock = threading.RLock()
     
-    # Send completion notification email
-    yearly_summary = "\n".join([f"Year {year}: {count} files" for year, count in sorted(yearly_counts.items(), reverse=True)]) if yearly_counts else "No data"
+    def url(self, path):
+        return urljoin(self.base_url, path)
     
-    completion_stats = {
-        'total_downloaded': total_files_downloaded,
-        'total_pages': current_page,
-        'failed_count': failed_count,
-        'success_rate': (total_files_downloaded / (total_files_downloaded + failed_count) * 100) if (total_files_downloaded + failed_count) > 0 else 0,
-        'total_time_minutes': total_time / 60,
-        'total_time_hours': total_time / 3600,
-        'avg_time_per_file': timing_data.get('average_time_per_file', 0),
-        'start_page': START_PAGE,
-        'end_page': END_PAGE,
-        'pages_completed': len(progress.get('pages_completed', [])),
-        'yearly_summary': yearly_summary
-    }
+    def load_search_page(self):
+        """Open index.php for a fresh session cookie, form defaults and captcha URL"""
+        self.session.cookies.clear()
+        response = self.session.get(self.url('index.php'), timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        
+        page = SearchPageParser()
+        page.feed(response.text)
+        self.form_fields = page.fields
+        self.app_token = page.fields.get('app_token', '')
+        self.captcha_url = self.url(page.captcha_src or ECOURTS_CAPTCHA_PATH)
+        self.session.headers['Referer'] = response.url
     
-    send_completion_notification(completion_stats)
+    def fetch_captcha_image(self):
+        """Return (image_bytes, media_type) of a captcha bound to the current session"""
+        response = self.session.get(self.captcha_url, params={'_': int(time.time() * 1000)}, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        media_type = response.headers.get('content-type', 'image/png').split(';')[0].strip()
+        return response.content, media_type if media_type.startswith('image/') else 'image/png'
+    
+    def post(self, path, data):
+        """POST an AJAX request the way the page does and return the decoded JSON"""
+        with self.lock:
+            payload = dict(data, ajax_req='true', app_token=self.app_token)
+            response = self.session.post(self.url(path), data=payload, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            try:
+                result = response.json()
+            except ValueError:
+                raise SessionExpiredError(f"Non-JSON response from {path}: {response.text[:200]}")
+            if isinstance(result, dict) and result.get('app_token'):
+                self.app_token = result['app_token']
+            return result
+    
+    def listing_params(self, start, length):
+        with self.lock:
+            self.echo += 1
+            echo = self.echo
+        return dict(
+            self.form_fields,
+            draw=echo, start=start, length=length,
+            sEcho=echo, iDisplayStart=start, iDisplayLength=length, iColumns=1, sColumns=''
+        )
+    
+    def fetch_listing(self, start, length):
+        """Return (rows, total) for one DataTables window; raises SessionExpiredError when rejected"""
+        result = self.post(ECOURTS_SEARCH_PATH, self.listing_params(start, length))
+        rows = result.get('aaData', result.get('data')) if isinstance(result, dict) else None
+        if rows is None:
+            message = result.get('errormsg') or result.get('message') if isinstance(result, dict) else result
+            raise SessionExpiredError(f"Listing request rejected: {str(message)[:200]}")
+        total = result.get('iTotalDisplayRecords', result.get('recordsFiltered'))
+        if total is not None:
+            self.total_records = int(total)
+        return rows, self.total_records
+    
+    def search(self, captcha_text):
+        """Submit the search form with a solved captcha; False if the captcha was rejected"""
+        self.form_fields['captcha'] = captcha_text
+        try:
+            self.fetch_listing(0, 1)
+        except SessionExpiredError as e:
+            logger.warning(f"Search rejected: {e}")
+            return False
+        self.generation += 1
+        return True
+    
+    def fetch_listing_page(self, page, length=TABLE_PAGE_LENGTH):
+        """Return the judgment records of one listing page (1-based)"""
+        rows, total = self.fetch_listing((page - 1) * length, length)
+        return parse_listing_rows(rows)
+    
+    def resolve_pdf_url(self, judgment_data):
+        """Call the endpoint behind the row's open_pdf(...) handler and return the PDF URL"""
+        onclick_attr = judgment_data.get('onclick') or ""
+        call = onclick_attr[onclick_attr.find("open_pdf"):]
+        args = re.findall(r"'([^']*)'", call)
+        if not args:
+            raise Exception(f"No open_pdf arguments in onclick: {onclick_attr[:100]}")
+        
+        data = dict(zip(OPEN_PDF_ARG_NAMES, args))
+        for field in ('fcourt_type', 'lang_flg'):
+            if field in self.form_fields:
+                data.setdefault(field, self.form_fields[field])
+        
+        result = self.post(ECOURTS_OPEN_PDF_PATH, data)
+        output = result.get('outputfile') if isinstance(result, dict) else None
+        if not output:
+            match = re.search(r'[^"\'\s<>]*tmp/[^"\'\s<>]+?\.pdf', json.dumps(result).replace('\\/', '/'))
+            if not match:
+                raise SessionExpiredError(f"open_pdf returned no PDF: {str(result)[:200]}")
+            output = match.group(0)
+        return urljoin(self.base_url, output)
+    
+    def credentials(self):
+        """(generation, cookies, headers) snapshot for transfer workers"""
+        with self.lock:
+            return (
+                self.generation,
+                self.session.cookies.get_dict(),
+                {'User-Agent': self.session.headers.get('User-Agent'), 'Referer': self.session.headers.get('Referer')}
+            )
+
+
+def authenticate_http_client(client, max_attempts=15):
+    """Solve the search captcha over plain HTTP until the search is accepted"""
+    if bedrock_runtime is None:
+        logger.error("AWS Bedrock runtime client is not initialized.")
+        return False
+    
+    for attempt in range(1, max_attempts + 1):
+        try:
+            logger.info(f"Attempting to solve captcha over HTTP (attempt {attempt}/{max_attempts})...")
+            client.load_search_page()
+            captcha_image, media_type = client.fetch_captcha_image()
+            if client.search(solve_captcha_image(captcha_image, media_type)):
+                logger.info(f"Captcha accepted, {client.total_records} results available")
+                return True
+            logger.warning(f"Captcha validation failed on attempt {attempt}")
+        except Exception as e:
+            logger.error(f"Failed to solve captcha on attempt {attempt}: {e}")
+        time.sleep(2)
+    
+    return False
+
 
+def transfer_judgment_http(client, judgment, session):
+    """Resolve and transfer one judgment over HTTP and return its download result.
+    
+    SessionExpiredError propagates so the caller can re-authenticate.
+    """
+    resolve_start = time.time()
+    try:
+        existing = already_uploaded_result(judgment, resolve_start)
+        if existing is not None:
+            return existing
         
+        pdf_url = client.resolve_pdf_url(judgment)
+        resolve_seconds = time.time() - resolve_start
+        s3_key, size_bytes, upload_success, sha256 = transfer_pdf([pdf_url], judgment, session)
+        transfer_seconds = time.time() - resolve_start - resolve_seconds
+        return build_download_result(judgment, s3_key, size_bytes, upload_success,
+                                     resolve_seconds + transfer_seconds,
+                                     {"resolve": resolve_seconds, "transfer": transfer_seconds}, sha256)
+    except SessionExpiredError:
+        raise
+    except Exception as e:
+        logger.error(f"HTTP download failed for {judgment['case_title'][:50]}: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "case_title": judgment['case_title'],
+            "download_duration_seconds": round(time.time() - resolve_start, 2)
+        }
+
+
+def download_judgment_http(client, judgment, page, progress, timing_data):
+    """Download one judgment over HTTP, handing the transfer to the pipeline when it runs"""
+    if transfer_pipeline is None:
+        record_download_result(progress, timing_data, judgment,
+                               transfer_judgment_http(client, judgment, client.session), page)
+        return
+    
+    resolve_start = time.time()
+    existing = already_uploaded_result(judgment, resolve_start)
+    if existing is not None:
+        record_download_result(progress, timing_data, judgment, existing, page)
+        return
+    
+    try:
+        pdf_url = client.resolve_pdf_url(judgment)
+    except SessionExpiredError:
+        raise
+    except Exception as e:
+        logger.error(f"Could not resolve PDF URL: {e}")
+        record_download_result(progress, timing_data, judgment, {
+            "success": False,
+            "error": str(e),
+            "case_title": judgment['case_title'],
+            "download_duration_seconds": round(time.time() - resolve_start, 2)
+        }, page)
+        return
+    
+    generation, cookies, headers = client.credentials()
+    transfer_pipeline.submit({
+        "judgment": judgment,
+        "page": page,
+        "pdf_urls": [pdf_url],
+        "cookie_generation": generation,
+        "cookies": cookies,
+        "headers": headers,
+        "resolve_seconds": time.time() - resolve_start
+    })
+    for job, download_result in transfer_pipeline.collect_results():
+        record_download_result(progress, timing_data, job['judgment'], download_result, job['page'])
+
+
+def process_all_pages_http():
+    """Browserless counterpart of process_all_pages using the same progress store and uploader"""
+    global current_page
+    
+    progress, timing_data, max_page = begin_run()
+    client = EcourtsHttpClient()
+    
+    if not authenticate_http_client(client):
+        logger.error("Failed to solve captcha over HTTP. Exiting...")
+        send_error_notification("Failed to solve initial captcha", "HTTP engine could not get a search session")
+        finish_run(progress, timing_data)
+        return
+    
+    retry_failed_http = lambda judgment: transfer_judgment_http(client, judgment, client.session)
+    try:
+        retry_failed_downloads(progress, timing_data, retry_failed_http)
+    except SessionExpiredError as e:
+        logger.warning(f"Session expired during the retry pass: {e}")
+    
+    page_attempts = {}
+    while not (max_page and current_page > max_page):
+        judgments_data = None
+        try:
+            logger.info(f"\n=== Processing Page {current_page} (HTTP) ===")
+            judgments_data = client.fetch_listing_page(current_page)
+            if not judgments_data:
+                logger.warning(f"No judgment data found on page {current_page}")
+                break
+            
+            completed = get_completed_judgments()
+            for i, judgment in enumerate(judgments_data):
+                if completed.contains(judgment):
+                    continue
+                logger.info(f"Processing file {i+1}/{len(judgments_data)} on page {current_page}: {judgment['case_title'][:50]}...")
+                download_judgment_http(client, judgment, current_page, progress, timing_data)
+            
+            flush_transfer_pipeline(progress, timing_data)
+            get_progress_store().mark_page_completed(current_page, next_page=current_page + 1)
+            logger.info(f"Completed page {current_page}. Total files downloaded so far: {total_files_downloaded}")
+            
+            current_page += 1
+            progress['current_page'] = current_page
+            save_progress(progress)
+            
+            # Between pages, retry failed downloads that are due
+            retry_failed_downloads(progress, timing_data, retry_failed_http)
+            
+        except SessionExpiredError as e:
+            # Rows already recorded are skipped on the retry of this page
+            logger.warning(f"Search session expired on page {current_page} ({e}), solving captcha again")
+            flush_transfer_pipeline(progress, timing_data)
+            if not authenticate_http_client(client):
+                send_error_notification(f"HTTP engine lost its session at page {current_page}", str(e))
+                break
+        except Exception as e:
+            logger.error(f"Error processing page {current_page}: {e}")
+            send_error_notification(f"Error processing page {current_page}: {str(e)}", traceback.format_exc())
+            # Record what is in flight so the next attempt skips it
+            flush_transfer_pipeline(progress, timing_data)
+            page_attempts[current_page] = page_attempts.get(current_page, 0) + 1
+            if page_attempts[current_page] >= PAGE_MAX_ATTEMPTS:
+                if not give_up_on_page(progress, timing_data, current_page, judgments_data, e,
+                                       next_page=current_page + 1):
+                    logger.error(f"Listing of page {current_page} never loaded. Stopping process.")
+                    send_shutdown_notification(f"HTTP engine could not list page {current_page}")
+                    break
+                current_page += 1
+                progress['current_page'] = current_page
+                save_progress(progress)
+                continue
+            time.sleep(10)
+            if not authenticate_http_client(client):
+                break
+    
+    finish_run(progress, timing_data)
+
+
+# Live values of the search form fields (including the rotating app_token)
+READ_FORM_JS = r"""
+var fields = {};
+var nodes = document.querySelectorAll('input[name], select[name], textarea[name]');
+for (var i = 0; i < nodes.length; i++) {
+    var n = nodes[i];
+    var type = (n.type || '').toLowerCase();
+    if (['submit', 'button', 'image', 'reset', 'file'].indexOf(type) !== -1) continue;
+    if ((type === 'checkbox' || type === 'radio') && !n.checked) continue;
+    fields[n.name] = n.value;
+}
+return fields;
+"""
+
+
+def seed_http_client_from_browser(client):
+    """Hand the browser's authenticated session (cookies, headers, form state) to the HTTP client"""
+    generation, cookies, headers = get_http_credentials()
+    form_fields = driver.execute_script(READ_FORM_JS) or {}
+    
+    with client.lock:
+        client.session.cookies.clear()
+        for name, value in cookies.items():
+            client.session.cookies.set(name, value)
+        client.session.headers.update(headers)
+        client.form_fields = form_fields
+        client.app_token = form_fields.get('app_token', '')
+        client.generation += 1
+    logger.info(f"HTTP client seeded from browser session ({len(cookies)} cookies, generation {client.generation})")
+
+
+def get_worker_session(client):
+    """Per-thread keep-alive HTTP client carrying the current browser cookies"""
+    if getattr(hybrid_local, 'session', None) is None:
+        hybrid_local.session = build_http_session()
+        hybrid_local.generation = None
+    
+    generation, cookies, headers = client.credentials()
+    if hybrid_local.generation != generation:
+        hybrid_local.session.cookies.clear()
+        for name, value in cookies.items():
+            hybrid_local.session.cookies.set(name, value)
+        hybrid_local.session.headers.update(headers)
+        hybrid_local.generation = generation
+    return hybrid_local.session
+
+
+def hybrid_process_page(client, page):
+    """Worker: list one page and transfer its PDFs over HTTP.
+    
+    Returns (page, judgments_data, results, error), error being None, the
+    SessionExpiredError that interrupted the page or any other exception.
+    Finished rows are skipped when the page is retried.
+    """
+    results = []
+    judgments_data = None
+    try:
+        judgments_data = client.fetch_listing_page(page)
+        completed = get_completed_judgments()
+        session = get_worker_session(client)
+        for judgment in judgments_data:
+            if completed.contains(judgment):
+                continue
+            results.append((judgment, transfer_judgment_http(client, judgment, session)))
+        return page, judgments_data, results, None
+    except SessionExpiredError as e:
+        logger.warning(f"Session expired while processing page {page}: {e}")
+        return page, judgments_data, results, e
+    except Exception as e:
+        logger.error(f"Error processing page {page}: {e}")
+        return page, judgments_data, results, e
+
+
+def process_all_pages_hybrid():
+    """Hybrid engine: the browser only authenticates, HYBRID_WORKERS HTTP workers list pages and fetch PDFs"""
+    global current_page
+    
+    progress, timing_data, max_page = begin_run(start_pipeline=False)
+    client = EcourtsHttpClient()
+    seed_http_client_from_browser(client)
+    get_completed_judgments()  # load before the workers start reading it
+    retry_failed_http = lambda judgment: transfer_judgment_http(client, judgment, client.session)
+    try:
+        retry_failed_downloads(progress, timing_data, retry_failed_http)
+    except SessionExpiredError as e:
+        logger.warning(f"Session expired during the retry pass: {e}")
+    
+    page_attempts = {}
+    retry_pages = []
+    stuck_pages = []  # given up before their listing ever loaded
+    next_page = current_page
+    end_reached = False
+    failed_auth = 0
+    
+    with ThreadPoolExecutor(max_workers=HYBRID_WORKERS, thread_name_prefix=f"hybrid-{SCRIPT_ID}") as pool:
+        while retry_pages or not end_reached:
+            # Next window: pages to retry first, then fresh ones up to the end of the range
+            window = retry_pages[:HYBRID_WORKERS]
+            retry_pages = retry_pages[HYBRID_WORKERS:]
+            while len(window) < HYBRID_WORKERS and not end_reached:
+                if max_page and next_page > max_page:
+                    end_reached = True
+                    break
+                window.append(next_page)
+                next_page += 1
+            if not window:
+                break
+            
+            logger.info(f"\n=== Processing pages {window} with {len(window)} HTTP workers ===")
+            expired = False
+            for page, judgments_data, results, error in pool.map(lambda p: hybrid_process_page(client, p), window):
+                for judgment, download_result in results:
+                    record_download_result(progress, timing_data, judgment, download_result, page)
+                
+                if isinstance(error, SessionExpiredError):
+                    # Only an expired session is worth a captcha round
+                    expired = True
+                    retry_pages.append(page)
+                elif error is not None:
+                    page_attempts[page] = page_attempts.get(page, 0) + 1
+                    if page_attempts[page] < PAGE_MAX_ATTEMPTS:
+                        retry_pages.append(page)
+                    elif not give_up_on_page(progress, timing_data, page, judgments_data, error):
+                        stuck_pages.append(page)
+                elif not judgments_data:
+                    logger.info(f"No judgment data found on page {page} - end of results")
+                    end_reached = True
+                else:
+                    get_progress_store().mark_page_completed(page)
+                    logger.info(f"Completed page {page}. Total files downloaded so far: {total_files_downloaded}")
+            
+            # Resume point: the lowest page that is not finished yet
+            current_page = min(retry_pages + stuck_pages + [next_page])
+            progress['current_page'] = current_page
+            save_progress(progress)
+            
+            if stuck_pages:
+                logger.error(f"Listing of page {stuck_pages[0]} never loaded. Stopping process.")
+                send_shutdown_notification(f"Hybrid engine could not list page {stuck_pages[0]}")
+                break
+            
+            if not expired:
+                # Workers are idle between windows: retry failed downloads that are due
+                try:
+                    retry_failed_downloads(progress, timing_data, retry_failed_http)
+                except SessionExpiredError as e:
+                    logger.warning(f"Session expired during the retry pass: {e}")
+                    expired = True
+            
+            if expired:
+                # One captcha in the browser buys the next round of parallel downloads
+                logger.info("Re-authenticating in the browser...")
+                if reinitialize_session():
+                    seed_http_client_from_browser(client)
+                    failed_auth = 0
+                else:
+                    failed_auth += 1
+                    if failed_auth >= 3:
+                        logger.error("Could not re-authenticate after 3 attempts. Stopping process.")
+                        send_shutdown_notification("Hybrid engine could not re-authenticate")
+                        break
+                    time.sleep(30)
+    
+    finish_run(progress, timing_data)
+
+
 def main():
     global driver, wait
     
@@ -2289,34 +5907,44 @@ if __name__ == "__main__":
         logger.info(f"Profile Directory: {os.path.join(tempfile.gettempdir(), 'chrome_profile_script_' + str(SCRIPT_ID) + '_*')}")
         logger.info("=" * 80)
         
-        # Step 0: Pre-launch cleanup and preparation
-        logger.info("Performing pre-launch cleanup...")
-        pre_launch_cleanup()
-        
-        # Step 1: Initialize browser and load page
-        logger.info("Initializing browser...")
-        initialize_browser()
+        if SCRAPER_ENGINE == 'http':
+            # No browser at all: captcha, listing and PDFs over plain HTTP
+            logger.info("Starting browserless HTTP engine...")
+            process_all_pages_http()
+        else:
+            # Step 0: Pre-launch cleanup and preparation
+            logger.info("Performing pre-launch cleanup...")
+            pre_launch_cleanup()
+            
+            # Step 1: Initialize browser and load page
+            logger.info("Initializing browser...")
+            initialize_browser()
 
-        # Step 2: Solve captcha with retry logic
-        logger.info("Solving captcha...")
-        if not fill_captcha():
-            logger.error("Failed to solve captcha after multiple attempts")
-            if driver:
-                driver.quit()
-            sys.exit(1)
-        
-        # Step 3: Wait until the loading component is invisible
-        logger.info("Waiting for page to load...")
-        wait_for_loading_component()
-        
-        # Step 4: Set table display count to 100
-        logger.info("Setting table display count to 100...")
-        set_table_display_count()
-        
-        # Step 5: Start processing all pages
-        logger.info("Starting page processing...")
-        logger.info("Script execution started successfully")
-        process_all_pages()
+            # Step 2: Solve captcha with retry logic
+            logger.info("Solving captcha...")
+            if not fill_captcha():
+                logger.error("Failed to solve captcha after multiple attempts")
+                if driver:
+                    driver.quit()
+                sys.exit(1)
+            
+            # Step 3: Wait until the loading component is invisible
+            logger.info("Waiting for page to load...")
+            wait_for_loading_component()
+            
+            if SCRAPER_ENGINE == 'hybrid':
+                # The browser's job is done once it is authenticated
+                logger.info(f"Starting hybrid engine with {HYBRID_WORKERS} HTTP workers...")
+                process_all_pages_hybrid()
+            else:
+                # Step 4: Set table display count to 100
+                logger.info("Setting table display count to 100...")
+                set_table_display_count()
+                
+                # Step 5: Start processing all pages
+                logger.info("Starting page processing...")
+                logger.info("Script execution started successfully")
+                process_all_pages()
         
         # Final cleanup and summary
         logger.info("\n=== SCRIPT COMPLETION SUMMARY ===")